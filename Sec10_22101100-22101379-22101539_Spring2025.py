@@ -1,7 +1,17 @@
-from OpenGL.GL   import *
-from OpenGL.GLU  import *
-from OpenGL.GLUT import *
-import math, random, time
+import collections, math, os, random, sys, time
+import numpy as np
+
+# Headless runs (benchmarks, CI) step the simulation with no display and never
+# import OpenGL: pass --headless or set GHOST_HEADLESS=1 before importing.
+HEADLESS = "--headless" in sys.argv or os.environ.get("GHOST_HEADLESS") == "1"
+if not HEADLESS:
+    from OpenGL.GL   import *
+    from OpenGL.GLU  import *
+    from OpenGL.GLUT import *
+
+# Retained-mode rendering: pass --retained or set GHOST_RETAINED=1 to draw the
+# ground and walls from a display list and the ghosts as batched vertex arrays.
+RETAINED = "--retained" in sys.argv or os.environ.get("GHOST_RETAINED") == "1"
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -90,6 +100,23 @@ WALL_THICKNESS      = 5.0
 WALL_HEIGHT         = 40.0
 WALL_COLOR          = (0.45, 0.25, 0.05)
 
+# Retained-mode rendering
+GHOST_BATCH         = 2048          # ghosts per glDrawArrays call
+
+# Spatial grid: the sword reaches SWORD_RANGE past a point SWORD_OFFSET_FWD
+# ahead of the player, and pickup/contact radii are smaller still, so every
+# interaction query stays within one ring of cells. GHOST_DETECTION_R spans 3.
+GRID_CELL           = SWORD_RANGE + SWORD_OFFSET_FWD
+GRID_N              = math.ceil(2*GROUND_HALF / GRID_CELL)
+
+# Frame timing
+PROFILE_WINDOW      = 300           # frames behind the HUD percentiles
+TRACE_MAX_FRAMES    = 36000         # frames kept for --trace (10 min at 60 fps)
+
+# Headless simulation
+SIM_DT              = 1/60          # fixed step, the frame time update() clamps to
+SIM_SEED            = 0
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 2.  GLOBAL STATE – runtime vars
 # ─────────────────────────────────────────────────────────────────────────────
@@ -111,9 +138,19 @@ ghost_visibility= GHOST_INVIS_DURATION
 score           = 0
 
 last_time       = 0.0
+static_list     = None      # display list id for ground + walls (retained mode)
+
+show_profile    = False     # frame-time overlay in the HUD (--profile, P key)
+frame_start     = lap_start = 0.0
+frame_sections  = {}        # section -> (start, seconds) for the frame in progress
+frame_window    = collections.deque(maxlen=PROFILE_WINDOW)  # (start, seconds, sections)
+frame_trace     = None      # same records, kept longer, once --trace is on
 
-ghosts   = []
+ghosts   = {}       # struct-of-arrays, one row per ghost id; see init_ghosts()
 eyeballs = []
+ghost_grid   = {}   # spatial grids over ghost / active eyeball ids; see grid_reset()
+eyeball_grid = {}
+eyeballs_waiting = set()    # ids of picked-up eyeballs counting down to respawn
 boss     = None
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -122,7 +159,8 @@ boss     = None
 def lerp_color(c1, c2, f):
     return [c1[i] + (c2[i]-c1[i]) * f for i in range(3)]
 
-def draw_text_2d(x, y, text, *, col=(1,1,1), font=GLUT_BITMAP_HELVETICA_18):
+def draw_text_2d(x, y, text, *, col=(1,1,1), font=None):
+    if font is None: font = GLUT_BITMAP_HELVETICA_18
     r,g,b = col
     glColor3f(r,g,b)
     glMatrixMode(GL_PROJECTION); glPushMatrix(); glLoadIdentity()
@@ -133,16 +171,120 @@ def draw_text_2d(x, y, text, *, col=(1,1,1), font=GLUT_BITMAP_HELVETICA_18):
     glPopMatrix(); glMatrixMode(GL_PROJECTION); glPopMatrix()
     glMatrixMode(GL_MODELVIEW)
 
+# ───── frame timing ──────────────────────────────────────────────────────────
+# A frame runs from frame_begin() to frame_end(); each lap(name) closes the
+# section that began at the previous lap, so sections tile the frame.
+def frame_begin():
+    global frame_start, lap_start
+    frame_start=lap_start=time.perf_counter()
+    frame_sections.clear()
+
+def lap(name):
+    global lap_start
+    now=time.perf_counter()
+    frame_sections[name]=(lap_start, now-lap_start)
+    lap_start=now
+
+def frame_end():
+    record=(frame_start, time.perf_counter()-frame_start, dict(frame_sections))
+    frame_window.append(record)
+    if frame_trace is not None: frame_trace.append(record)
+
+def frame_stats():
+    """p50/p95/p99 frame ms and ticks/sec over the rolling window, None until it has two frames."""
+    if len(frame_window)<2: return None
+    ms=np.array([seconds for _,seconds,_ in frame_window])*1000
+    span=frame_window[-1][0]-frame_window[0][0]
+    return (*map(float, np.percentile(ms,(50,95,99))), (len(frame_window)-1)/span if span>0 else 0.0)
+
+def section_ms():
+    """Median ms per section over the rolling window, in frame order."""
+    names=dict.fromkeys(name for _,_,sections in frame_window for name in sections)
+    return {name: 1000*float(np.median([sections[name][1] for _,_,sections in frame_window if name in sections]))
+            for name in names}
+
+def write_trace(path):
+    """
+    Writes the traced frames to path: a Chrome trace (chrome://tracing,
+    Perfetto) if it ends in .json, otherwise CSV with one row per frame.
+    """
+    frames=list(frame_trace or ())
+    origin=frames[0][0] if frames else 0.0
+    if path.endswith(".json"):
+        import json
+        events=[]
+        for start,seconds,sections in frames:
+            events.append({"name":"frame","ph":"X","pid":0,"tid":0,
+                           "ts":(start-origin)*1e6,"dur":seconds*1e6})
+            events.extend({"name":name,"ph":"X","pid":0,"tid":0,"ts":(t0-origin)*1e6,"dur":dur*1e6}
+                          for name,(t0,dur) in sections.items())
+        with open(path,"w") as f: json.dump({"traceEvents":events,"displayTimeUnit":"ms"}, f)
+    else:
+        import csv
+        names=list(dict.fromkeys(name for _,_,sections in frames for name in sections))
+        with open(path,"w",newline="") as f:
+            out=csv.writer(f)
+            out.writerow(["frame","start_ms","frame_ms"]+[name+"_ms" for name in names])
+            for i,(start,seconds,sections) in enumerate(frames):
+                out.writerow([i, f"{(start-origin)*1000:.3f}", f"{seconds*1000:.3f}"]+
+                             [f"{sections[name][1]*1000:.3f}" if name in sections else "" for name in names])
+    print(f"Wrote {len(frames)} frames to {path}", file=sys.stderr)
+
+def start_trace(path):
+    # Traced frames are written out when the program exits (GLUT never returns).
+    global frame_trace
+    import atexit
+    frame_trace=collections.deque(maxlen=TRACE_MAX_FRAMES)
+    atexit.register(write_trace, path)
+
+# ───── spatial grid ──────────────────────────────────────────────────────────
+# Uniform grid of GRID_CELL squares over the arena floor (x/z only). "cells"
+# holds the ids filed in each cell and "cell" the cell each id is filed under
+# (-1 when it is not), so moving an entity touches just the two cells involved.
+def grid_reset(grid, n):
+    grid["cells"]=[set() for _ in range(GRID_N*GRID_N)]
+    grid["cell"]=np.full(n,-1)
+
+def grid_index(v):
+    return min(GRID_N-1, max(0, int((v+GROUND_HALF)//GRID_CELL)))
+
+def grid_move(grid, ids, xs, zs):
+    """Files ids under the cells of (xs, zs); ids already in the right cell cost nothing."""
+    ids=np.asarray(ids,dtype=int)
+    ix=np.clip((np.asarray(xs)+GROUND_HALF)//GRID_CELL, 0, GRID_N-1).astype(int)
+    iz=np.clip((np.asarray(zs)+GROUND_HALF)//GRID_CELL, 0, GRID_N-1).astype(int)
+    new=ix*GRID_N+iz; old=grid["cell"][ids]
+    changed=np.flatnonzero(new!=old)
+    cells=grid["cells"]
+    for i,o,c in zip(ids[changed].tolist(), old[changed].tolist(), new[changed].tolist()):
+        if o>=0: cells[o].discard(i)
+        cells[c].add(i)
+    grid["cell"][ids[changed]]=new[changed]
+
+def grid_remove(grid, i):
+    c=grid["cell"][i]
+    if c>=0: grid["cells"][c].discard(i); grid["cell"][i]=-1
+
+def grid_query(grid, x, z, r):
+    """Sorted ids filed in the cells overlapping the square x±r, z±r."""
+    cells=grid["cells"]; found=[]
+    for ix in range(grid_index(x-r), grid_index(x+r)+1):
+        for iz in range(grid_index(z-r), grid_index(z+r)+1):
+            found.extend(cells[ix*GRID_N+iz])
+    found.sort()
+    return np.array(found,dtype=int)
+
 # ───── entity spawners ───────────────────────────────────────────────────────
 def spawn_ghost(gid:int):
+    # (Re)fills row gid of the ghost arrays; draws from random in the same order as always.
     gx = random.uniform(*SPAWN_XZ_BOUNDS)
     gz = random.uniform(*SPAWN_XZ_BOUNDS)
     phase = random.uniform(0, 2*math.pi)
-    return {"id":gid,"pos":[gx,GHOST_BASE_FLOAT_Y,gz], "prev":[gx,0,gz],
-            "vel":[0,0,0], "float_phase":phase,
-            "tent_phase":[random.uniform(0,2*math.pi) for _ in range(NUM_TENTACLES)],
-            "yaw":random.uniform(0,360), "state":"IDLE",
-            "dying":False, "death_timer":0.0}
+    ghosts["pos"][gid]=(gx,GHOST_BASE_FLOAT_Y,gz); ghosts["prev"][gid]=(gx,0,gz)
+    ghosts["vel"][gid]=0; ghosts["float_phase"][gid]=phase
+    ghosts["tent_phase"][gid]=[random.uniform(0,2*math.pi) for _ in range(NUM_TENTACLES)]
+    ghosts["yaw"][gid]=random.uniform(0,360)
+    ghosts["dying"][gid]=False; ghosts["death_timer"][gid]=0.0
 
 def spawn_boss():
     bx,bz = random.choice(BOSS_CORNERS)
@@ -155,17 +297,25 @@ def spawn_boss():
 # 4.  INITIALISERS
 # ─────────────────────────────────────────────────────────────────────────────
 def init_ghosts():
-    ghosts.clear()
-    for i in range(NUM_GHOSTS):
-        ghosts.append(spawn_ghost(i))
+    n=NUM_GHOSTS
+    ghosts.update(pos=np.zeros((n,3)), prev=np.zeros((n,3)), vel=np.zeros((n,3)),
+                  float_phase=np.zeros(n), tent_phase=np.zeros((n,NUM_TENTACLES)),
+                  yaw=np.zeros(n), dying=np.zeros(n,bool), death_timer=np.zeros(n))
+    for i in range(n):
+        spawn_ghost(i)
+    grid_reset(ghost_grid, n)
+    grid_move(ghost_grid, np.arange(n), ghosts["pos"][:,0], ghosts["pos"][:,2])
 
 def init_eyeballs():
-    eyeballs.clear()
+    eyeballs.clear(); eyeballs_waiting.clear()
     for i in range(NUM_EYEBALLS):
         ex = random.uniform(*SPAWN_XZ_BOUNDS)
         ez = random.uniform(*SPAWN_XZ_BOUNDS)
         eyeballs.append({"id":i,"pos":[ex,EYEBALL_FLOAT_Y,ez],
                          "active":True,"respawn":0.0})
+    grid_reset(eyeball_grid, NUM_EYEBALLS)
+    grid_move(eyeball_grid, range(NUM_EYEBALLS),
+              [eb["pos"][0] for eb in eyeballs], [eb["pos"][2] for eb in eyeballs])
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 5.  RENDER FUNCTIONS
@@ -287,20 +437,22 @@ def draw_eyeballs():
         glPopMatrix()
 
 # ---- ghosts -----------------------------------------------------------------
-def draw_single_ghost(g, vis_global):
-    vis = vis_global if not g["dying"] else max(0.0, g["death_timer"]/(GHOST_DEATH_TIME*0.85))
-    if vis<=0.01 and not g["dying"]: return
-    scale = vis if g["dying"] else 1.0
-    body_c = (0.05,0.05,0.05) if g["dying"] else lerp_color(GHOST_BODY_CLR, FADE_TARGET_CLR, 1-vis)
-    feat_c = (0,0,0)           if g["dying"] else lerp_color(GHOST_FEATURE_CLR, body_c, (1-vis)*FEATURE_FADE_MULT)
-    tent_c = body_c if g["dying"] else lerp_color(GHOST_TENTACLE_CLR, FADE_TARGET_CLR, 1-vis)
+def draw_single_ghost(i, vis_global):
+    dying, death_timer = bool(ghosts["dying"][i]), float(ghosts["death_timer"][i])
+    vis = vis_global if not dying else max(0.0, death_timer/(GHOST_DEATH_TIME*0.85))
+    if vis<=0.01 and not dying: return
+    scale = vis if dying else 1.0
+    body_c = (0.05,0.05,0.05) if dying else lerp_color(GHOST_BODY_CLR, FADE_TARGET_CLR, 1-vis)
+    feat_c = (0,0,0)           if dying else lerp_color(GHOST_FEATURE_CLR, body_c, (1-vis)*FEATURE_FADE_MULT)
+    tent_c = body_c if dying else lerp_color(GHOST_TENTACLE_CLR, FADE_TARGET_CLR, 1-vis)
+    yaw, float_phase = float(ghosts["yaw"][i]), float(ghosts["float_phase"][i])
 
     glPushMatrix()
-    glTranslatef(*g["pos"]); glScalef(scale,scale,scale); glRotatef(g["yaw"],0,1,0)
+    glTranslatef(*ghosts["pos"][i].tolist()); glScalef(scale,scale,scale); glRotatef(yaw,0,1,0)
 
     glColor3f(*body_c); glutSolidCube(GHOST_SIZE)
 
-    if vis>0.05 and not g["dying"]:
+    if vis>0.05 and not dying:
         face_off = GHOST_SIZE*0.5+0.1
         eye_sep  = GHOST_SIZE*0.15
         eye_w    = GHOST_SIZE*0.18*math.sqrt(vis)
@@ -315,13 +467,14 @@ def draw_single_ghost(g, vis_global):
         glScalef(mouth_w,mouth_h,0.1); glutSolidCube(1); glPopMatrix()
 
     # tentacles
-    if not g["dying"] or g["death_timer"]>GHOST_DEATH_TIME*0.1:
-        vx,_,vz = g["vel"]; speed = math.hypot(vx,vz)
+    if not dying or death_timer>GHOST_DEATH_TIME*0.1:
+        vx,_,vz = ghosts["vel"][i].tolist(); speed = math.hypot(vx,vz)
         drag_x  = min(75, speed*150*TENTACLE_DRAG_STR)
-        drag_yaw= math.degrees(math.atan2(-vx,-vz))-g["yaw"] if speed>0.01 else 0
+        drag_yaw= math.degrees(math.atan2(-vx,-vz))-yaw if speed>0.01 else 0
+        tent_phase = ghosts["tent_phase"][i].tolist()
         glColor3f(*tent_c)
         for i in range(NUM_TENTACLES):
-            sway = g["tent_phase"][i] + g["float_phase"]*TENTACLE_SWAY_SPEED
+            sway = tent_phase[i] + float_phase*TENTACLE_SWAY_SPEED
             sway_x = math.sin(sway)*TENTACLE_SWAY_ANG
             sway_z = math.cos(sway*0.7)*TENTACLE_SWAY_ANG*0.5
             off_x  = (i-(NUM_TENTACLES-1)/2)*(GHOST_SIZE*0.7/max(1,NUM_TENTACLES-1))
@@ -337,10 +490,10 @@ def draw_single_ghost(g, vis_global):
 
 def draw_all_ghosts():
     vis_global = max(0.0, ghost_visibility / GHOST_INVIS_DURATION)
-    for g in ghosts:
-        if g["dying"] and g["death_timer"]<=0: continue
-        vis = vis_global if not g["dying"] else None
-        draw_single_ghost(g, vis)
+    gone = ghosts["dying"] & (ghosts["death_timer"]<=0)
+    for i in np.flatnonzero(~gone):
+        vis = vis_global if not ghosts["dying"][i] else None
+        draw_single_ghost(i, vis)
 
 # ---- boss -------------------------------------------------------------------
 def draw_boss():
@@ -368,6 +521,101 @@ def draw_boss():
         glScalef(mouth_w,mouth_h,0.1); glutSolidCube(1); glPopMatrix()
     glPopMatrix()
 
+# ---- retained mode ----------------------------------------------------------
+# Unit cube laid out the way freeglut's glutSolidCube draws it (+z, +x, +y, -x,
+# -y, -z faces). Nothing enables the depth test, so faces and ghost parts must
+# reach GL in the same order as the immediate path to overlap the same way.
+CUBE_CORNERS = np.array([( .5, .5, .5), (-.5, .5, .5), (-.5,-.5, .5), ( .5,-.5, .5),
+                         ( .5,-.5,-.5), ( .5, .5,-.5), (-.5, .5,-.5), (-.5,-.5,-.5)])
+CUBE_QUADS   = [0,1,2,3, 0,3,4,5, 0,5,6,1, 1,6,7,2, 7,4,3,2, 4,7,6,5]
+CUBE_VERTS   = np.hstack([CUBE_CORNERS[CUBE_QUADS], np.ones((len(CUBE_QUADS),1))])
+
+def draw_static():
+    """Ground and walls, compiled into a display list the first time through."""
+    global static_list
+    if static_list is None:
+        static_list=glGenLists(1)
+        glNewList(static_list, GL_COMPILE); draw_ground(); draw_walls(); glEndList()
+    glCallList(static_list)
+
+# n stacked 4x4 matrices, one per ghost, matching glTranslatef/glScalef/glRotatef
+def batch_translate(n, x, y, z):
+    m=np.tile(np.eye(4),(n,1,1)); m[:,0,3]=x; m[:,1,3]=y; m[:,2,3]=z
+    return m
+
+def batch_scale(n, x, y, z):
+    m=np.tile(np.eye(4),(n,1,1)); m[:,0,0]=x; m[:,1,1]=y; m[:,2,2]=z
+    return m
+
+def batch_rotate(n, deg, axis):
+    rad=np.radians(deg); c,s=np.cos(rad),np.sin(rad)
+    i,j=((1,2),(2,0),(0,1))[axis]
+    m=np.tile(np.eye(4),(n,1,1)); m[:,i,i]=c; m[:,j,j]=c; m[:,i,j]=-s; m[:,j,i]=s
+    return m
+
+def batch_lerp(c1, c2, f):
+    c1=np.asarray(c1)
+    return c1+(np.asarray(c2)-c1)*f[:,None]
+
+def ghost_batch(idx, vis_global):
+    """
+    World-space quad vertices and colours for ghosts idx, part for part in the
+    order draw_single_ghost() issues them: body, eyes, mouth, tentacles.
+    """
+    dying=ghosts["dying"][idx]; timer=ghosts["death_timer"][idx]
+    vis=np.where(dying, np.maximum(0.0, timer/(GHOST_DEATH_TIME*0.85)), vis_global)
+    keep=dying | (vis>0.01)
+    idx,dying,timer,vis=idx[keep],dying[keep],timer[keep],vis[keep]
+    n=len(idx); scale=np.where(dying, vis, 1.0); yaw=ghosts["yaw"][idx]
+
+    body_c=np.where(dying[:,None], 0.05, batch_lerp(GHOST_BODY_CLR, FADE_TARGET_CLR, 1-vis))
+    feat_c=batch_lerp(GHOST_FEATURE_CLR, body_c, (1-vis)*FEATURE_FADE_MULT)
+    tent_c=np.where(dying[:,None], body_c, batch_lerp(GHOST_TENTACLE_CLR, FADE_TARGET_CLR, 1-vis))
+
+    base=(batch_translate(n,*ghosts["pos"][idx].T) @ batch_scale(n,scale,scale,scale)
+          @ batch_rotate(n,yaw,1))
+    parts=[base @ batch_scale(n,GHOST_SIZE,GHOST_SIZE,GHOST_SIZE)]
+
+    face_off=GHOST_SIZE*0.5+0.1; root=np.sqrt(vis)
+    for s in (-1,1):
+        parts.append(base @ batch_translate(n,s*GHOST_SIZE*0.15,GHOST_SIZE*0.15,face_off)
+                     @ batch_scale(n,GHOST_SIZE*0.18*root,GHOST_SIZE*0.22*root,0.1))
+    parts.append(base @ batch_translate(n,0,-GHOST_SIZE*0.2,face_off)
+                 @ batch_scale(n,GHOST_SIZE*0.3*root,GHOST_SIZE*0.1*root,0.1))
+
+    vx,vz=ghosts["vel"][idx][:,0], ghosts["vel"][idx][:,2]; speed=np.hypot(vx,vz)
+    drag_x=np.minimum(75, speed*150*TENTACLE_DRAG_STR)
+    drag_yaw=np.where(speed>0.01, np.degrees(np.arctan2(-vx,-vz))-yaw, 0)
+    drag=batch_rotate(n,drag_yaw,1) @ batch_rotate(n,drag_x,0)
+    tentacle=(batch_translate(1,0,-TENTACLE_LEN/2,0) @ batch_scale(1,TENTACLE_WID,TENTACLE_LEN,TENTACLE_WID))
+    tent_phase=ghosts["tent_phase"][idx]; float_phase=ghosts["float_phase"][idx]
+    for i in range(NUM_TENTACLES):
+        sway=tent_phase[:,i]+float_phase*TENTACLE_SWAY_SPEED
+        off_x=(i-(NUM_TENTACLES-1)/2)*(GHOST_SIZE*0.7/max(1,NUM_TENTACLES-1))
+        parts.append(base @ batch_translate(n,off_x,-GHOST_SIZE*0.5,0) @ drag
+                     @ batch_rotate(n,np.sin(sway)*TENTACLE_SWAY_ANG,0)
+                     @ batch_rotate(n,np.cos(sway*0.7)*TENTACLE_SWAY_ANG*0.5,2) @ tentacle)
+
+    shown=np.ones((n,len(parts)),bool)
+    shown[:,1:4]=((vis>0.05) & ~dying)[:,None]
+    shown[:,4:]=(~dying | (timer>GHOST_DEATH_TIME*0.1))[:,None]
+    colors=np.stack([body_c]+[feat_c]*3+[tent_c]*NUM_TENTACLES, axis=1)[shown]
+    verts=np.einsum("mij,vj->mvi", np.stack(parts,axis=1)[shown], CUBE_VERTS)[...,:3]
+    return (verts.reshape(-1,3).astype(np.float32),
+            np.repeat(colors,len(CUBE_VERTS),axis=0).astype(np.float32))
+
+def draw_all_ghosts_batched():
+    vis_global = max(0.0, ghost_visibility / GHOST_INVIS_DURATION)
+    gone = ghosts["dying"] & (ghosts["death_timer"]<=0)
+    idx = np.flatnonzero(~gone)
+    glEnableClientState(GL_VERTEX_ARRAY); glEnableClientState(GL_COLOR_ARRAY)
+    for start in range(0, len(idx), GHOST_BATCH):
+        verts, cols = ghost_batch(idx[start:start+GHOST_BATCH], vis_global)
+        if not len(verts): continue
+        glVertexPointer(3,GL_FLOAT,0,verts); glColorPointer(3,GL_FLOAT,0,cols)
+        glDrawArrays(GL_QUADS,0,len(verts))
+    glDisableClientState(GL_COLOR_ARRAY); glDisableClientState(GL_VERTEX_ARRAY)
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 6.  INPUT HANDLERS
 # ─────────────────────────────────────────────────────────────────────────────
@@ -385,12 +633,17 @@ def key_down(key, *_):
     if key==b'q': player_pos[0]-=strf[0]; player_pos[2]-=strf[1]
     if key==b'a': player_yaw+=ROTATE_SPEED
     if key==b'd': player_yaw-=ROTATE_SPEED
+    if key==b'p': toggle_profile()
     player_yaw%=360
     
     # clamp inside wall
     player_pos[0]=max(INNER_MIN,min(INNER_MAX,player_pos[0]))
     player_pos[2]=max(INNER_MIN,min(INNER_MAX,player_pos[2]))
 
+def toggle_profile():
+    global show_profile
+    show_profile = not show_profile
+
 def special_key(key,*_):
     global cam_height, cam_dist
     if key==GLUT_KEY_UP:        cam_height+=5
@@ -399,8 +652,12 @@ def special_key(key,*_):
     if key==GLUT_KEY_PAGE_DOWN: cam_dist+=10
 
 def mouse_click(btn,state,*_):
+    if btn==GLUT_LEFT_BUTTON and state==GLUT_DOWN:
+        start_attack()
+
+def start_attack():
     global is_attacking, atk_phase, atk_step, arm_rot_x, arm_rot_y, atk_cooldown
-    if btn==GLUT_LEFT_BUTTON and state==GLUT_DOWN and not is_attacking and player_hp>0 and atk_cooldown<=0:
+    if not is_attacking and player_hp>0 and atk_cooldown<=0:
         is_attacking=True
         atk_phase=1
         atk_step=0
@@ -411,28 +668,30 @@ def mouse_click(btn,state,*_):
 # 7.  CAMERA
 # ─────────────────────────────────────────────────────────────────────────────
 def setup_camera():
-    global player_render_yaw
-
     glMatrixMode(GL_PROJECTION); glLoadIdentity()
     gluPerspective(FOV_Y, WIN_W/WIN_H, 0.1, 3000.0)
     glMatrixMode(GL_MODELVIEW); glLoadIdentity()
 
+    cx,cy,cz = camera_eye()
+    gluLookAt(cx,cy,cz, player_pos[0],player_pos[1]+30,player_pos[2], 0,1,0)
+
+def camera_eye():
+    # Also turns the player model to face away from the camera; the sword aims along it.
+    global player_render_yaw
     rad=math.radians(player_yaw)
     cx=player_pos[0]-math.sin(rad)*cam_dist
     cz=player_pos[2]-math.cos(rad)*cam_dist
     cy=player_pos[1]+cam_height
-    gluLookAt(cx,cy,cz, player_pos[0],player_pos[1]+30,player_pos[2], 0,1,0)
 
     dx,dz = cx-player_pos[0], cz-player_pos[2]
     player_render_yaw=math.degrees(math.atan2(dx,dz)) if (dx or dz) else player_yaw
+    return cx,cy,cz
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 8.  UPDATE – main game loop logic
 # ─────────────────────────────────────────────────────────────────────────────
 def update():
-    global last_time, atk_cooldown, dmg_cooldown, ghost_visibility
-    global is_attacking, atk_phase, atk_step, arm_rot_x, arm_rot_y
-    global player_hp, score, boss
+    global last_time
 
     # --- delta-time ----------------------------------------------------------
     # now=glutGet(GLUT_ELAPSED_TIME)/1000.0
@@ -440,27 +699,44 @@ def update():
     dt=min(max(now-last_time,1/60),0.1)
     last_time=now
 
+    frame_begin()
+    step(dt)
+    glutPostRedisplay()
+
+def step(dt):
+    """One tick of game logic, dt seconds long. Touches no GL/GLUT state."""
+    global atk_cooldown, dmg_cooldown, ghost_visibility
+    global is_attacking, atk_phase, atk_step, arm_rot_x, arm_rot_y
+    global player_hp, score, boss
+
     # --- cool-downs ----------------------------------------------------------
     atk_cooldown=max(0, atk_cooldown-dt)
     dmg_cooldown=max(0, dmg_cooldown-dt)
     ghost_visibility=max(0, ghost_visibility-dt)
 
     # --- eyeball pick-ups ----------------------------------------------------
-    for eb in eyeballs:
-        if eb["active"]:
-            d2=((player_pos[0]-eb["pos"][0])**2 +
-                (player_pos[1]+30-eb["pos"][1])**2 +
-                (player_pos[2]-eb["pos"][2])**2)
-            if d2<(PLAYER_COLLIDE+EYEBALL_SIZE)**2:
-                eb["active"]=False; eb["respawn"]=EYEBALL_RESPAWN
-                ghost_visibility+=GHOST_INVIS_DURATION
-        else:
-            if eb["respawn"]>0:
-                eb["respawn"]-=dt
-                if eb["respawn"]<=0:
-                    eb["pos"][0]=random.uniform(*SPAWN_XZ_BOUNDS)
-                    eb["pos"][2]=random.uniform(*SPAWN_XZ_BOUNDS)
-                    eb["active"]=True
+    # Only eyeballs near the player can be picked up and only waiting ones tick
+    # down; both go in id order so respawns draw from random as they always have.
+    waiting=sorted(eyeballs_waiting)
+    for i in grid_query(eyeball_grid, player_pos[0], player_pos[2], PLAYER_COLLIDE+EYEBALL_SIZE).tolist():
+        eb=eyeballs[i]
+        d2=((player_pos[0]-eb["pos"][0])**2 +
+            (player_pos[1]+30-eb["pos"][1])**2 +
+            (player_pos[2]-eb["pos"][2])**2)
+        if d2<(PLAYER_COLLIDE+EYEBALL_SIZE)**2:
+            eb["active"]=False; eb["respawn"]=EYEBALL_RESPAWN
+            ghost_visibility+=GHOST_INVIS_DURATION
+            grid_remove(eyeball_grid, i); eyeballs_waiting.add(i)
+    for i in waiting:
+        eb=eyeballs[i]
+        if eb["respawn"]>0:
+            eb["respawn"]-=dt
+            if eb["respawn"]<=0:
+                eb["pos"][0]=random.uniform(*SPAWN_XZ_BOUNDS)
+                eb["pos"][2]=random.uniform(*SPAWN_XZ_BOUNDS)
+                eb["active"]=True
+                grid_move(eyeball_grid, [i], [eb["pos"][0]], [eb["pos"][2]]); eyeballs_waiting.discard(i)
+    lap("eyeballs")
 
     # --- attack animation & sword hits --------------------------------------
     if is_attacking and player_hp>0:
@@ -498,16 +774,16 @@ def update():
             ay=player_pos[1]+40
             az=player_pos[2]+math.cos(rad)*SWORD_OFFSET_FWD
 
-            # normal ghosts
-            for g in ghosts:
-                if g["dying"]: continue
-                dx,dy,dz=g["pos"][0]-ax,g["pos"][1]-ay,g["pos"][2]-az
-                if dx*dx+dy*dy+dz*dz<SWORD_RANGE**2:
-                    dist_xz=math.hypot(dx,dz) or 0.001
-                    dot=(dx*math.sin(rad)+dz*math.cos(rad))/dist_xz
-                    if math.degrees(math.acos(max(-1,min(1,dot))))<SWORD_ARC_DEG:
-                        g["dying"]=True; g["death_timer"]=GHOST_DEATH_TIME
-                        score+=POINT_GHOST
+            # normal ghosts: sphere, then cone, over the ghosts in neighbouring cells
+            near=grid_query(ghost_grid, ax, az, SWORD_RANGE)
+            dx,dy,dz=(ghosts["pos"][near]-(ax,ay,az)).T
+            inside=~ghosts["dying"][near] & (dx*dx+dy*dy+dz*dz<SWORD_RANGE**2)
+            near,dx,dz=near[inside],dx[inside],dz[inside]
+            dist_xz=np.hypot(dx,dz); dist_xz[dist_xz==0]=0.001
+            dot=(dx*math.sin(rad)+dz*math.cos(rad))/dist_xz
+            hit=near[np.degrees(np.arccos(np.clip(dot,-1,1)))<SWORD_ARC_DEG]
+            ghosts["dying"][hit]=True; ghosts["death_timer"][hit]=GHOST_DEATH_TIME
+            score+=POINT_GHOST*len(hit)
 
             # boss
             if boss and not boss["dying"]:
@@ -524,38 +800,49 @@ def update():
     # cancel attack if player dead
     if player_hp<=0 and is_attacking:
         is_attacking=False; atk_phase=atk_step=0; arm_rot_x=arm_rot_y=0
-
-    # --- ghost AI loop -------------------------------------------------------
-    survivors=[]
-    for g in ghosts:
-        if g["dying"]:
-            g["death_timer"]-=dt
-            if g["death_timer"]>0: survivors.append(g)
-            else: survivors.append(spawn_ghost(g["id"]))
-            continue
-
-        g["prev"][:]=g["pos"][:]
-        g["float_phase"]=(g["float_phase"]+GHOST_FLOAT_SPEED*dt*60)%(2*math.pi)
-        g["pos"][1]=GHOST_BASE_FLOAT_Y+math.sin(g["float_phase"])*GHOST_FLOAT_AMPL
-
-        dx,dz=player_pos[0]-g["pos"][0], player_pos[2]-g["pos"][2]
-        dist=math.hypot(dx,dz) or 0.001
-        tgt_yaw=math.degrees(math.atan2(dx,dz))
-        g["yaw"]=(g["yaw"]+(((tgt_yaw-g["yaw"]+180)%360)-180)*0.05*dt*60)%360
-
-        if dist<GHOST_DETECTION_R and player_hp>0:
-            if dist>PLAYER_COLLIDE:
-                g["pos"][0]+=dx/dist*GHOST_CHASE_SPEED*dt*60
-                g["pos"][2]+=dz/dist*GHOST_CHASE_SPEED*dt*60
-        for i in range(3): g["vel"][i]=g["pos"][i]-g["prev"][i]
-
-        if dmg_cooldown<=0 and player_hp>0:
-            dy=(player_pos[1]+30)-g["pos"][1]
-            if dx*dx+dy*dy+dz*dz<(PLAYER_COLLIDE+GHOST_SIZE/2)**2:
-                player_hp=max(0,player_hp-GHOST_TOUCH_DPS)
-                dmg_cooldown=DMG_COOLDOWN_TIME
-        survivors.append(g)
-    ghosts[:] = survivors
+    lap("attack")
+
+    # --- ghost AI, batched over the ghost arrays -----------------------------
+    dying=ghosts["dying"]
+    ghosts["death_timer"][dying]-=dt
+    respawn=np.flatnonzero(dying & (ghosts["death_timer"]<=0))
+    live=np.flatnonzero(~dying)
+
+    pos=ghosts["pos"]
+    ghosts["prev"][live]=pos[live]
+    float_phase=(ghosts["float_phase"][live]+GHOST_FLOAT_SPEED*dt*60)%(2*math.pi)
+    ghosts["float_phase"][live]=float_phase
+    pos[live,1]=GHOST_BASE_FLOAT_Y+np.sin(float_phase)*GHOST_FLOAT_AMPL
+
+    dx,dz=player_pos[0]-pos[live,0], player_pos[2]-pos[live,2]
+    dist=np.hypot(dx,dz); dist[dist==0]=0.001
+    tgt_yaw=np.degrees(np.arctan2(dx,dz))
+    yaw=ghosts["yaw"][live]
+    ghosts["yaw"][live]=(yaw+(((tgt_yaw-yaw+180)%360)-180)*0.05*dt*60)%360
+
+    chase=(dist<GHOST_DETECTION_R) & (dist>PLAYER_COLLIDE) & (player_hp>0)
+    if dmg_cooldown<=0 and player_hp>0:
+        near=grid_query(ghost_grid, player_pos[0], player_pos[2], PLAYER_COLLIDE+GHOST_SIZE/2)
+        near=near[~dying[near]]
+        ndx,ndz=player_pos[0]-pos[near,0], player_pos[2]-pos[near,2]
+        ndy=(player_pos[1]+30)-pos[near,1]
+        touching=near[ndx*ndx+ndy*ndy+ndz*ndz<(PLAYER_COLLIDE+GHOST_SIZE/2)**2]
+        if len(touching):
+            # Only the first ghost lands a hit: the cooldown it starts covers the rest.
+            # If that hit kills, the ghosts after it never saw a live player to chase.
+            player_hp=max(0,player_hp-GHOST_TOUCH_DPS)
+            dmg_cooldown=DMG_COOLDOWN_TIME
+            if player_hp<=0: chase[live>touching[0]]=False
+    moved=live[chase]
+    pos[moved,0]+=dx[chase]/dist[chase]*GHOST_CHASE_SPEED*dt*60
+    pos[moved,2]+=dz[chase]/dist[chase]*GHOST_CHASE_SPEED*dt*60
+    ghosts["vel"][live]=pos[live]-ghosts["prev"][live]
+
+    for i in respawn:
+        spawn_ghost(i)
+    moved=np.concatenate((moved,respawn))
+    grid_move(ghost_grid, moved, pos[moved,0], pos[moved,2])
+    lap("ghost_ai")
 
     # --- boss update ---------------------------------------------------------
     if boss:
@@ -580,19 +867,24 @@ def update():
     # --- auto-respawn boss when gone -----------------------------------------
     if boss is None or (boss["dying"] and boss["death_timer"]<=0):
         boss=spawn_boss()
-
-    glutPostRedisplay()
+    lap("boss")
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 9.  DISPLAY
 # ─────────────────────────────────────────────────────────────────────────────
 def show_screen():
+    lap("glut")                 # event handling between update() and this redraw
     glClear(GL_COLOR_BUFFER_BIT|GL_DEPTH_BUFFER_BIT)
     setup_camera()
 
-    draw_ground(); draw_walls()
-    draw_eyeballs(); draw_all_ghosts(); draw_boss()
+    if RETAINED: draw_static()
+    else:        draw_ground(); draw_walls()
+    lap("draw_ground")
+    draw_eyeballs();                                                lap("draw_eyeballs")
+    draw_all_ghosts_batched() if RETAINED else draw_all_ghosts();   lap("draw_ghosts")
+    draw_boss()
     if player_hp>0: draw_player()
+    lap("draw_other")
 
     # HUD
     draw_text_2d(10,WIN_H-30, f"HP   : {int(player_hp)}/{int(HP_MAX)}", col=(0.1,1,0.1))
@@ -600,22 +892,118 @@ def show_screen():
     # draw_text_2d(10,WIN_H-90, f"Yaw  : {player_yaw:.1f}")
     draw_text_2d(10, WIN_H-130,f"Ghost Visible : {ghost_visibility:.1f}s", col=(0.8,0.8,1))
 
+    stats = frame_stats() if show_profile else None
+    if stats:
+        p50,p95,p99,tps = stats
+        draw_text_2d(10, WIN_H-160, f"Frame ms p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}   {tps:.0f} ticks/s",
+                     col=(1,0.6,0.2))
+        for row,(name,ms) in enumerate(section_ms().items()):
+            draw_text_2d(10, WIN_H-180-14*row, f"{name:<14} {ms:6.2f} ms", col=(1,0.8,0.5),
+                         font=GLUT_BITMAP_HELVETICA_12)
+
     if player_hp<=0:
         draw_text_2d(WIN_W//2-80,WIN_H//2,"GAME OVER",col=(1,0,0),
                      font=GLUT_BITMAP_TIMES_ROMAN_24)
 
     glutSwapBuffers()
+    lap("hud_swap")
+    frame_end()
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 10.  MAIN
+# 10.  HEADLESS SIMULATION
 # ─────────────────────────────────────────────────────────────────────────────
-def main():
-    global last_time, boss
+def reset_state(seed=SIM_SEED):
+    """Seeds `random` and puts every global back to its start-of-game value."""
+    global player_pos, player_yaw, player_render_yaw, cam_dist, cam_height
+    global is_attacking, atk_phase, atk_step, arm_rot_x, arm_rot_y, atk_cooldown
+    global player_hp, dmg_cooldown, ghost_visibility, score, boss
+    random.seed(seed)
+    player_pos = [0.0, PLAYER_HEIGHT, 0.0]
+    player_yaw = player_render_yaw = 0.0
+    cam_dist, cam_height = CAM_DIST_DEFAULT, CAM_HEIGHT_DEFAULT
+    is_attacking = False; atk_phase = atk_step = 0
+    arm_rot_x = arm_rot_y = 0.0; atk_cooldown = 0.0
+    player_hp = HP_MAX; dmg_cooldown = 0.0
+    ghost_visibility = GHOST_INVIS_DURATION; score = 0
+    init_ghosts(); init_eyeballs(); boss = spawn_boss()
+    frame_window.clear()
+
+def autopilot(tick):
+    # Scripted input: walk a wide circle and swing whenever the sword is ready.
+    key_down(b'w')
+    if tick % 3 == 0: key_down(b'a')
+    start_attack()
+
+def simulate(ticks, dt=SIM_DT, seed=SIM_SEED, invulnerable=False, max_seconds=None):
+    """
+    Runs `ticks` fixed steps of dt from a fresh seeded game, driven by
+    autopilot(), and returns (ticks run, wall seconds they took). The same
+    seed always plays out the same game. With invulnerable, the player is
+    healed every tick so chase and contact damage stay live for the whole run;
+    max_seconds stops early once that much time has gone by.
+    """
+    global player_hp
+    reset_state(seed)
+    start = time.perf_counter()
+    elapsed = 0.0
+    for tick in range(ticks):
+        frame_begin()
+        autopilot(tick)
+        step(dt)
+        camera_eye()                # what show_screen() would do between ticks
+        if invulnerable: player_hp = HP_MAX
+        frame_end()
+        elapsed = time.perf_counter() - start
+        if max_seconds is not None and elapsed >= max_seconds:
+            return tick + 1, elapsed
+    return ticks, elapsed
+
+def headless_main(argv):
+    import argparse
+    global NUM_GHOSTS, NUM_EYEBALLS
+    parser = argparse.ArgumentParser(description="Step the game without a display.")
+    parser.add_argument("--headless", action="store_true", help="Required; selects this mode")
+    parser.add_argument("--ticks", type=int, default=3600, help="Steps to run (default: 3600)")
+    parser.add_argument("--dt", type=float, default=SIM_DT, help="Seconds per step (default: 1/60)")
+    parser.add_argument("--seed", type=int, default=SIM_SEED, help="Seed for random (default: 0)")
+    parser.add_argument("--ghosts", type=int, default=NUM_GHOSTS, help="NUM_GHOSTS")
+    parser.add_argument("--eyeballs", type=int, default=NUM_EYEBALLS, help="NUM_EYEBALLS")
+    parser.add_argument("--invulnerable", action="store_true", help="Keep the player at full HP")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Write per-tick section timings to PATH (.json: Chrome trace, else CSV)")
+    args = parser.parse_args(argv)
+
+    NUM_GHOSTS, NUM_EYEBALLS = args.ghosts, args.eyeballs
+    if args.trace: start_trace(args.trace)
+    ticks, seconds = simulate(args.ticks, args.dt, args.seed, args.invulnerable)
+    print(f"{ticks} ticks in {seconds:.3f}s ({ticks/seconds:.0f} ticks/s): "
+          f"score {score}, HP {player_hp:.0f}, player at ({player_pos[0]:.1f}, {player_pos[2]:.1f})")
+    stats = frame_stats()
+    if stats:
+        print("tick ms p50 {:.3f}  p95 {:.3f}  p99 {:.3f} (last {} ticks)".format(*stats[:3], len(frame_window)))
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 11.  MAIN
+# ─────────────────────────────────────────────────────────────────────────────
+def main(argv=()):
+    import argparse
+    global last_time, boss, show_profile
+    parser = argparse.ArgumentParser(description="Ghost Of OpenGL")
+    parser.add_argument("--retained", action="store_true",
+                        help="Draw ground, walls and ghosts from display lists / vertex arrays")
+    parser.add_argument("--profile", action="store_true", help="Start with the frame-time overlay on (P toggles)")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="On exit, write per-frame section timings to PATH (.json: Chrome trace, else CSV)")
+    args = parser.parse_args(argv)
+    show_profile = args.profile
+    if args.trace: start_trace(args.trace)
+
     glutInit(); glutInitDisplayMode(GLUT_DOUBLE|GLUT_RGB|GLUT_DEPTH)
     glutInitWindowSize(WIN_W,WIN_H); glutCreateWindow(b"Ghost Of OpenGL")
 
     last_time= time.perf_counter()
     init_ghosts(); init_eyeballs(); boss=spawn_boss()
+    frame_begin()
 
     glutDisplayFunc(show_screen)
     glutKeyboardFunc(key_down)
@@ -629,10 +1017,11 @@ Controls
 W/S          Move forward / backward
 Q/E          Strafe left / right
 A/D          Rotate left / right
+P            Frame-time overlay on / off
 Mouse Left   X-style sword slash
 Arrow Up/Down, PgUp/PgDn  Camera height / distance
 """)
     glutMainLoop()
 
 if __name__=="__main__":
-    main()
+    headless_main(sys.argv[1:]) if HEADLESS else main(sys.argv[1:])
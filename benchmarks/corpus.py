@@ -0,0 +1,305 @@
+"""
+Synthetic PDF corpus for the benchmarks.
+
+Files are written directly (no pypdf) so that generating a 50,000-page
+document takes seconds and the output does not change when pypdf does.
+Every generator is seeded, so a given (kind, pages, xref) triple always
+produces the same bytes.
+"""
+import os
+import random
+import zlib
+
+KINDS = ("text", "images", "shared-font", "incremental")
+XREF_STYLES = ("table", "stream", "hybrid")
+
+PAGE_W, PAGE_H = 612, 792
+TREE_FANOUT = 64
+IMAGE_SIDE = 96
+FONT_FILE_SIZE = 256 * 1024
+OBJSTM_SIZE = 100
+
+
+class PdfBuilder:
+    """
+    Minimal PDF object writer: objects are numbered in the order they are
+    reserved, bodies can be filled in later, and write() lays them out with a
+    classic xref table, an xref stream or both (see write).
+    """
+
+    def __init__(self):
+        self.bodies = []
+        self.streams = set()
+
+    def reserve(self):
+        self.bodies.append(None)
+        return len(self.bodies)
+
+    def set(self, num, body):
+        self.bodies[num - 1] = body
+
+    def add(self, body):
+        num = self.reserve()
+        self.set(num, body)
+        return num
+
+    def add_stream(self, data, entries=b"", compress=True):
+        if compress:
+            data = zlib.compress(data)
+            entries += b" /Filter /FlateDecode"
+        num = self.add(b"<< /Length %d%s >>\nstream\n" % (len(data), entries) + data + b"\nendstream")
+        self.streams.add(num)
+        return num
+
+    def write(self, path, root, xref="table"):
+        """
+        Writes the file with one of the XREF_STYLES:
+
+        table    a classic xref table, every object at top level
+        stream   dictionaries packed into object streams, an xref stream
+        hybrid   the same object streams, plus a classic table that marks the
+                 packed objects free and points at an xref stream for them
+                 with /XRefStm, so pre-1.5 readers still see the rest
+        """
+        if xref not in XREF_STYLES:
+            raise ValueError(f"unknown xref style '{xref}'")
+        packed = [] if xref == "table" else [num for num in range(1, len(self.bodies) + 1) if num not in self.streams]
+        # Object stream and xref stream numbers are taken from the builder so later updates stay consistent.
+        object_streams = [(self._placeholder(), packed[i:i + OBJSTM_SIZE]) for i in range(0, len(packed), OBJSTM_SIZE)]
+        xref_num = self._placeholder() if xref != "table" else None
+        size = len(self.bodies) + 1
+
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+            offsets = {}
+            entries = {}
+            skip = set(packed)
+            for num, body in enumerate(self.bodies, 1):
+                if num not in skip and num != xref_num and body:
+                    offsets[num] = f.tell()
+                    f.write(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+            for stream_num, nums in object_streams:
+                header, data = [], b""
+                for index, num in enumerate(nums):
+                    header.append(b"%d %d" % (num, len(data)))
+                    data += self.bodies[num - 1] + b"\n"
+                    entries[num] = (2, stream_num, index)
+                first = b" ".join(header) + b"\n"
+                payload = zlib.compress(first + data)
+                offsets[stream_num] = f.tell()
+                f.write(b"%d 0 obj\n<< /Type /ObjStm /N %d /First %d /Length %d /Filter /FlateDecode >>\nstream\n"
+                        % (stream_num, len(nums), len(first), len(payload)) + payload + b"\nendstream\nendobj\n")
+
+            if xref == "table":
+                startxref = f.tell()
+                f.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+                f.write(b"".join(b"%010d 00000 n \n" % offsets[num] for num in range(1, size)))
+                f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, root, startxref))
+                return
+
+            offsets[xref_num] = f.tell()
+            if xref == "stream":
+                entries.update((num, (1, offset, 0)) for num, offset in offsets.items())
+                entries[0] = (0, 0, 65535)
+                index = [0, size]
+            else:
+                index = []
+                for num in sorted(entries):
+                    if index and index[-2] + index[-1] == num:
+                        index[-1] += 1
+                    else:
+                        index += [num, 1]
+            rows = [b"%c%s%s" % (entries[num][0], entries[num][1].to_bytes(4, "big"), entries[num][2].to_bytes(2, "big"))
+                    for first, n in zip(index[::2], index[1::2]) for num in range(first, first + n)]
+            payload = zlib.compress(_png_up(rows))
+            trailer = b"/Size %d /Root %d 0 R" % (size, root)
+            f.write(b"%d 0 obj\n<< /Type /XRef %s /W [1 4 2] /Index [%s] /Filter /FlateDecode "
+                    b"/DecodeParms << /Predictor 12 /Columns 7 >> /Length %d >>\nstream\n"
+                    % (xref_num, trailer, b" ".join(b"%d" % v for v in index), len(payload))
+                    + payload + b"\nendstream\nendobj\n")
+            if xref == "stream":
+                f.write(b"startxref\n%d\n%%%%EOF\n" % offsets[xref_num])
+                return
+
+            startxref = f.tell()
+            f.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+            f.write(b"".join(b"%010d 00000 n \n" % offsets[num] if num in offsets else b"0000000000 00000 f \n"
+                             for num in range(1, size)))
+            f.write(b"trailer\n<< %s /XRefStm %d >>\nstartxref\n%d\n%%%%EOF\n"
+                    % (trailer, offsets[xref_num], startxref))
+
+    def _placeholder(self):
+        self.bodies.append(b"")
+        return len(self.bodies)
+
+
+def _png_up(rows):
+    # PNG "Up" predictor (/Predictor 12): each row stored as its difference from the row above.
+    out, previous = bytearray(), bytes(len(rows[0])) if rows else b""
+    for row in rows:
+        out.append(2)
+        out.extend((a - b) & 0xFF for a, b in zip(row, previous))
+        previous = row
+    return bytes(out)
+
+
+def _page_tree(builder, page_nums):
+    """
+    Builds a balanced /Pages tree over already reserved page objects. Returns the
+    root node number and a map from every page and node to its parent.
+    """
+    parents = {}
+    counts = dict.fromkeys(page_nums, 1)
+    nodes = []
+    level = page_nums
+    while True:
+        next_level = []
+        for i in range(0, len(level), TREE_FANOUT):
+            kids = level[i:i + TREE_FANOUT]
+            node = builder.reserve()
+            for kid in kids:
+                parents[kid] = node
+            counts[node] = sum(counts[kid] for kid in kids)
+            nodes.append((node, kids))
+            next_level.append(node)
+        level = next_level
+        if len(level) == 1:
+            break
+
+    for node, kids in nodes:
+        parent = b" /Parent %d 0 R" % parents[node] if node in parents else b""
+        builder.set(node, b"<< /Type /Pages /Kids [%s] /Count %d%s >>"
+                    % (b" ".join(b"%d 0 R" % kid for kid in kids), counts[node], parent))
+    return level[0], parents
+
+
+def _text_content(page, lines=30, font=b"/F1"):
+    rows = [b"BT %s 11 Tf 72 %d Td (Page %d, line %d: the quick brown fox jumps over the lazy dog) Tj ET"
+            % (font, PAGE_H - 72 - 20 * i, page, i) for i in range(lines)]
+    return b"\n".join(rows)
+
+
+def _image_tiles(rng, count=16):
+    # Smooth gradient with noise: compresses like a scan rather than like random bytes.
+    row_base = [int(255 * x / IMAGE_SIDE) for x in range(IMAGE_SIDE)]
+    tiles = []
+    for _ in range(count):
+        rows = bytearray()
+        for _ in range(IMAGE_SIDE):
+            rows.extend(min(255, max(0, v + rng.randint(-12, 12))) for v in row_base)
+        tiles.append(rows)
+    return tiles
+
+
+def _image_data(tiles, rng, page):
+    # Stamp the page number into the first row so no two pages share an identical image.
+    data = bytearray(rng.choice(tiles))
+    stamp = b"%d" % page
+    data[:len(stamp)] = stamp
+    return bytes(data)
+
+
+def build_pdf(path, kind, pages, seed=0, xref="table"):
+    """
+    Writes a synthetic PDF of the given kind, laid out with the given
+    PdfBuilder.write xref style:
+
+    text          Helvetica text on every page (standard font, nothing embedded)
+    images        one grayscale image XObject per page plus a caption
+    shared-font   text pages that all reference one embedded font program
+    incremental   text pages followed by three incremental updates that
+                  rewrite the content of every tenth page
+    """
+    if kind not in KINDS:
+        raise ValueError(f"unknown corpus kind '{kind}'")
+    rng = random.Random(f"{kind}:{pages}:{seed}")
+    builder = PdfBuilder()
+    catalog = builder.reserve()
+
+    if kind == "shared-font":
+        font_file = builder.add_stream(rng.randbytes(FONT_FILE_SIZE), b" /Length1 %d" % FONT_FILE_SIZE,
+                                       compress=False)
+        descriptor = builder.add(b"<< /Type /FontDescriptor /FontName /SynthSans /Flags 32 "
+                                 b"/FontBBox [0 -200 1000 900] /ItalicAngle 0 /Ascent 900 /Descent -200 "
+                                 b"/CapHeight 700 /StemV 80 /FontFile2 %d 0 R >>" % font_file)
+        font = builder.add(b"<< /Type /Font /Subtype /TrueType /BaseFont /SynthSans "
+                           b"/FirstChar 32 /LastChar 126 /Widths [%s] /FontDescriptor %d 0 R >>"
+                           % (b" ".join([b"500"] * 95), descriptor))
+    else:
+        font = builder.add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    resources = builder.add(b"<< /Font << /F1 %d 0 R >> >>" % font)
+
+    tiles = _image_tiles(rng) if kind == "images" else None
+    page_nums = [builder.reserve() for _ in range(pages)]
+    content_nums = {}
+    resource_nums = {}
+    for page, num in enumerate(page_nums, 1):
+        if kind == "images":
+            image = builder.add_stream(_image_data(tiles, rng, page),
+                                       b" /Type /XObject /Subtype /Image /Width %d /Height %d "
+                                       b"/ColorSpace /DeviceGray /BitsPerComponent 8" % (IMAGE_SIDE, IMAGE_SIDE))
+            resource_nums[num] = builder.add(b"<< /Font << /F1 %d 0 R >> /XObject << /Im1 %d 0 R >> >>"
+                                             % (font, image))
+            content = b"q 468 0 0 468 72 200 cm /Im1 Do Q\n" + _text_content(page, lines=2)
+        else:
+            resource_nums[num] = resources
+            content = _text_content(page)
+        content_nums[num] = builder.add_stream(content)
+
+    root, parents = _page_tree(builder, page_nums)
+    for num in page_nums:
+        builder.set(num, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %d 0 R "
+                         b"/Contents %d 0 R >>" % (parents[num], PAGE_W, PAGE_H, resource_nums[num], content_nums[num]))
+    builder.set(catalog, b"<< /Type /Catalog /Pages %d 0 R >>" % root)
+    builder.write(path, catalog, xref)
+
+    if kind == "incremental":
+        for revision in range(1, 4):
+            _append_update(path, builder, page_nums, parents, resources, revision, catalog)
+
+
+def _append_update(path, builder, page_nums, parents, resources, revision, catalog):
+    """
+    Appends one incremental update that replaces the content stream of every
+    tenth page, the way an annotating viewer saves edits.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    prev = int(data[data.rindex(b"startxref") + 9:].split()[0])
+
+    entries = []
+    with open(path, "ab") as f:
+        touched = sorted({(i + revision - 1) % len(page_nums) for i in range(0, len(page_nums), 10)})
+        for page_index in touched:
+            num = page_nums[page_index]
+            content = zlib.compress(_text_content(page_index + 1) + b"\n%% revision %d" % revision)
+            content_num = len(builder.bodies) + 1
+            builder.bodies.append(b"")
+            entries.append((content_num, f.tell()))
+            f.write(b"%d 0 obj\n<< /Length %d /Filter /FlateDecode >>\nstream\n" % (content_num, len(content))
+                    + content + b"\nendstream\nendobj\n")
+            entries.append((num, f.tell()))
+            f.write(b"%d 0 obj\n<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] /Resources %d 0 R "
+                    b"/Contents %d 0 R >>\nendobj\n"
+                    % (num, parents[num], PAGE_W, PAGE_H, resources, content_num))
+
+        startxref = f.tell()
+        f.write(b"xref\n0 1\n0000000000 65535 f \n")
+        for num, offset in sorted(entries):
+            f.write(b"%d 1\n%010d 00000 n \n" % (num, offset))
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R /Prev %d >>\nstartxref\n%d\n%%%%EOF\n"
+                % (len(builder.bodies) + 1, catalog, prev, startxref))
+
+
+def corpus_path(corpus_dir, kind, pages, xref="table"):
+    """
+    Returns the path of a corpus file, generating it on first use.
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    suffix = "" if xref == "table" else f"-{xref}"
+    path = os.path.join(corpus_dir, f"{kind}-{pages}{suffix}.pdf")
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        build_pdf(tmp_path, kind, pages, xref=xref)
+        os.replace(tmp_path, path)
+    return path
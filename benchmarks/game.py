@@ -0,0 +1,78 @@
+"""
+Ghost game simulation benchmark.
+
+Steps the game headless (fixed dt, seeded random, no OpenGL import) with
+NUM_GHOSTS and NUM_EYEBALLS both set to each count in the sweep, and reports
+how many ticks per second update() sustains:
+
+    python benchmarks/game.py                        # 50 .. 100,000 entities
+    python benchmarks/game.py --counts 50 5000 --ticks 600
+    python benchmarks/game.py --json results.json
+
+The player is kept alive (see simulate) so every tick runs the same chase,
+contact and sword code, and each count is capped at --max-seconds so the large
+sweeps finish in bounded time.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GAME_PATH = os.path.join(os.path.dirname(HERE), "Sec10_22101100-22101379-22101539_Spring2025.py")
+DEFAULT_COUNTS = (50, 100, 1000, 10000, 100000)
+
+
+def load_game():
+    os.environ["GHOST_HEADLESS"] = "1"
+    spec = importlib.util.spec_from_file_location("ghost_game", GAME_PATH)
+    game = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(game)
+    return game
+
+
+def measure(game, count, ticks, max_seconds, seed):
+    game.NUM_GHOSTS = game.NUM_EYEBALLS = count
+    start = time.perf_counter()
+    ran, seconds = game.simulate(ticks, seed=seed, invulnerable=True, max_seconds=max_seconds)
+    return {
+        "ticks": ran,
+        "seconds": seconds,
+        "ticks_per_s": ran / seconds,
+        "us_per_entity_tick": seconds / ran / (2 * count) * 1e6,
+        "setup_s": time.perf_counter() - start - seconds,
+        "score": game.score,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark game ticks/sec against entity count.")
+    parser.add_argument("--counts", type=int, nargs="+", default=list(DEFAULT_COUNTS),
+                        help="NUM_GHOSTS/NUM_EYEBALLS values to sweep (default: 50 100 1000 10000 100000)")
+    parser.add_argument("--ticks", type=int, default=1200, help="Ticks per count (default: 1200)")
+    parser.add_argument("--max-seconds", type=float, default=10.0,
+                        help="Stop a count early after this long (default: 10)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for random (default: 0)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to PATH")
+    args = parser.parse_args(argv)
+
+    game = load_game()
+    assert "OpenGL" not in sys.modules, "headless run imported OpenGL"
+
+    results = {}
+    print(f"{'entities':>9} {'ticks':>7} {'seconds':>9} {'ticks/s':>10} {'us/entity':>10} {'score':>8}")
+    for count in args.counts:
+        result = results[count] = measure(game, count, args.ticks, args.max_seconds, args.seed)
+        print(f"{count:>9} {result['ticks']:>7} {result['seconds']:>9.3f} {result['ticks_per_s']:>10.1f} "
+              f"{result['us_per_entity_tick']:>10.3f} {result['score']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Immediate vs retained-mode rendering benchmark.
+
+Renders the ghost game's ground, walls and ghosts off-screen through a Mesa
+EGL pbuffer (software llvmpipe is fine; no window or X server is needed),
+once with the immediate-mode functions and once with the --retained path.
+It checks that both produce the same image and reports ms/frame for each:
+
+    python benchmarks/render.py                      # 50 .. 10,000 ghosts
+    python benchmarks/render.py --counts 50 1000 --frames 20
+    python benchmarks/render.py --save-png /tmp/frames   # keep the frames for inspection
+
+GLUT cannot draw without a window, so glutSolidCube is drawn from the game's
+own CUBE_VERTS table (freeglut's face order) on both paths; eyeballs, the boss,
+the player and the HUD need other GLUT shapes and fonts and are left out.
+"""
+import argparse
+import ctypes
+import importlib.util
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+os.environ.setdefault("EGL_PLATFORM", "surfaceless")
+
+import numpy as np  # noqa: E402
+from OpenGL import EGL  # noqa: E402
+from OpenGL import GL  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GAME_PATH = os.path.join(os.path.dirname(HERE), "Sec10_22101100-22101379-22101539_Spring2025.py")
+DEFAULT_COUNTS = (50, 1000, 10000)
+# Both paths end up with float32 vertices, but through different matrix maths,
+# so a few edge pixels may round the other way.
+MAX_DIFF_FRACTION = 0.002
+
+
+def egl_context(width, height):
+    display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    if not EGL.eglInitialize(display, None, None):
+        raise RuntimeError("eglInitialize failed; is Mesa's EGL installed?")
+    attrs = [EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8,
+             EGL.EGL_BLUE_SIZE, 8, EGL.EGL_DEPTH_SIZE, 24, EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT, EGL.EGL_NONE]
+    config, count = EGL.EGLConfig(), EGL.EGLint()
+    EGL.eglChooseConfig(display, (EGL.EGLint * len(attrs))(*attrs), ctypes.pointer(config), 1, ctypes.pointer(count))
+    if not count.value:
+        raise RuntimeError("no EGL config with a desktop OpenGL pbuffer")
+    size = [EGL.EGL_WIDTH, width, EGL.EGL_HEIGHT, height, EGL.EGL_NONE]
+    surface = EGL.eglCreatePbufferSurface(display, config, (EGL.EGLint * len(size))(*size))
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    EGL.eglMakeCurrent(display, surface, surface, context)
+    return GL.glGetString(GL.GL_RENDERER).decode()
+
+
+def load_game():
+    os.environ.pop("GHOST_HEADLESS", None)
+    spec = importlib.util.spec_from_file_location("ghost_game", GAME_PATH)
+    game = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(game)
+
+    cube = game.CUBE_VERTS[:, :3].astype(np.float32)
+
+    def solid_cube(size):
+        GL.glBegin(GL.GL_QUADS)
+        for x, y, z in (cube * size).tolist():
+            GL.glVertex3f(x, y, z)
+        GL.glEnd()
+
+    game.glutSolidCube = solid_cube
+    return game
+
+
+def render(game, retained):
+    GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+    game.setup_camera()
+    if retained:
+        game.draw_static()
+        game.draw_all_ghosts_batched()
+    else:
+        game.draw_ground()
+        game.draw_walls()
+        game.draw_all_ghosts()
+    GL.glFinish()
+
+
+def read_frame(game):
+    data = GL.glReadPixels(0, 0, game.WIN_W, game.WIN_H, GL.GL_RGB, GL.GL_UNSIGNED_BYTE)
+    return np.frombuffer(data, np.uint8).reshape(game.WIN_H, game.WIN_W, 3)[::-1]
+
+
+def time_frames(game, retained, frames):
+    render(game, retained)          # compiles the display list outside the timing
+    start = time.perf_counter()
+    for _ in range(frames):
+        render(game, retained)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def save_png(path, frame):
+    # 8-bit RGB, one unfiltered scanline per row: enough for any image viewer, and no Pillow needed.
+    height, width, _ = frame.shape
+    rows = np.hstack([np.zeros((height, 1), np.uint8), frame.reshape(height, width * 3)])
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+                + chunk(b"IDAT", zlib.compress(rows.tobytes())) + chunk(b"IEND", b""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare immediate and retained-mode rendering off-screen.")
+    parser.add_argument("--counts", type=int, nargs="+", default=list(DEFAULT_COUNTS),
+                        help="NUM_GHOSTS values to render (default: 50 1000 10000)")
+    parser.add_argument("--ticks", type=int, default=240,
+                        help="Simulation ticks before rendering, so ghosts chase, die and respawn (default: 240)")
+    parser.add_argument("--frames", type=int, default=10, help="Frames timed per path (default: 10)")
+    parser.add_argument("--save-png", metavar="DIR", help="Write both frames per count to DIR as PNG files")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to PATH")
+    args = parser.parse_args(argv)
+
+    game = load_game()
+    print(f"Renderer: {egl_context(game.WIN_W, game.WIN_H)}")
+
+    results = {}
+    failed = False
+    print(f"{'ghosts':>8} {'immediate ms':>13} {'retained ms':>12} {'speedup':>8} {'diff px':>8}")
+    for count in args.counts:
+        game.NUM_GHOSTS = count
+        game.simulate(args.ticks, invulnerable=True)
+        game.ghost_visibility = game.GHOST_INVIS_DURATION     # fully visible ghosts
+
+        render(game, False)
+        immediate = read_frame(game)
+        render(game, True)
+        retained = read_frame(game)
+        diff = int(np.count_nonzero(np.any(immediate != retained, axis=2)))
+        if args.save_png:
+            os.makedirs(args.save_png, exist_ok=True)
+            save_png(os.path.join(args.save_png, f"immediate-{count}.png"), immediate)
+            save_png(os.path.join(args.save_png, f"retained-{count}.png"), retained)
+
+        result = results[count] = {
+            "immediate_ms": time_frames(game, False, args.frames),
+            "retained_ms": time_frames(game, True, args.frames),
+            "diff_pixels": diff,
+        }
+        print(f"{count:>8} {result['immediate_ms']:>13.1f} {result['retained_ms']:>12.1f} "
+              f"{result['immediate_ms'] / result['retained_ms']:>7.1f}x {diff:>8}")
+        if diff > MAX_DIFF_FRACTION * game.WIN_W * game.WIN_H:
+            print(f"  retained frame differs from immediate in {diff} pixels")
+            failed = True
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Split throughput benchmarks.
+
+Generates a synthetic corpus (see corpus.py), times split, range extraction
+and burst on each document, and compares pages/sec and peak memory against
+a stored baseline:
+
+    python benchmarks/run.py --save-baseline     # record this machine's numbers
+    python benchmarks/run.py                     # compare; exits 1 on a regression
+    python benchmarks/run.py --full              # include the 10k-50k page documents
+    python benchmarks/run.py --no-compare        # just print the numbers
+
+Comparing without a baseline file is an error (exit 2), so a CI job that lost
+its baseline fails instead of silently passing.
+
+Every measurement runs in a fresh spawned process so peak RSS belongs to that
+one operation and nothing is warmed up by an earlier run.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import corpus  # noqa: E402
+
+QUICK_CASES = [("text", 10), ("text", 1000), ("images", 200), ("shared-font", 1000), ("incremental", 1000)]
+FULL_CASES = QUICK_CASES + [("text", 10000), ("text", 50000), ("images", 2000),
+                            ("shared-font", 10000), ("incremental", 10000)]
+OPERATIONS = ("split", "ranges", "burst")
+BURST_MAX_PAGES = 2000
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_CORPUS = os.path.join(HERE, ".corpus")
+
+
+def _measure(operation, path, pages):
+    import main
+
+    out_dir = tempfile.mkdtemp(prefix="pdf-ninja-bench-")
+    try:
+        start = time.perf_counter()
+        if operation == "split":
+            # One contiguous tenth of the document, taken from the middle.
+            length = max(1, pages // 10)
+            first = (pages - length) // 2 + 1
+            written = main.split_file(path, "{stem}_{start}-{end}.pdf", ranges=f"{first}-{first + length - 1}",
+                                      output_dir=out_dir)
+            pages_out = length
+        elif operation == "ranges":
+            written = main.split_file(path, "{stem}_{start}-{end}.pdf", every=max(1, pages // 10), output_dir=out_dir)
+            pages_out = pages
+        else:
+            written = main.burst_pdf(path, output_dir=out_dir, jobs=1)
+            pages_out = pages
+        seconds = time.perf_counter() - start
+        bytes_out = sum(os.path.getsize(p) for p in written)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    return {"seconds": seconds, "pages": pages_out, "bytes_out": bytes_out, "peak_rss": main.peak_rss()}
+
+
+def measure(operation, path, pages, repeat):
+    """
+    Runs one operation `repeat` times, each in a fresh process, and keeps the fastest run.
+    """
+    context = multiprocessing.get_context("spawn")
+    runs = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            runs.append(pool.submit(_measure, operation, path, pages).result())
+    best = min(runs, key=lambda run: run["seconds"])
+    return {
+        "seconds": best["seconds"],
+        "pages_per_s": best["pages"] / best["seconds"],
+        "mb_per_s": best["bytes_out"] / best["seconds"] / 1024 ** 2,
+        "peak_rss_mb": max(run["peak_rss"] for run in runs) / 1024 ** 2,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns a list of human-readable regressions: throughput more than `tolerance`
+    below the baseline, or peak memory more than `tolerance` above it.
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result["pages_per_s"] < base["pages_per_s"] * (1 - tolerance):
+            regressions.append(f"{key}: {result['pages_per_s']:.0f} pages/s vs baseline {base['pages_per_s']:.0f}")
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{key}: peak {result['peak_rss_mb']:.1f}MB vs baseline {base['peak_rss_mb']:.1f}MB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark split throughput against a stored baseline.")
+    parser.add_argument("--full", action="store_true", help="Include the large (10k-50k page) documents")
+    parser.add_argument("--kinds", nargs="+", choices=corpus.KINDS, help="Only these corpus kinds")
+    parser.add_argument("--ops", nargs="+", choices=OPERATIONS, default=list(OPERATIONS),
+                        help="Operations to time (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest counts")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS, help="Where generated PDFs are kept")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    compare_group = parser.add_mutually_exclusive_group()
+    compare_group.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    compare_group.add_argument("--no-compare", action="store_true",
+                               help="Only report the numbers; do not compare against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown / memory growth before failing (default: 0.25)")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to PATH")
+    args = parser.parse_args(argv)
+
+    if not (args.save_baseline or args.no_compare or os.path.exists(args.baseline)):
+        parser.error(f"no baseline at {args.baseline}; run with --save-baseline first, or pass --no-compare")
+
+    cases = FULL_CASES if args.full else QUICK_CASES
+    if args.kinds:
+        cases = [case for case in cases if case[0] in args.kinds]
+
+    results = {}
+    print(f"{'case':<32} {'seconds':>9} {'pages/s':>10} {'MB/s':>8} {'peak MB':>9}")
+    for kind, pages in cases:
+        path = corpus.corpus_path(args.corpus_dir, kind, pages)
+        for operation in args.ops:
+            if operation == "burst" and pages > BURST_MAX_PAGES:
+                continue
+            key = f"{operation}/{kind}-{pages}"
+            result = results[key] = measure(operation, path, pages, args.repeat)
+            print(f"{key:<32} {result['seconds']:>9.3f} {result['pages_per_s']:>10.0f} "
+                  f"{result['mb_per_s']:>8.1f} {result['peak_rss_mb']:>9.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if args.no_compare:
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nREGRESSION ({len(regressions)} over the {args.tolerance:.0%} tolerance):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions against {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
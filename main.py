@@ -1,59 +1,3824 @@
 import argparse
+import cProfile
+import glob
+import hashlib
+import json
+import mmap
 import os
-from pypdf import PdfReader, PdfWriter
+import re
+import resource
+import signal
+import stat
+import string
+import struct
+import sys
+import time
+import zlib
+from collections import OrderedDict, deque, namedtuple
+from contextlib import ExitStack, contextmanager, nullcontext
+from io import BytesIO
 
+__version__ = "0.1.0"
 
-def split_pdf(file_path, start_page, end_page, output_name):
+# pypdf takes longer to import than many commands take to run, so it is only
+# imported by _import_pypdf() once a PDF is actually opened: --help, argument
+# errors, info and client never load it. The same goes for http.server and
+# the process pool, which are imported where they are used.
+PageObject = PdfReader = PdfWriter = None
+ArrayObject = DictionaryObject = IndirectObject = NameObject = NullObject = StreamObject = None
+IndexedPdfReader = None
+
+# IndexedPdfReader saves and restores private PdfReader state (the xref tables,
+# _startxref, flattened_pages), which pypdf may change in any release. It is
+# only used with the pypdf minor releases it has been checked against (see
+# tests/test_page_index.py); with any other the cache is bypassed.
+PAGE_INDEX_PYPDF = ((6, 6), (6, 20))
+
+
+def _import_pypdf():
+    global PageObject, PdfReader, PdfWriter, IndexedPdfReader
+    global ArrayObject, DictionaryObject, IndirectObject, NameObject, NullObject, StreamObject
+    if PdfReader is not None:
+        return
+    import pypdf
+    from pypdf import PageObject, PdfReader, PdfWriter
+    from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NullObject, StreamObject
+    if page_index_supported(pypdf.__version__):
+        IndexedPdfReader = type("IndexedPdfReader", (PageIndexMixin, PdfReader),
+                                {"__doc__": PageIndexMixin.__doc__})
+
+
+def page_index_supported(version):
+    match = re.match(r"(\d+)\.(\d+)", version)
+    if not match:
+        return False
+    low, high = PAGE_INDEX_PYPDF
+    return low <= (int(match.group(1)), int(match.group(2))) <= high
+
+
+class SplitError(Exception):
+    """Raised for user-facing split errors (bad ranges, missing files)."""
+
+
+# "-" as an input path or output name means standard input / output; both are
+# moved in chunks of this size.
+STDIO = "-"
+STDIO_CHUNK = 1024 ** 2
+
+
+SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2,
+              "G": 1024 ** 3, "GB": 1024 ** 3}
+
+
+def parse_size(text):
+    """
+    Parses a human size such as "512MB", "1.5G" or "4096" into bytes (binary units).
+    """
+    value = text.strip().upper()
+    number = value.rstrip("KMGB")
+    unit = value[len(number):]
+    try:
+        size = int(float(number) * SIZE_UNITS[unit])
+    except (KeyError, ValueError):
+        raise argparse.ArgumentTypeError(f"invalid size '{text}' (use e.g. 512MB, 2G)")
+    if size <= 0:
+        raise argparse.ArgumentTypeError(f"size must be positive: '{text}'")
+    return size
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def current_rss():
+    """
+    Returns the memory this process holds in bytes: its anonymous resident
+    pages, so that pages of a file mapped with --mmap, which the kernel can
+    drop and re-read at will, do not count against --max-memory.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("RssAnon:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    # No procfs (macOS, BSD): fall back to the peak total RSS, which is reported in
+    # bytes on macOS and kilobytes everywhere else.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def check_memory(max_memory):
+    if max_memory is None:
+        return
+    rss = current_rss()
+    if rss > max_memory:
+        raise SplitError(f"Memory limit exceeded: {format_size(rss)} in use, "
+                         f"limit is {format_size(max_memory)}.")
+
+
+# ---------------------------------------------------------------------------
+# Run statistics
+# ---------------------------------------------------------------------------
+def read_io_bytes():
+    """
+    Returns the bytes this process has read through read() calls so far, or None
+    where /proc is not available. Pages faulted in through --mmap are not counted.
+    """
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RunStats:
+    """
+    Collects wall and CPU time per phase plus page/byte counters for --stats.
+    Worker processes collect their own RunStats and send as_dict() back to be merged.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = {"files": 0, "pages": 0, "source_bytes": 0, "bytes_written": 0, "skipped": 0}
+        self.worker_cpu = 0.0
+        self.worker_bytes_read = 0
+        self.worker_peak_rss = 0
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.start_read = read_io_bytes()
+
+    @contextmanager
+    def phase(self, name):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            totals = self.phases.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += time.perf_counter() - wall
+            totals[1] += time.process_time() - cpu
+            totals[2] += 1
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.counters[key] += value
+
+    def merge(self, data):
+        for name, phase in data["phases"].items():
+            totals = self.phases.setdefault(name, [0.0, 0.0, 0])
+            totals[0] += phase["wall_s"]
+            totals[1] += phase["cpu_s"]
+            totals[2] += phase["calls"]
+        for key in self.counters:
+            self.counters[key] += data[key]
+        self.worker_cpu += data["cpu_s"]
+        self.worker_bytes_read += data["bytes_read"] or 0
+        self.worker_peak_rss = max(self.worker_peak_rss, data["peak_rss_bytes"])
+
+    def as_dict(self):
+        bytes_read = read_io_bytes()
+        if bytes_read is not None and self.start_read is not None:
+            bytes_read = bytes_read - self.start_read + self.worker_bytes_read
+        return {
+            "wall_s": time.perf_counter() - self.start_wall,
+            "cpu_s": time.process_time() - self.start_cpu + self.worker_cpu,
+            "phases": {name: {"wall_s": wall, "cpu_s": cpu, "calls": calls}
+                       for name, (wall, cpu, calls) in self.phases.items()},
+            **self.counters,
+            "bytes_read": bytes_read,
+            "peak_rss_bytes": max(peak_rss(), self.worker_peak_rss),
+        }
+
+
+# Active collector for this process; None unless --stats is on.
+_stats = None
+
+
+def timed(name):
+    return _stats.phase(name) if _stats is not None else nullcontext()
+
+
+def count(**counts):
+    if _stats is not None:
+        _stats.add(**counts)
+
+
+def _start_worker_stats(enabled):
+    global _stats
+    _stats = RunStats() if enabled else None
+
+
+def _take_worker_stats():
+    # Hands the stats gathered so far back to the parent and starts a fresh collector.
+    global _stats
+    if _stats is None:
+        return None
+    data = _stats.as_dict()
+    _stats = RunStats()
+    return data
+
+
+# ---------------------------------------------------------------------------
+# Page-index cache
+# ---------------------------------------------------------------------------
+INDEX_VERSION = 1
+INHERITABLE_PAGE_ATTRIBUTES = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pdf-ninja")
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path, data):
+    # Workers in a batch may share the cache, so never leave a half-written file behind.
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class PageIndexMixin:
+    """
+    PdfReader that can be primed with a cached page index (mixed into
+    PdfReader as IndexedPdfReader by _import_pypdf).
+
+    With an index the xref/trailer parse and the page-tree walk are skipped:
+    the xref tables are restored from the cache, the page count comes straight
+    from it, and each page is resolved on first access from its stored object
+    number (inheriting /Resources, /MediaBox etc. from its /Parent chain just
+    like pypdf's own flattening does).
+    """
+
+    def __init__(self, stream, index=None):
+        self._index = index
+        self._indexed_pages = {}
+        super().__init__(stream)
+
+    def read(self, stream):
+        if self._index is None:
+            return super().read(stream)
+
+        index = self._index
+        self._startxref = index["startxref"]
+        self.xref_index = index["xref_index"]
+        self.xref = {int(gen): {int(idnum): offset for idnum, offset in entries.items()}
+                     for gen, entries in index["xref"].items()}
+        self.xref_free_entry = {int(gen): {int(idnum): free for idnum, free in entries.items()}
+                                for gen, entries in index["xref_free"].items()}
+        self.xref_objStm = {int(idnum): tuple(location) for idnum, location in index["xref_objstm"].items()}
+        self.trailer = DictionaryObject.read_from_stream(BytesIO(index["trailer"].encode("latin-1")), self)
+
+    def get_num_pages(self):
+        if self._index is None or self.flattened_pages is not None:
+            return super().get_num_pages()
+        return len(self._index["pages"])
+
+    def get_page(self, page_number):
+        if self._index is None or self.flattened_pages is not None:
+            return super().get_page(page_number)
+
+        page = self._indexed_pages.get(page_number)
+        if page is None:
+            idnum, generation = self._index["pages"][page_number]
+            reference = IndirectObject(idnum, generation, self)
+            page = PageObject(self, reference)
+            page.update(reference.get_object())
+
+            parent = page.get("/Parent")
+            while parent is not None:
+                parent = parent.get_object()
+                for attr in INHERITABLE_PAGE_ATTRIBUTES:
+                    if attr not in page and attr in parent:
+                        page[NameObject(attr)] = parent[attr]
+                parent = parent.get("/Parent")
+            self._indexed_pages[page_number] = page
+        return page
+
+
+def build_page_index(reader, size, sha256):
+    """
+    Captures what IndexedPdfReader needs to reopen this document without parsing
+    its xref or page tree. Returns None for documents that cannot be indexed.
+    """
+    if reader.is_encrypted:
+        return None
+
+    pages = []
+    for page in reader.pages:
+        if page.indirect_reference is None:
+            return None
+        pages.append((page.indirect_reference.idnum, page.indirect_reference.generation))
+
+    trailer = BytesIO()
+    reader.trailer.write_to_stream(trailer)
+    return {
+        "version": INDEX_VERSION,
+        "size": size,
+        "sha256": sha256,
+        "startxref": reader._startxref,
+        "xref_index": reader.xref_index,
+        "xref": {gen: entries for gen, entries in reader.xref.items()},
+        "xref_free": {gen: entries for gen, entries in reader.xref_free_entry.items()},
+        "xref_objstm": {idnum: list(location) for idnum, location in reader.xref_objStm.items()},
+        "trailer": trailer.getvalue().decode("latin-1"),
+        "pages": pages,
+    }
+
+
+class PageIndexCache:
+    """
+    On-disk cache of page indexes.
+
+    Indexes are stored by content hash under <cache_dir>/index. A small record
+    per source path under <cache_dir>/paths remembers the size, mtime and hash
+    last seen for that path, so a repeat run only needs a stat to find its
+    index; the file is re-hashed only when its size or mtime changes. Entries
+    are evicted least-recently-used first once the index directory grows past
+    max_bytes.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=64 * 1024 ** 2):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _index_path(self, sha256):
+        return os.path.join(self.cache_dir, "index", sha256 + ".json")
+
+    def _record_path(self, file_path):
+        key = hashlib.sha1(os.path.abspath(file_path).encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.cache_dir, "paths", key + ".json")
+
+    def lookup(self, file_path):
+        """
+        Returns (index, sha256). index is None on a miss; sha256 is None when the
+        path record was still current, so callers only hash when they must.
+        """
+        st = os.stat(file_path)
+        record_path = self._record_path(file_path)
+        sha256 = None
+        try:
+            with open(record_path) as f:
+                record = json.load(f)
+            if record["size"] == st.st_size and record["mtime_ns"] == st.st_mtime_ns:
+                sha256 = record["sha256"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        fresh = sha256 is not None
+        if not fresh:
+            sha256 = file_sha256(file_path)
+            os.makedirs(os.path.dirname(record_path), exist_ok=True)
+            _write_json_atomic(record_path, {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256})
+
+        index_path = self._index_path(sha256)
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None, sha256
+        if index.get("version") != INDEX_VERSION or index.get("size") != st.st_size:
+            return None, sha256
+
+        # Touch the entry so eviction sees it as recently used.
+        try:
+            os.utime(index_path)
+        except OSError:
+            pass
+        return index, sha256
+
+    def store(self, index):
+        index_path = self._index_path(index["sha256"])
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        _write_json_atomic(index_path, index)
+        self.evict()
+
+    def evict(self):
+        index_dir = os.path.join(self.cache_dir, "index")
+        entries = []
+        for entry in os.scandir(index_dir):
+            if entry.name.endswith(".json"):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+def _load_reader(source, file_path, cache, size=None):
+    count(files=1, source_bytes=os.path.getsize(file_path) if size is None else size)
+    with timed("open"):
+        return _open_reader(source, file_path, cache)
+
+
+def _open_reader(source, file_path, cache):
+    _import_pypdf()
+    if cache is None or IndexedPdfReader is None:
+        return PdfReader(source)
+
+    index, sha256 = cache.lookup(file_path)
+    if index is not None:
+        return IndexedPdfReader(source, index)
+
+    reader = IndexedPdfReader(source)
+    index = build_page_index(reader, os.path.getsize(file_path), sha256 or file_sha256(file_path))
+    if index is not None:
+        cache.store(index)
+    return reader
+
+
+@contextmanager
+def open_pdf(file_path, use_mmap=False, max_memory=None, cache=None):
+    """
+    Opens a PdfReader for file_path.
+
+    pypdf reads a path fully into memory before parsing. With use_mmap the file
+    is memory-mapped instead, so only the bytes of the objects actually resolved
+    (trailer, xref, page tree and the requested pages) are ever paged in.
+    With a PageIndexCache the xref and page tree come from the cache instead.
+    A file_path of "-" reads the PDF from standard input (see read_stdin);
+    the cache is keyed by path and is not used for it.
+    """
+    if file_path == STDIO:
+        with read_stdin(max_memory) as (source, size):
+            reader = _load_reader(source, file_path, None, size)
+            check_memory(max_memory)
+            yield reader
+        return
+
+    if not os.path.exists(file_path):
+        raise SplitError(f"File '{file_path}' not found.")
+
+    if not use_mmap:
+        if max_memory is not None and os.path.getsize(file_path) > max_memory:
+            raise SplitError(f"'{file_path}' is larger than the memory limit "
+                             f"({format_size(max_memory)}); use --mmap.")
+        yield _load_reader(file_path, file_path, cache)
+        return
+
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            reader = _load_reader(view, file_path, cache)
+            check_memory(max_memory)
+            yield reader
+
+
+@contextmanager
+def read_stdin(max_memory=None):
+    """
+    Buffers standard input for PdfReader, which has to seek, and yields
+    (source, size). Input redirected from a regular file is memory-mapped as it
+    is; a pipe, or a file not at its start, is drained in large reads straight into one in-memory buffer,
+    stopping as soon as it passes max_memory.
+    """
+    fd = sys.stdin.fileno()
+    st = os.fstat(fd)
+    # Only a file read from its start can be mapped whole; one already partly consumed
+    # (e.g. after a header was read off it) is read on from where it stands.
+    if stat.S_ISREG(st.st_mode) and st.st_size and os.lseek(fd, 0, os.SEEK_CUR) == 0:
+        with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as view:
+            yield view, len(view)
+        return
+
+    buf = BytesIO()
+    while chunk := os.read(fd, STDIO_CHUNK):
+        buf.write(chunk)
+        if max_memory is not None and buf.tell() > max_memory:
+            raise SplitError(f"Standard input is larger than the memory limit ({format_size(max_memory)}).")
+    if not buf.tell():
+        raise SplitError("No PDF data on standard input.")
+    size = buf.tell()
+    buf.seek(0)
+    yield buf, size
+
+
+# ---------------------------------------------------------------------------
+# Up-to-date outputs
+# ---------------------------------------------------------------------------
+RECORD_SUFFIX = ".split.json"
+
+
+class OutputRecords:
+    """
+    Make-style skipping for the outputs of one source. Every output gets a
+    sidecar <output>.split.json with the source's SHA-256 (and the size and
+    mtime it was hashed at), the page range, the options that shape the bytes
+    and the tool version. An output is current when its sidecar matches and the
+    output itself is unchanged since it was written. While the source's size
+    and mtime still match this takes only stat calls; otherwise the source is
+    hashed, once per run, and compared. With force nothing is current, but
+    records are still written.
+    """
+
+    def __init__(self, file_path, options, force=False, sha256=None):
+        self.file_path = file_path
+        self.options = options
+        self.force = force
+        st = os.stat(file_path)
+        self.size, self.mtime_ns = st.st_size, st.st_mtime_ns
+        self._sha256 = sha256
+
+    def sha256(self):
+        if self._sha256 is None:
+            self._sha256 = file_sha256(self.file_path)
+        return self._sha256
+
+    def is_current(self, output_path, start_page, end_page):
+        if self.force:
+            return False
+        try:
+            with open(output_path + RECORD_SUFFIX) as f:
+                record = json.load(f)
+            st = os.stat(output_path)
+            source = record["source"]
+            if (record["version"] != __version__ or record["pages"] != [start_page, end_page]
+                    or record["options"] != self.options or source["size"] != self.size
+                    or record["output"] != {"size": st.st_size, "mtime_ns": st.st_mtime_ns}):
+                return False
+            if source["mtime_ns"] != self.mtime_ns:
+                if source["sha256"] != self.sha256():
+                    return False
+                # Touched but not changed: refresh the record so the next run is back to stat calls.
+                self.record(output_path, start_page, end_page)
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        count(skipped=1)
+        return True
+
+    def record(self, output_path, start_page, end_page):
+        st = os.stat(output_path)
+        _write_json_atomic(output_path + RECORD_SUFFIX, {
+            "version": __version__,
+            "source": {"sha256": self.sha256(), "size": self.size, "mtime_ns": self.mtime_ns},
+            "pages": [start_page, end_page],
+            "options": self.options,
+            "output": {"size": st.st_size, "mtime_ns": st.st_mtime_ns},
+        })
+
+
+def output_records(file_path, optimize=False, passthrough=False, force=False, sha256=None):
+    """
+    The OutputRecords for a split of file_path, or None when reading standard input.
+    """
+    if file_path == STDIO:
+        return None
+    return OutputRecords(file_path, {"optimize": optimize, "passthrough": passthrough}, force, sha256)
+
+
+def current_outputs(records, file_path, output_template, ranges=None, every=None, output_dir=None):
+    """
+    For a --ranges/--every split, whose outputs follow from the page count alone:
+    the output paths if every one of them is current, else None. The page count
+    comes from skim_page_count, so an up-to-date source is never parsed by pypdf.
+    """
+    if records is None or records.force:
+        return None
+    total_pages = skim_page_count(file_path)
+    if total_pages is None:
+        return None
+    plan = name_outputs(file_path, output_template, resolve_ranges(total_pages, ranges, every), output_dir)
+    if not all(records.is_current(*output) for output in plan):
+        return None
+    return [output_path for output_path, _, _ in plan]
+
+
+# ---------------------------------------------------------------------------
+# Output optimization
+# ---------------------------------------------------------------------------
+OBJECT_STREAM_SIZE = 200
+
+
+def _references(obj):
+    """
+    Yields every indirect reference held directly by obj, without resolving any of them.
+    """
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, IndirectObject):
+            yield item
+        elif isinstance(item, DictionaryObject):
+            stack.extend(item.values())
+        elif isinstance(item, ArrayObject):
+            stack.extend(item)
+
+
+def _renumber(obj, numbers, pdf):
+    """
+    Rewrites the indirect references held directly by obj according to numbers.
+    """
+    if isinstance(obj, DictionaryObject):
+        items = obj.items()
+    elif isinstance(obj, ArrayObject):
+        items = enumerate(obj)
+    else:
+        return
+    for key, value in list(items):
+        if isinstance(value, IndirectObject):
+            # References to objects missing from the source become null, as readers treat them.
+            number = numbers.get(value.idnum)
+            obj[key] = IndirectObject(number, 0, pdf) if number else NullObject()
+        else:
+            _renumber(value, numbers, pdf)
+
+
+def _serialize(obj):
+    buf = BytesIO()
+    obj.write_to_stream(buf)
+    return buf.getvalue()
+
+
+def optimize_pdf(data):
+    """
+    Rewrites a PDF produced by PdfWriter into a smaller equivalent file:
+
+    - identical stream objects (fonts, images, ICC profiles...) are stored once
+    - objects not reachable from the trailer are dropped
+    - streams without a filter are Flate-compressed
+    - all other objects are packed into compressed object streams, indexed by
+      a cross-reference stream (PDF 1.5)
+    """
+    _import_pypdf()
+    reader = PdfReader(BytesIO(data))
+    objects = {idnum: reader.get_object(idnum) for idnum in reader.xref.get(0, {})}
+
+    # Point every duplicate stream at the first copy with the same bytes.
+    canonical = {}
+    seen = {}
+    for idnum in sorted(objects):
+        obj = objects[idnum]
+        if isinstance(obj, StreamObject):
+            digest = hashlib.sha256(_serialize(obj)).digest()
+            canonical[idnum] = seen.setdefault(digest, idnum)
+
+    trailer = DictionaryObject()
+    for key in ("/Root", "/Info", "/ID"):
+        if key in reader.trailer:
+            trailer[NameObject(key)] = reader.trailer.raw_get(key)
+
+    # Keep only what the trailer can reach once duplicates are folded, numbered 1..n.
+    reachable = []
+    pending = [ref.idnum for ref in _references(trailer)]
+    visited = set()
+    while pending:
+        idnum = pending.pop()
+        idnum = canonical.get(idnum, idnum)
+        if idnum in visited or idnum not in objects:
+            continue
+        visited.add(idnum)
+        reachable.append(idnum)
+        pending.extend(ref.idnum for ref in _references(objects[idnum]))
+    numbers = {idnum: new for new, idnum in enumerate(sorted(reachable), 1)}
+    for idnum, target in canonical.items():
+        if target in numbers:
+            numbers[idnum] = numbers[target]
+
+    out = BytesIO()
+    out.write(b"%PDF-1.5\n%\xe2\xe3\xcf\xd3\n")
+    entries = {}
+    packed = []
+    for idnum in sorted(reachable):
+        obj = objects[idnum]
+        _renumber(obj, numbers, reader)
+        if isinstance(obj, StreamObject):
+            if "/Filter" not in obj:
+                obj = obj.flate_encode()
+            entries[numbers[idnum]] = (1, out.tell(), 0)
+            out.write(b"%d 0 obj\n" % numbers[idnum] + _serialize(obj) + b"\nendobj\n")
+        else:
+            packed.append((numbers[idnum], _serialize(obj)))
+    _renumber(trailer, numbers, reader)
+
+    next_number = len(reachable) + 1
+    for start in range(0, len(packed), OBJECT_STREAM_SIZE):
+        chunk = packed[start:start + OBJECT_STREAM_SIZE]
+        header, body = [], BytesIO()
+        for index, (number, serialized) in enumerate(chunk):
+            header.append(b"%d %d" % (number, body.tell()))
+            body.write(serialized + b"\n")
+            entries[number] = (2, next_number, index)
+        header = b" ".join(header) + b"\n"
+        payload = zlib.compress(header + body.getvalue())
+        entries[next_number] = (1, out.tell(), 0)
+        out.write(b"%d 0 obj\n<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode /Length %d >>\nstream\n"
+                  % (next_number, len(chunk), len(header), len(payload)) + payload + b"\nendstream\nendobj\n")
+        next_number += 1
+
+    xref_number = next_number
+    entries[xref_number] = (1, out.tell(), 0)
+    rows = [struct.pack(">BIH", 0, 0, 65535)]
+    for number in range(1, xref_number + 1):
+        kind, field2, field3 = entries.get(number, (0, 0, 0))
+        rows.append(struct.pack(">BIH", kind, field2, field3))
+    payload = zlib.compress(b"".join(rows))
+    trailer_entries = _serialize(trailer)[2:-2].strip()
+    out.write(b"%d 0 obj\n<< /Type /XRef /Size %d /W [1 4 2] /Filter /FlateDecode /Length %d %s >>\nstream\n"
+              % (xref_number, xref_number + 1, len(payload), trailer_entries) + payload + b"\nendstream\nendobj\n")
+    out.write(b"startxref\n%d\n%%%%EOF\n" % entries[xref_number][1])
+    return out.getvalue()
+
+
+# ---------------------------------------------------------------------------
+# Raw passthrough copy
+# ---------------------------------------------------------------------------
+PDF_TOKEN = re.compile(rb"""
+    (?P<space>[\x00\t\n\x0c\r ]+)
+  | (?P<comment>%[^\r\n]*)
+  | (?P<dict><<|>>)
+  | (?P<hex><[^>]*>)
+  | (?P<string>\()
+  | (?P<delim>[\[\]{}])
+  | (?P<name>/[^\x00\t\n\x0c\r ()<>\[\]{}/%]*)
+  | (?P<word>[^\x00\t\n\x0c\r ()<>\[\]{}/%]+)
+""", re.VERBOSE)
+OBJ_HEADER = re.compile(rb"\s*(\d+)\s+(\d+)\s+obj")
+STREAM_LENGTH = re.compile(rb"/Length\s+(\d+)(?:\s+(\d+)\s+R)?")
+END_STREAM = re.compile(rb"endstream")
+
+
+def _skip_string(data, pos):
+    # pos is just past the opening parenthesis; returns the position after the closing one.
+    depth, size = 1, len(data)
+    while depth:
+        if pos >= size:
+            raise SplitError("Unterminated string at the end of the data.")
+        byte = data[pos]
+        if byte == 0x5C:  # backslash escapes the next byte
+            pos += 1
+        elif byte == 0x28:
+            depth += 1
+        elif byte == 0x29:
+            depth -= 1
+        pos += 1
+    return pos
+
+
+def scan_object(data, pos):
+    """
+    Tokenizes one object body starting at pos, skipping strings and comments.
+    Returns (references, end, keyword) where references are (start, end, idnum,
+    generation) spans of "n g R" tokens and keyword is b"endobj", b"stream" or
+    None if the data ran out first; end is where that keyword starts.
+    """
+    references = []
+    numbers = []
+    size = len(data)
+    while pos < size:
+        match = PDF_TOKEN.match(data, pos)
+        if match is None:
+            pos += 1
+            continue
+        kind = match.lastgroup
+        if kind == "string":
+            pos = _skip_string(data, match.end())
+            numbers.clear()
+            continue
+        if kind in ("space", "comment"):
+            pos = match.end()
+            continue
+        token = match.group()
+        if kind == "word":
+            if token in (b"endobj", b"stream"):
+                return references, pos, bytes(token)
+            if token == b"R" and len(numbers) >= 2:
+                (start, idnum), (_, generation) = numbers[-2], numbers[-1]
+                references.append((start, match.end(), idnum, generation))
+                numbers.clear()
+            elif token.isdigit():
+                numbers.append((pos, int(token)))
+                del numbers[:-2]
+            else:
+                numbers.clear()
+        else:
+            numbers.clear()
+        pos = match.end()
+    return references, pos, None
+
+
+def _object_stream_entries(reader, stream_number, cache):
+    # Decompressed bytes and per-object (start, end) spans of an object stream, decoded once per output.
+    if stream_number not in cache:
+        stream = reader.get_object(stream_number)
+        data = stream.get_data()
+        first, count = stream["/First"], stream["/N"]
+        header = data[:first].split()
+        starts = sorted((first + int(header[i + 1]), int(header[i])) for i in range(0, 2 * count, 2))
+        spans = {idnum: (start, starts[n + 1][0] if n + 1 < len(starts) else len(data))
+                 for n, (start, idnum) in enumerate(starts)}
+        cache[stream_number] = (data, spans)
+    return cache[stream_number]
+
+
+class RawCopier:
+    """
+    Copies objects out of the source file byte-for-byte, rewriting only their
+    "n g R" references. Content streams, fonts and images are never decoded.
+    """
+
+    def __init__(self, reader, source):
+        self.reader = reader
+        self.source = source
+        self.object_streams = {}
+        self.measured = {}
+
+    def _locate(self, idnum, generation):
+        # (bytes before any stream data, references, (data_start, data_end) or None), or None if missing.
+        location = self.reader.xref_objStm.get(idnum)
+        if location is not None:
+            data, spans = _object_stream_entries(self.reader, location[0], self.object_streams)
+            if idnum not in spans:
+                return None
+            start, end = spans[idnum]
+            body = data[start:end]
+            references, _, _ = scan_object(body, 0)
+            return body, references, None
+
+        offset = self.reader.xref.get(generation, {}).get(idnum)
+        if offset is None:
+            return None
+        header = OBJ_HEADER.match(self.source, offset)
+        if header is None:
+            raise SplitError(f"Object {idnum} {generation} is not where the xref says it is.")
+        start = header.end()
+        while self.source[start:start + 1] in b" \t\r\n\x0c\x00":
+            start += 1
+        references, end, keyword = scan_object(self.source, start)
+        references = [(s - start, e - start, n, g) for s, e, n, g in references]
+        if keyword != b"stream":
+            return bytes(self.source[start:end]).rstrip(), references, None
+
+        # Stream: keep the dictionary and the encoded data exactly as they are.
+        data_start = end + len(b"stream")
+        if self.source[data_start:data_start + 2] == b"\r\n":
+            data_start += 2
+        elif self.source[data_start:data_start + 1] in (b"\n", b"\r"):
+            data_start += 1
+        length = STREAM_LENGTH.search(bytes(self.source[start:end]))
+        if length is None:
+            raise SplitError(f"Stream object {idnum} has no /Length.")
+        if length.group(2) is None:
+            data_length = int(length.group(1))
+        else:
+            data_length = int(self.reader.get_object(IndirectObject(int(length.group(1)), int(length.group(2)),
+                                                                    self.reader)))
+        data_end = data_start + data_length
+        if not bytes(self.source[data_end:data_end + 20]).lstrip().startswith(b"endstream"):
+            data_end = END_STREAM.search(self.source, data_start).start()
+        return bytes(self.source[start:end]).rstrip(), references, (data_start, data_end)
+
+    def body(self, idnum, generation):
+        """
+        Returns (bytes, references) for one source object, or None if it does not exist.
+        """
+        found = self._locate(idnum, generation)
+        if found is None:
+            return None
+        head, references, data = found
+        if data is None:
+            return head, references
+        return head + b"\nstream\n" + bytes(self.source[data[0]:data[1]]) + b"\nendstream", references
+
+    def measure(self, idnum, generation):
+        """
+        Returns (copied size in bytes, referenced (idnum, generation) pairs) for
+        one source object without reading its stream data, or None if it does
+        not exist. Results are memoized per copier.
+        """
+        ref = (idnum, generation)
+        if ref not in self.measured:
+            found = self._locate(idnum, generation)
+            if found is None:
+                self.measured[ref] = None
+            else:
+                head, references, data = found
+                size = len(head) + (data[1] - data[0] + len(b"\nstream\n\nendstream") if data else 0)
+                self.measured[ref] = (size, [(n, g) for _, _, n, g in references])
+        return self.measured[ref]
+
+
+def _drop_key(body, key):
+    # body, a dictionary, without its own `key` entry; nested dictionaries and strings are left alone.
+    kind, token, pos = _next_token(body, 0)
+    if kind != "dict" or token != b"<<":
+        raise SplitError("Expected a dictionary.")
+    while True:
+        kind, token, after = _next_token(body, pos)
+        if kind == "dict" and token == b">>":
+            return body
+        if kind != "name":
+            raise SplitError(f"Expected a name at offset {pos}.")
+        _, end = parse_value(body, after)
+        if token == key:
+            return body[:after - len(token)] + body[end:]
+        pos = end
+
+
+def _rewrite(body, references, numbers):
+    parts, last = [], 0
+    for start, end, idnum, generation in references:
+        number = numbers.get((idnum, generation))
+        parts.append(body[last:start])
+        parts.append(b"%d 0 R" % number if number else b"null")
+        last = end
+    parts.append(body[last:])
+    return b"".join(parts)
+
+
+def _page_references(reader):
+    if isinstance(reader, PageIndexMixin) and reader._index is not None:
+        return {tuple(ref) for ref in reader._index["pages"]}
+    return {(page.indirect_reference.idnum, page.indirect_reference.generation) for page in reader.pages}
+
+
+def copy_pages_raw(reader, indices, f):
+    """
+    Writes the given 0-indexed pages to f by copying their objects straight
+    from the source bytes. Only the page dictionaries are touched: /Parent is
+    pointed at the new page tree and inherited attributes are written into
+    them. References to pages outside the selection become null.
+    """
+    if reader.is_encrypted:
+        raise SplitError("--passthrough cannot copy objects out of an encrypted PDF.")
+
+    stream = reader.stream
+    source = stream.getbuffer() if isinstance(stream, BytesIO) else stream
+    try:
+        copier = RawCopier(reader, source)
+        all_pages = _page_references(reader)
+
+        with timed("lookup"):
+            selected = []
+            for i in indices:
+                page = reader.pages[i]
+                if page.indirect_reference is None:
+                    raise SplitError("--passthrough needs page objects that are indirect objects.")
+                selected.append((page, (page.indirect_reference.idnum, page.indirect_reference.generation)))
+
+            # Other pages and the old page tree are never copied; references to them become null.
+            skipped = set(all_pages)
+            for _, ref in selected:
+                node = reader.get_object(IndirectObject(*ref, reader))
+                parent = node.raw_get("/Parent") if "/Parent" in node else None
+                while isinstance(parent, IndirectObject) and (parent.idnum, parent.generation) not in skipped:
+                    skipped.add((parent.idnum, parent.generation))
+                    node = parent.get_object()
+                    parent = node.raw_get("/Parent") if "/Parent" in node else None
+
+        # Numbers 1 and 2 are the new catalog and page tree root.
+        numbers = {}
+        order = []
+        for _, ref in selected:
+            if ref not in numbers:
+                numbers[ref] = len(numbers) + 3
+                order.append(ref)
+        bodies = {}
+        with timed("copy"):
+            pending = list(order)
+            while pending:
+                ref = pending.pop()
+                found = copier.body(*ref)
+                if found is None:
+                    continue
+                bodies[ref] = found
+                for _, _, idnum, generation in found[1]:
+                    target = (idnum, generation)
+                    if target in numbers or target in skipped:
+                        continue
+                    numbers[target] = len(numbers) + 3
+                    order.append(target)
+                    pending.append(target)
+
+        with timed("write"):
+            start = f.tell()
+            header = bytes(source[:8]) if bytes(source[:5]) == b"%PDF-" else b"%PDF-1.7"
+            f.write(header + b"\n%\xe2\xe3\xcf\xd3\n")
+            offsets = {}
+            kids = []
+            for page, ref in selected:
+                body, references = bodies[ref]
+                body = _rewrite(body, references, numbers)
+                body = _drop_key(body, b"/Parent").rstrip()
+                own = reader.get_object(page.indirect_reference)
+                extra = [b"/Parent 2 0 R"]
+                for attr in INHERITABLE_PAGE_ATTRIBUTES:
+                    if attr not in own and attr in page:
+                        value = BytesIO()
+                        page.raw_get(attr).write_to_stream(value)
+                        value_references, _, _ = scan_object(value.getvalue(), 0)
+                        extra.append(attr.encode() + b" " + _rewrite(value.getvalue(), value_references, numbers))
+                body = body[:-2] + b" " + b" ".join(extra) + b" >>"
+                offsets[numbers[ref]] = f.tell() - start
+                f.write(b"%d 0 obj\n" % numbers[ref] + body + b"\nendobj\n")
+                kids.append(numbers[ref])
+
+            for ref in order:
+                number = numbers.get(ref)
+                if number is None or number in offsets or ref not in bodies:
+                    continue
+                body, references = bodies[ref]
+                offsets[number] = f.tell() - start
+                f.write(b"%d 0 obj\n" % number + _rewrite(body, references, numbers) + b"\nendobj\n")
+
+            offsets[1] = f.tell() - start
+            f.write(b"1 0 obj\n<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+            offsets[2] = f.tell() - start
+            f.write(b"2 0 obj\n<< /Type /Pages /Kids [%s] /Count %d >>\nendobj\n"
+                    % (b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)))
+
+            size = max(offsets) + 1
+            xref = f.tell() - start
+            f.write(b"xref\n0 %d\n0000000000 65535 f \n" % size)
+            f.write(b"".join(b"%010d 00000 n \n" % offsets[n] if n in offsets else b"0000000000 65535 f \n"
+                             for n in range(1, size)))
+            f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref))
+        return len(kids)
+    finally:
+        if isinstance(source, memoryview):
+            source.release()
+
+
+# Fixed costs of an output that the source objects do not account for: the
+# header, catalog, page tree root and trailer; per object its
+# "n 0 obj ... endobj" wrapper, xref entry and pypdf's one-key-per-line layout;
+# per page its /Kids entry on top of that.
+PDF_OVERHEAD = 256
+OBJECT_OVERHEAD = 48
+PAGE_OVERHEAD = OBJECT_OVERHEAD + 16
+
+
+def _page_objects(reader, copier, page, skipped):
+    # Estimated bytes of the page dictionary itself, and the size of every object it reaches by reference.
+    ref = page.indirect_reference
+    if ref is None:
+        raise SplitError("--max-size needs page objects that are indirect objects.")
+    own = reader.get_object(ref)
+    parent = own.raw_get("/Parent") if "/Parent" in own else None
+    while isinstance(parent, IndirectObject) and (parent.idnum, parent.generation) not in skipped:
+        skipped.add((parent.idnum, parent.generation))
+        node = parent.get_object()
+        parent = node.raw_get("/Parent") if "/Parent" in node else None
+
+    found = copier.measure(ref.idnum, ref.generation)
+    if found is None:
+        raise SplitError(f"Page object {ref.idnum} {ref.generation} is missing.")
+    size, pending = found[0], list(found[1])
+    for attr in INHERITABLE_PAGE_ATTRIBUTES:
+        if attr not in own and attr in page:
+            value = BytesIO()
+            page.raw_get(attr).write_to_stream(value)
+            references, _, _ = scan_object(value.getvalue(), 0)
+            size += len(attr) + 1 + len(value.getvalue())
+            pending.extend((idnum, generation) for _, _, idnum, generation in references)
+
+    objects = {}
+    while pending:
+        target = pending.pop()
+        if target in objects or target in skipped:
+            continue
+        found = copier.measure(*target)
+        if found is None:
+            continue
+        objects[target] = found[0] + OBJECT_OVERHEAD
+        pending.extend(found[1])
+    return size + PAGE_OVERHEAD, objects
+
+
+def size_ranges(reader, max_size):
+    """
+    Groups consecutive pages into 1-indexed (start, end) ranges whose outputs
+    should each stay under max_size bytes. Each page is sized from the source
+    objects it reaches (contents, resources, fonts, images) as they are stored,
+    without decoding or writing anything, and an object shared by several pages
+    is counted once per output. A page that is over the limit on its own is
+    given an output to itself.
+    """
+    if max_size < 1:
+        raise SplitError("--max-size must be at least one byte.")
+    if reader.is_encrypted:
+        raise SplitError("--max-size cannot measure objects in an encrypted PDF.")
+
+    stream = reader.stream
+    source = stream.getbuffer() if isinstance(stream, BytesIO) else stream
+    try:
+        copier = RawCopier(reader, source)
+        # Pages and the page tree are rebuilt for every output, so references to them are not followed.
+        skipped = set(_page_references(reader))
+        ranges = []
+        first, total, group = 1, PDF_OVERHEAD, set()
+        with timed("estimate"):
+            for number, page in enumerate(reader.pages, 1):
+                own, objects = _page_objects(reader, copier, page, skipped)
+                added = own + sum(size for ref, size in objects.items() if ref not in group)
+                if number > first and total + added > max_size:
+                    ranges.append((first, number - 1))
+                    first, total, group = number, PDF_OVERHEAD, set()
+                    added = own + sum(objects.values())
+                group.update(objects)
+                total += added
+                if number == first and total > max_size:
+                    print(f"Warning: page {number} alone is about {format_size(total)}, "
+                          f"over the {format_size(max_size)} limit.")
+        ranges.append((first, len(reader.pages)))
+        return ranges
+    finally:
+        if isinstance(source, memoryview):
+            source.release()
+
+
+# ---------------------------------------------------------------------------
+# Metadata without pypdf
+# ---------------------------------------------------------------------------
+PdfRef = namedtuple("PdfRef", "idnum generation")
+XREF_SUBSECTION = re.compile(rb"\s*(\d+) +(\d+)[ \t]*(?:\r\n|\r|\n)")
+XREF_ENTRY = re.compile(rb"(\d{10}) (\d{5}) ([nf])")
+TRAILER_KEYWORD = re.compile(rb"\s*trailer")
+STRING_ESCAPE = re.compile(rb"\\(\r\n|[\r\n]|[0-7]{1,3}|.)", re.DOTALL)
+STRING_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f", b"\r\n": b"", b"\r": b"", b"\n": b""}
+INFO_KEYS = ("/Title", "/Author", "/Subject", "/Keywords", "/Creator", "/Producer", "/CreationDate", "/ModDate")
+
+
+def _next_token(data, pos):
+    # (kind, token, end) of the next significant PDF token, or (None, b"", pos) when there is none.
+    while True:
+        match = PDF_TOKEN.match(data, pos)
+        if match is None:
+            return None, b"", pos
+        if match.lastgroup not in ("space", "comment"):
+            return match.lastgroup, match.group(), match.end()
+        pos = match.end()
+
+
+def _unescape(raw):
+    def replace(match):
+        escape = match.group(1)
+        if escape in STRING_ESCAPES:
+            return STRING_ESCAPES[escape]
+        if escape[:1].isdigit():
+            return bytes([int(escape, 8) & 0xFF])
+        return escape
+    return STRING_ESCAPE.sub(replace, raw)
+
+
+def parse_value(data, pos):
+    """
+    Parses one PDF object at pos into plain values: dicts keyed by name
+    ("/Type"), lists, ints and floats, names as str, strings as bytes, PdfRef
+    for "n g R" and True/False/None. Returns (value, end).
+    """
+    kind, token, end = _next_token(data, pos)
+    if kind == "dict" and token == b"<<":
+        result = {}
+        while True:
+            kind, token, after = _next_token(data, end)
+            if kind == "dict" and token == b">>":
+                return result, after
+            if kind != "name":
+                raise SplitError(f"Expected a name at offset {end}.")
+            result[token.decode("latin-1")], end = parse_value(data, after)
+    if kind == "delim" and token == b"[":
+        result = []
+        while True:
+            kind, token, after = _next_token(data, end)
+            if kind == "delim" and token == b"]":
+                return result, after
+            if kind is None:
+                raise SplitError(f"Unterminated array at offset {pos}.")
+            value, end = parse_value(data, end)
+            result.append(value)
+    if kind == "name":
+        return token.decode("latin-1"), end
+    if kind == "string":
+        close = _skip_string(data, end)
+        return _unescape(bytes(data[end:close - 1])), close
+    if kind == "hex":
+        digits = re.sub(rb"\s", b"", token[1:-1])
+        return bytes.fromhex((digits + b"0" * (len(digits) % 2)).decode("ascii")), end
+    if kind == "word":
+        if token in (b"true", b"false"):
+            return token == b"true", end
+        if token == b"null":
+            return None, end
+        if token.isdigit():
+            # "n g R" is a reference; anything else leaves the integer on its own.
+            kind2, token2, end2 = _next_token(data, end)
+            if kind2 == "word" and token2.isdigit():
+                kind3, token3, end3 = _next_token(data, end2)
+                if kind3 == "word" and token3 == b"R":
+                    return PdfRef(int(token), int(token2)), end3
+            return int(token), end
+        try:
+            return (float(token) if b"." in token else int(token)), end
+        except ValueError:
+            pass
+    raise SplitError(f"Cannot parse the PDF object at offset {pos}.")
+
+
+def _png_unpredict(data, columns):
+    # Undoes the PNG "None", "Sub" and "Up" row predictors used by xref and object streams.
+    rows, previous = [], bytearray(columns)
+    for start in range(0, len(data), columns + 1):
+        kind, row = data[start], bytearray(data[start + 1:start + 1 + columns])
+        if kind == 1:
+            for i in range(1, len(row)):
+                row[i] = (row[i] + row[i - 1]) & 0xFF
+        elif kind == 2:
+            for i in range(len(row)):
+                row[i] = (row[i] + previous[i]) & 0xFF
+        elif kind != 0:
+            raise SplitError(f"Unsupported PNG predictor {kind}.")
+        rows.append(bytes(row))
+        previous = row
+    return b"".join(rows)
+
+
+class PdfSkimmer:
+    """
+    Reads individual objects straight through the file's cross-reference
+    data, newest revision first, without parsing anything else: enough to
+    answer "how many pages" and "what is the title" for a file of any size
+    in a few small reads. Raises SplitError for anything it does not handle
+    (damaged xref, unusual filters); callers fall back to pypdf.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.sections = []
+        self.trailer = {}
+        self.object_streams = {}
+
+        tail = bytes(data[-1024:])
+        found = tail.rfind(b"startxref")
+        if found < 0:
+            raise SplitError("No startxref.")
+        offset = int(tail[found + 9:].split()[0])
+        seen = set()
+        while isinstance(offset, int) and offset not in seen:
+            seen.add(offset)
+            trailer = self._read_section(offset)
+            if isinstance(trailer.get("/XRefStm"), int):
+                # A hybrid file's stream belongs to the same revision as its table:
+                # it lists the compressed objects the table marks free for older readers.
+                self._read_section(trailer["/XRefStm"])
+                hidden = self.sections.pop()
+                self.sections[-1][1].update(hidden)
+            for key, value in trailer.items():
+                self.trailer.setdefault(key, value)
+            offset = trailer.get("/Prev")
+
+    def _read_section(self, offset):
+        kind, token, pos = _next_token(self.data, offset)
+        if token != b"xref":
+            trailer, stream = self._object_at(offset)
+            if trailer.get("/Type") != "/XRef" or stream is None:
+                raise SplitError(f"No cross-reference data at offset {offset}.")
+            self.sections.append(self._xref_stream_entries(trailer, self._decode(trailer, stream)))
+            return trailer
+
+        subsections = []
+        while True:
+            match = XREF_SUBSECTION.match(self.data, pos)
+            if match is None:
+                break
+            first, n = int(match.group(1)), int(match.group(2))
+            subsections.append((first, n, match.end()))
+            pos = match.end() + 20 * n
+        match = TRAILER_KEYWORD.match(self.data, pos)
+        if match is None:
+            raise SplitError(f"No trailer after the xref table at offset {offset}.")
+        self.sections.append((subsections, {}))
+        return parse_value(self.data, match.end())[0]
+
+    def _xref_stream_entries(self, trailer, data):
+        widths = trailer["/W"]
+        index = trailer.get("/Index") or [0, trailer["/Size"]]
+        entries, pos, size = {}, 0, sum(widths)
+        for first, n in zip(index[::2], index[1::2]):
+            for idnum in range(first, first + n):
+                fields, field_pos = [], pos
+                for width in widths:
+                    fields.append(int.from_bytes(data[field_pos:field_pos + width], "big"))
+                    field_pos += width
+                entries[idnum] = (fields[0] if widths[0] else 1, fields[1], fields[2])
+                pos += size
+        return entries
+
+    def _lookup(self, idnum):
+        # (1, offset, generation), (2, object stream, index) or None for a free or missing object.
+        for section in self.sections:
+            if isinstance(section, dict):
+                if idnum in section:
+                    entry = section[idnum]
+                    return entry if entry[0] in (1, 2) else None
+                continue
+            subsections, hidden = section
+            for first, n, pos in subsections:
+                if first <= idnum < first + n:
+                    match = XREF_ENTRY.match(self.data, pos + 20 * (idnum - first))
+                    if match is None:
+                        raise SplitError(f"Malformed xref entry for object {idnum}.")
+                    if match.group(3) == b"n":
+                        return 1, int(match.group(1)), int(match.group(2))
+                    break
+            else:
+                if idnum not in hidden:
+                    continue
+            # Free in the table (or not in it at all): the revision's /XRefStm entry wins.
+            entry = hidden.get(idnum)
+            return entry if entry is not None and entry[0] in (1, 2) else None
+        return None
+
+    def _object_at(self, offset):
+        header = OBJ_HEADER.match(self.data, offset)
+        if header is None:
+            raise SplitError(f"No object at offset {offset}.")
+        value, end = parse_value(self.data, header.end())
+        kind, token, pos = _next_token(self.data, end)
+        if token != b"stream":
+            return value, None
+        if self.data[pos:pos + 2] == b"\r\n":
+            pos += 2
+        elif self.data[pos:pos + 1] in (b"\n", b"\r"):
+            pos += 1
+        length = self.resolve(value["/Length"])
+        return value, bytes(self.data[pos:pos + length])
+
+    def _decode(self, dictionary, data):
+        filters = dictionary.get("/Filter") or []
+        parms = dictionary.get("/DecodeParms") or {}
+        if not isinstance(filters, list):
+            filters, parms = [filters], [parms]
+        if filters not in ([], ["/FlateDecode"]):
+            raise SplitError(f"Unsupported stream filter {filters}.")
+        if filters:
+            data = zlib.decompress(data)
+            parms = self.resolve(parms[0]) or {}
+            if parms.get("/Predictor", 1) >= 10:
+                data = _png_unpredict(data, parms.get("/Columns", 1))
+            elif parms.get("/Predictor", 1) != 1:
+                raise SplitError("Unsupported TIFF predictor.")
+        return data
+
+    def resolve(self, value):
+        """
+        Follows a PdfRef to the object it names (None if it is free or missing); other values pass through.
+        """
+        if not isinstance(value, PdfRef):
+            return value
+        entry = self._lookup(value.idnum)
+        if entry is None:
+            return None
+        if entry[0] == 1:
+            return self._object_at(entry[1])[0]
+
+        stream_number, position = entry[1], entry[2]
+        if stream_number not in self.object_streams:
+            location = self._lookup(stream_number)
+            if location is None or location[0] != 1:
+                raise SplitError(f"Object stream {stream_number} is missing.")
+            dictionary, stream = self._object_at(location[1])
+            data = self._decode(dictionary, stream)
+            header = data[:dictionary["/First"]].split()
+            offsets = {int(header[i]): dictionary["/First"] + int(header[i + 1]) for i in range(0, len(header), 2)}
+            self.object_streams[stream_number] = (data, offsets)
+        data, offsets = self.object_streams[stream_number]
+        if value.idnum not in offsets:
+            return None
+        return parse_value(data, offsets[value.idnum])[0]
+
+
+def _text(value):
+    if not isinstance(value, bytes):
+        return value
+    if value[:2] == b"\xfe\xff":
+        return value[2:].decode("utf-16-be", "replace")
+    if value[:3] == b"\xef\xbb\xbf":
+        return value[3:].decode("utf-8", "replace")
+    return value.decode("latin-1")
+
+
+def skim_pdf_info(file_path):
+    """
+    Reads the page count, PDF version, encryption flag and document info of a
+    file from its trailer, catalog and root /Pages node only, without pypdf.
+    Raises SplitError (or a parsing error) if the file needs a real parser.
+    """
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            skimmer = PdfSkimmer(data)
+            trailer = skimmer.trailer
+            root = skimmer.resolve(trailer.get("/Root"))
+            pages = skimmer.resolve(root["/Pages"])
+            count = skimmer.resolve(pages["/Count"])
+            if not isinstance(count, int):
+                raise SplitError("/Pages has no /Count.")
+
+            header = re.search(rb"%PDF-(\d\.\d)", bytes(data[:1024]))
+            version = header.group(1).decode() if header else None
+            catalog_version = root.get("/Version")
+            if isinstance(catalog_version, str) and (version is None or catalog_version[1:] > version):
+                version = catalog_version[1:]
+
+            encrypted = "/Encrypt" in trailer
+            metadata = {}
+            info = skimmer.resolve(trailer.get("/Info"))
+            if isinstance(info, dict) and not encrypted:
+                # Strings of an encrypted file are encrypted too; leave them to a real reader.
+                for key in INFO_KEYS:
+                    value = _text(skimmer.resolve(info.get(key)))
+                    if isinstance(value, str) and value:
+                        metadata[key[1:]] = value
+
+    return {"file": file_path, "size": os.path.getsize(file_path), "version": version, "pages": count,
+            "encrypted": encrypted, "metadata": metadata}
+
+
+def pdf_info(file_path, use_mmap=False, max_memory=None, cache=None):
+    """
+    skim_pdf_info, falling back to a full pypdf parse for files it cannot skim.
+    """
+    if not os.path.exists(file_path):
+        raise SplitError(f"File '{file_path}' not found.")
+    try:
+        with timed("skim"):
+            return skim_pdf_info(file_path)
+    except Exception:
+        pass
+
+    with open_pdf(file_path, use_mmap, max_memory, cache) as reader:
+        header = re.search(r"%PDF-(\d\.\d)", reader.pdf_header or "")
+        metadata = {}
+        if not reader.is_encrypted and reader.metadata:
+            for key in INFO_KEYS:
+                value = reader.metadata.get(key)
+                if value:
+                    metadata[key[1:]] = str(value)
+        return {"file": file_path, "size": os.path.getsize(file_path), "version": header and header.group(1),
+                "pages": len(reader.pages), "encrypted": reader.is_encrypted, "metadata": metadata}
+
+
+def skim_page_count(file_path):
+    """
+    The page count from skim_pdf_info, or None if the file cannot be skimmed.
+    """
+    try:
+        return skim_pdf_info(file_path)["pages"]
+    except Exception:
+        return None
+
+
+@contextmanager
+def open_skimmer(file_path):
+    """
+    A PdfSkimmer over the mapped file, or None for standard input or a file it cannot read.
+    """
+    if file_path == STDIO:
+        yield None
+        return
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            try:
+                skimmer = PdfSkimmer(data)
+            except Exception:
+                skimmer = None
+            yield skimmer
+
+
+def write_pages(reader, indices, output_path, max_memory=None, optimize=False, passthrough=False):
+    """
+    Copies the given 0-indexed pages of an opened reader into a new PDF at
+    output_path, which may also be an open binary file.
+    With optimize, the output goes through optimize_pdf and the size saving is printed.
+    With passthrough, objects are copied byte-for-byte by copy_pages_raw instead of
+    going through pypdf's object model.
+    """
+    if passthrough:
+        if not optimize:
+            with _open_output(output_path) as f:
+                pages = copy_pages_raw(reader, indices, f)
+                count(pages=pages, bytes_written=f.tell())
+            return
+
+        buf = BytesIO()
+        pages = copy_pages_raw(reader, indices, buf)
+        _write_optimized(buf, output_path, pages)
+        return
+
+    writer = PdfWriter()
+    _add_pages(writer, reader, indices, max_memory)
+    _save_writer(writer, output_path, optimize)
+
+
+def write_page_selection(selection, output_path, use_mmap=False, max_memory=None, cache=None, optimize=False):
+    """
+    Copies pages from several PDFs into one new PDF at output_path, in the
+    order given. selection is a list of (file_path, 0-indexed pages); each
+    source is opened, copied from and closed in turn.
+    """
+    _import_pypdf()
+    writer = PdfWriter()
+    for file_path, indices in selection:
+        with open_pdf(file_path, use_mmap, max_memory, cache) as reader:
+            _add_pages(writer, reader, indices, max_memory)
+    _save_writer(writer, output_path, optimize)
+
+
+def _add_pages(writer, reader, indices, max_memory):
+    pages = reader.pages
+    for i in indices:
+        with timed("lookup"):
+            page = pages[i]
+        with timed("add_page"):
+            writer.add_page(page)
+        check_memory(max_memory)
+
+
+def _save_writer(writer, output_path, optimize):
+    if not optimize:
+        with timed("write"):
+            with _open_output(output_path) as f:
+                writer.write(f)
+                count(pages=len(writer.pages), bytes_written=f.tell())
+        return
+
+    with timed("write"):
+        buf = BytesIO()
+        writer.write(buf)
+    _write_optimized(buf, output_path, len(writer.pages))
+
+
+def _write_optimized(buf, output_path, pages):
+    with timed("optimize"):
+        data = optimize_pdf(buf.getvalue())
+    with timed("write"):
+        with _open_output(output_path) as f:
+            f.write(data)
+    count(pages=pages, bytes_written=len(data))
+
+    before, after = buf.tell(), len(data)
+    name = os.path.basename(output_path) if isinstance(output_path, str) and output_path != STDIO else "output"
+    print(f"Optimized {name}: {format_size(before)} -> {format_size(after)} ({(after - before) / before:+.0%})",
+          file=sys.stderr if output_path == STDIO else sys.stdout)
+
+
+def _open_output(output):
+    # A path is opened (and closed) here; an open binary file such as a BytesIO is written to as it is.
+    if output == STDIO:
+        return _stdout_output()
+    if not isinstance(output, str):
+        return nullcontext(output)
+    _make_parent(output)
+    return open(output, "wb")
+
+
+def _make_parent(output_path):
+    # Templates may name subdirectories ("pages/{page}.pdf"); create them on first write.
+    parent = os.path.dirname(output_path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+
+
+@contextmanager
+def _stdout_output():
+    # pypdf and copy_pages_raw tell() while writing, which a pipe cannot do, so the
+    # PDF is assembled in memory and handed to stdout in a few large writes.
+    buf = BytesIO()
+    yield buf
+    out = sys.stdout.buffer
+    with buf.getbuffer() as view:
+        for offset in range(0, len(view), STDIO_CHUNK):
+            out.write(view[offset:offset + STDIO_CHUNK])
+    out.flush()
+
+
+def check_range(start_page, end_page, total_pages):
+    if start_page < 1 or end_page > total_pages or start_page > end_page:
+        raise SplitError(f"Invalid page range. Total pages: {total_pages}")
+
+
+def parse_ranges(spec, total_pages):
+    """
+    Parses a range spec such as "1-25,26-50,60" into a list of 1-indexed (start, end) pairs.
+    """
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, sep, end = part.partition("-")
+        try:
+            start_page = int(start)
+            end_page = int(end) if sep else start_page
+        except ValueError:
+            raise SplitError(f"Invalid range '{part}'. Use the form START-END.")
+        check_range(start_page, end_page, total_pages)
+        ranges.append((start_page, end_page))
+
+    if not ranges:
+        raise SplitError("No page ranges given.")
+    return ranges
+
+
+def every_ranges(every, total_pages):
+    """
+    Cuts the whole document into consecutive chunks of `every` pages.
+    """
+    if every < 1:
+        raise SplitError("--every must be at least 1.")
+    return [(start, min(start + every - 1, total_pages))
+            for start in range(1, total_pages + 1, every)]
+
+
+OUTLINE_TEMPLATE = "{stem}_{index:02d}_{title}.pdf"
+FRONT_MATTER_TITLE = "front-matter"
+
+
+def sanitize_filename(title, max_length=80):
+    """
+    Turns a bookmark title into something safe to use inside a file name:
+    path separators, control and shell-unfriendly characters become "_",
+    runs of them are collapsed and the result is cut to max_length.
+    """
+    name = re.sub(r"[^\w\-.]+", "_", title).strip("._")
+    return name[:max_length].rstrip("._") or "section"
+
+
+def _outline_items(items, depth, level=1):
+    # pypdf nests an item's children as a list right after it; yields (level, item) in document order.
+    for item in items:
+        if isinstance(item, list):
+            if level < depth:
+                yield from _outline_items(item, depth, level + 1)
+        else:
+            yield level, item
+
+
+def outline_sections(reader, depth=1):
+    """
+    Resolves the outline (bookmarks) down to `depth` levels into 1-indexed
+    (start, end, title) sections in page order. Each section runs up to the
+    page before the next one starts; pages ahead of the first bookmark become a
+    front-matter section. Bookmarks that do not point at a page in this file are
+    ignored; of several bookmarks on the same page the outermost, then the
+    first listed, names the section.
+    """
+    if depth < 1:
+        raise SplitError("--depth must be at least 1.")
+
+    # One ref -> page index map for the whole outline instead of a page tree lookup per bookmark.
+    if isinstance(reader, PageIndexMixin) and reader._index is not None:
+        page_refs = [tuple(ref) for ref in reader._index["pages"]]
+    else:
+        page_refs = [(page.indirect_reference.idnum, page.indirect_reference.generation)
+                     if page.indirect_reference is not None else None for page in reader.pages]
+    page_numbers = {ref: index for index, ref in enumerate(page_refs) if ref is not None}
+    total_pages = len(page_refs)
+
+    starts = {}
+    with timed("outline"):
+        for level, item in _outline_items(reader.outline, depth):
+            page = item.get("/Page")
+            if isinstance(page, IndirectObject):
+                index = page_numbers.get((page.idnum, page.generation))
+            elif isinstance(page, int) and 0 <= page < total_pages:
+                index = page
+            else:
+                index = None
+            if index is not None and (index not in starts or level < starts[index][0]):
+                starts[index] = (level, item.title or "")
+
+    if not starts:
+        raise SplitError("The PDF has no bookmarks that point at its pages.")
+
+    sections = []
+    if 0 not in starts:
+        sections.append((0, FRONT_MATTER_TITLE))
+    sections.extend((index, starts[index][1]) for index in sorted(starts))
+    return [(start + 1, sections[n + 1][0] if n + 1 < len(sections) else total_pages, title)
+            for n, (start, title) in enumerate(sections)]
+
+
+def format_output_name(template, file_path, start_page, end_page, index, suffix="_{start}-{end}", title=""):
+    """
+    Builds an output file name from a template. Supported fields are
+    {stem}, {start}, {end}, {page} (same as {start}), {index} and {title}
+    (the sanitized bookmark title with --by-outline); a template without any
+    fields gets `suffix` appended before the extension.
+    """
+    if "{" not in template:
+        root, ext = os.path.splitext(template)
+        template = root + suffix + (ext or ".pdf")
+
+    stem = "stdin" if file_path == STDIO else os.path.splitext(os.path.basename(file_path))[0]
+    name = template.format(stem=stem, start=start_page, end=end_page, page=start_page, index=index,
+                           title=sanitize_filename(title) if title else "")
+    if not name.lower().endswith(".pdf"):
+        name += ".pdf"
+    return name
+
+
+def split_pdf(file_path, start_page, end_page, output_name, use_mmap=False, max_memory=None, cache=None,
+              optimize=False, passthrough=False, force=False):
+    """
+    Splits a PDF from start_page to end_page and saves it as output_name in the same folder.
+    A file_path of "-" reads standard input; an output_name of "-" writes the
+    PDF to standard output, and messages then go to stderr.
+    An output left current by an earlier run is not rewritten unless force is set
+    (see OutputRecords).
+    """
+    log = sys.stderr if output_name == STDIO else sys.stdout
+    if file_path != STDIO and not os.path.exists(file_path):
+        print(f"Error: File '{file_path}' not found.", file=log)
+        return
+
+    try:
+        # Reject a bad range from the trailer alone, before importing pypdf and parsing the file.
+        total_pages = skim_page_count(file_path) if file_path != STDIO else None
+        if total_pages is not None:
+            check_range(start_page, end_page, total_pages)
+
+        if output_name == STDIO:
+            output_path, records = STDIO, None
+        else:
+            output_dir = os.path.dirname(os.path.abspath(file_path))
+            output_path = os.path.join(output_dir, output_name)
+            records = output_records(file_path, optimize, passthrough, force)
+            if records is not None and records.is_current(output_path, start_page, end_page):
+                print(f"Up to date: {output_path}")
+                return output_path
+
+        with open_pdf(file_path, use_mmap, max_memory, cache) as reader:
+            # pypdf uses 0-indexed page numbers
+            # The user provides 1-indexed page numbers
+            total_pages = len(reader.pages)
+            check_range(start_page, end_page, total_pages)
+
+            write_pages(reader, range(start_page - 1, end_page), output_path, max_memory, optimize, passthrough)
+        if records is not None:
+            records.record(output_path, start_page, end_page)
+
+        print(f"Successfully saved split PDF to: {'standard output' if output_path == STDIO else output_path}",
+              file=log)
+        return output_path
+
+    except SplitError as e:
+        print(f"Error: {e}", file=log)
+    except Exception as e:
+        print(f"An error occurred: {e}", file=log)
+
+
+def resolve_ranges(total_pages, ranges=None, every=None):
+    """
+    Turns a --ranges spec or an --every chunk size into 1-indexed (start, end) pairs.
+    """
+    if every is not None:
+        return every_ranges(every, total_pages)
+    return parse_ranges(ranges, total_pages)
+
+
+def split_file(file_path, output_template, ranges=None, every=None, output_dir=None,
+               use_mmap=False, max_memory=None, cache=None, optimize=False, passthrough=False, max_size=None,
+               outline_depth=None, force=False, split_on_blank=None):
+    """
+    Writes every requested range of one PDF from a single reader and returns the
+    written paths. With max_size, the ranges come from size_ranges, with
+    outline_depth from outline_sections, and with a BlankDetection in
+    split_on_blank from blank_ranges, instead of `ranges`/`every`. Raises on
+    failure; callers decide how to report it.
+
+    Outputs that are still current (see OutputRecords) are left alone unless
+    force is set; with `ranges`/`every` a source whose outputs are all current
+    is not even opened.
+    """
+    records = output_records(file_path, optimize, passthrough, force)
+    if max_size is None and outline_depth is None and split_on_blank is None:
+        written = current_outputs(records, file_path, output_template, ranges, every, output_dir)
+        if written is not None:
+            return written
+
+    with open_pdf(file_path, use_mmap, max_memory, cache) as reader:
+        return split_reader(reader, file_path, output_template, ranges=ranges, every=every, output_dir=output_dir,
+                            max_memory=max_memory, optimize=optimize, passthrough=passthrough, max_size=max_size,
+                            outline_depth=outline_depth, records=records, split_on_blank=split_on_blank)
+
+
+def split_reader(reader, file_path, output_template, ranges=None, every=None, output_dir=None, max_memory=None,
+                 optimize=False, passthrough=False, max_size=None, outline_depth=None, records=None,
+                 split_on_blank=None, plan=None):
+    """
+    The body of split_file for a reader that is already open. With OutputRecords,
+    current outputs are skipped and a record is written for every new one.
+    A plan from plan_outputs, when the caller has one already, is used as it is.
+    """
+    if plan is None:
+        plan = plan_outputs(reader, file_path, output_template, ranges, every, output_dir, max_size, outline_depth,
+                            split_on_blank)
+    written = []
+    for output_path, start_page, end_page in plan:
+        written.append(output_path)
+        if records is not None and records.is_current(output_path, start_page, end_page):
+            continue
+        write_pages(reader, range(start_page - 1, end_page), output_path, max_memory, optimize, passthrough)
+        if max_size is not None and start_page < end_page and os.path.getsize(output_path) > max_size:
+            print(f"Warning: {os.path.basename(output_path)} came out at "
+                  f"{format_size(os.path.getsize(output_path))}, over the {format_size(max_size)} estimate.")
+        if records is not None:
+            records.record(output_path, start_page, end_page)
+    return written
+
+
+def plan_outputs(reader, file_path, output_template, ranges=None, every=None, output_dir=None, max_size=None,
+                 outline_depth=None, split_on_blank=None):
+    """
+    Works out which files a split writes: a list of (output_path, start, end)
+    with 1-indexed, inclusive page numbers.
+    """
+    titles = None
+    if outline_depth is not None:
+        sections = outline_sections(reader, outline_depth)
+        page_ranges = [(start_page, end_page) for start_page, end_page, _ in sections]
+        titles = {start_page: title for start_page, _, title in sections}
+    elif max_size is not None:
+        page_ranges = size_ranges(reader, max_size)
+    elif split_on_blank is not None:
+        page_ranges = blank_ranges(len(reader.pages), blank_pages(reader, file_path, split_on_blank))
+    else:
+        page_ranges = resolve_ranges(len(reader.pages), ranges, every)
+    return name_outputs(file_path, output_template, page_ranges, output_dir, titles)
+
+
+def name_outputs(file_path, output_template, page_ranges, output_dir=None, titles=None):
+    """
+    The naming half of plan_outputs. titles maps start pages to outline titles
+    for --by-outline; its presence also switches the default name suffix.
+    """
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(file_path))
+
+    suffix = "_{index:02d}_{title}" if titles is not None else "_{start}-{end}"
+    titles = titles or {}
+    plan = []
+    for index, (start_page, end_page) in enumerate(page_ranges, 1):
+        output_name = format_output_name(output_template, file_path, start_page, end_page, index, suffix,
+                                         titles.get(start_page, ""))
+        plan.append((os.path.join(output_dir, output_name), start_page, end_page))
+
+    # e.g. two bookmarks with the same title and a template without {index}: the second would overwrite the first.
+    claimed = {}
+    for output_path, start_page, end_page in plan:
+        if output_path in claimed:
+            raise SplitError(f"'{output_template}' would name pages {claimed[output_path]} and "
+                             f"{start_page}-{end_page} both '{os.path.basename(output_path)}'; add {{index}} or "
+                             f"{{start}} to the output template.")
+        claimed[output_path] = f"{start_page}-{end_page}"
+    return plan
+
+
+def split_pdf_ranges(file_path, output_template, ranges=None, every=None, use_mmap=False, max_memory=None,
+                     cache=None, optimize=False, passthrough=False, max_size=None, outline_depth=None, force=False,
+                     split_on_blank=None):
+    """
+    Splits a PDF into several outputs in one pass: the source is parsed once and
+    every range is written from the same reader. `ranges` is a spec string like
+    "1-25,26-50"; `every` cuts the document into chunks of that many pages;
+    `max_size` groups consecutive pages into outputs of at most that many bytes;
+    `outline_depth` writes one output per bookmark down to that outline level;
+    `split_on_blank` writes the runs of pages between blank separator pages.
+    Returns the list of written paths.
+    """
+    try:
+        written = split_file(file_path, output_template, ranges=ranges, every=every,
+                             use_mmap=use_mmap, max_memory=max_memory, cache=cache, optimize=optimize,
+                             passthrough=passthrough, max_size=max_size, outline_depth=outline_depth,
+                             force=force, split_on_blank=split_on_blank)
+        output_dir = os.path.dirname(os.path.abspath(file_path))
+        print(f"Successfully saved {len(written)} split PDFs to: {output_dir}")
+        return written
+
+    except SplitError as e:
+        print(f"Error: {e}")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    return []
+
+
+def print_split_plan(file_path, output_template, ranges=None, every=None, use_mmap=False, max_memory=None,
+                     cache=None, max_size=None, outline_depth=None, split_on_blank=None):
+    """
+    The --dry-run of split_pdf_ranges: prints the pages each output would get,
+    and with split_on_blank the separator pages found, without writing anything.
+    """
+    try:
+        with open_pdf(file_path, use_mmap, max_memory, cache) as reader:
+            if split_on_blank is not None:
+                blank = blank_pages(reader, file_path, split_on_blank)
+                print(f"Blank pages: {', '.join(map(str, blank)) or 'none'}")
+                plan = name_outputs(file_path, output_template, blank_ranges(len(reader.pages), blank))
+            else:
+                plan = plan_outputs(reader, file_path, output_template, ranges, every, max_size=max_size,
+                                    outline_depth=outline_depth)
+        for output_path, start_page, end_page in plan:
+            print(f"Pages {start_page}-{end_page} -> {output_path}")
+        return plan
+
+    except SplitError as e:
+        print(f"Error: {e}")
+    except Exception as e:
+        print(f"An error occurred: {e}")
+    return []
+
+
+# ---------------------------------------------------------------------------
+# Blank separator pages
+# ---------------------------------------------------------------------------
+# Thresholds for page_is_blank, plus the worker processes detection may use.
+BlankDetection = namedtuple("BlankDetection", "content_bytes image_ratio ink jobs")
+BLANK_CONTENT_BYTES = 128
+BLANK_IMAGE_RATIO = 100.0
+BLANK_INK = 0.005
+BLANK_CHUNK_PAGES = 64
+# Most that zlib can add to a short stream, so a longer Flate stream cannot decode to under content_bytes.
+ZLIB_OVERHEAD = 16
+# Samples below this level count as ink when an image's pixels can be read.
+INK_LEVEL = 128
+_LIGHT_SAMPLES = bytes(range(INK_LEVEL, 256))
+COLOR_COMPONENTS = {"/DeviceRGB": 3, "/CalRGB": 3, "/DeviceCMYK": 4}
+
+
+def page_is_blank(page, detection, skimmer=None):
+    """
+    Decides whether a page is a blank separator sheet without rendering it.
+
+    A page whose content stream holds more than detection.content_bytes has
+    text or drawing on it. Otherwise it is blank unless it places an image with
+    something on it: an image is blank when it compresses at least image_ratio
+    to 1 (a blank scan is nearly one colour, whatever the codec), or, for an
+    8-bit Flate or unfiltered image whose samples can be read directly, when at
+    most a fraction `ink` of them are dark.
+    The compression ratio needs an image's encoded length, which pypdf does not
+    keep; it is read from the file by skimmer (a PdfSkimmer over the page's
+    source) when there is one, and otherwise only the sample check applies.
+    The skimmer's lengths also settle most text pages without decoding their
+    content stream at all.
+    """
+    length = _content_length(page, skimmer)
+    if length is not None and length > detection.content_bytes + ZLIB_OVERHEAD:
+        return False
+    contents = page.get_contents()
+    return _marks_are_blank(contents.get_data() if contents is not None else b"", _entry(page, "/Resources"),
+                            detection, skimmer)
+
+
+def _entry(dictionary, key, default=None):
+    # dict.get does not resolve indirect references the way pypdf's [] does.
+    value = dictionary.get(key, default)
+    return value.get_object() if isinstance(value, IndirectObject) else value
+
+
+def _marks_are_blank(content, resources, detection, skimmer, depth=0):
+    if len(content.strip()) > detection.content_bytes:
+        return False
+    xobjects = _entry(resources, "/XObject") if resources is not None else None
+    for ref in (xobjects.values() if xobjects is not None else ()):
+        xobject = ref.get_object()
+        if _entry(xobject, "/Subtype") == "/Image":
+            if not _image_is_blank(xobject, detection, skimmer):
+                return False
+        elif depth > 8 or not _marks_are_blank(xobject.get_data(), _entry(xobject, "/Resources"), detection,
+                                               skimmer, depth + 1):
+            return False
+    return True
+
+
+def _encoded_length(image, skimmer):
+    # pypdf drops /Length once it has read a stream; the file's own entry still has it.
+    length = _entry(image, "/Length")
+    ref = image.indirect_reference
+    if length is None and skimmer is not None and ref is not None:
+        try:
+            length = skimmer.resolve(skimmer.resolve(PdfRef(ref.idnum, ref.generation)).get("/Length"))
+        except Exception:
+            length = None
+    return length if isinstance(length, int) else None
+
+
+def _content_length(page, skimmer):
+    # Encoded bytes in the page's content streams, or None unless every one is unfiltered or Flate
+    # with a known length (other filters, like ASCIIHex, can be far longer than what they decode to).
+    contents = _entry(page, "/Contents")
+    total = 0
+    for stream in (contents if isinstance(contents, list) else [contents] if contents is not None else []):
+        stream = stream.get_object()
+        filters = _entry(stream, "/Filter", [])
+        length = _encoded_length(stream, skimmer)
+        if length is None or (list(filters) if isinstance(filters, list) else [filters]) not in ([], ["/FlateDecode"]):
+            return None
+        total += length
+    return total
+
+
+def _image_is_blank(image, detection, skimmer=None):
+    width, height = _entry(image, "/Width", 0), _entry(image, "/Height", 0)
+    bits = _entry(image, "/BitsPerComponent", 1 if _entry(image, "/ImageMask") else 8)
+    color_space = _entry(image, "/ColorSpace")
+    components = COLOR_COMPONENTS.get(color_space, 1) if isinstance(color_space, str) else 1
+    encoded = _encoded_length(image, skimmer)
+    if encoded is not None and width * height * components * bits / 8 >= max(encoded, 1) * detection.image_ratio:
+        return True
+
+    filters = _entry(image, "/Filter", [])
+    filters = list(filters) if isinstance(filters, list) else [filters]
+    if bits != 8 or filters not in ([], ["/FlateDecode"]) or color_space not in ("/DeviceGray", "/DeviceRGB"):
+        return False
+    data = image.get_data()
+    return len(data.translate(None, _LIGHT_SAMPLES)) <= len(data) * detection.ink
+
+
+def _blank_in(reader, file_path, pages, detection):
+    blank = []
+    with open_skimmer(file_path) as skimmer:
+        for page_number in pages:
+            with timed("detect"):
+                if page_is_blank(reader.pages[page_number - 1], detection, skimmer):
+                    blank.append(page_number)
+    return blank
+
+
+def _blank_chunk(file_path, pages, detection):
+    blank = _blank_in(_worker_reader, file_path, pages, detection)
+    # Forget the streams just decoded, so a worker's memory does not grow with the document.
+    _worker_reader.resolved_objects.clear()
+    return blank, _take_worker_stats()
+
+
+def blank_pages(reader, file_path, detection):
+    """
+    Returns the 1-indexed numbers of the pages page_is_blank calls blank.
+    With detection.jobs > 1 the pages are checked in chunks over a process
+    pool, each worker mapping the source and parsing it once, as burst does.
+    """
+    total_pages = len(reader.pages)
+    jobs = min(detection.jobs or os.cpu_count() or 1, -(-total_pages // BLANK_CHUNK_PAGES))
+    if jobs <= 1 or file_path == STDIO:
+        return _blank_in(reader, file_path, range(1, total_pages + 1), detection)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunks = [range(start, min(start + BLANK_CHUNK_PAGES, total_pages + 1))
+              for start in range(1, total_pages + 1, BLANK_CHUNK_PAGES)]
+    blank = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_burst_worker_init,
+                             initargs=(file_path, True, None, _stats is not None)) as pool:
+        for found, stats in pool.map(_blank_chunk, [file_path] * len(chunks), chunks, [detection] * len(chunks)):
+            blank.extend(found)
+            if stats is not None:
+                _stats.merge(stats)
+    return blank
+
+
+def blank_ranges(total_pages, blank):
+    """
+    The runs of pages between blank separators, as 1-indexed (start, end)
+    pairs. Separators themselves are dropped, and consecutive ones count as one.
+    """
+    blank = set(blank)
+    ranges = []
+    start_page = None
+    for page_number in range(1, total_pages + 2):
+        if page_number in blank or page_number > total_pages:
+            if start_page is not None:
+                ranges.append((start_page, page_number - 1))
+            start_page = None
+        elif start_page is None:
+            start_page = page_number
+    if not ranges:
+        raise SplitError("Every page looks blank; nothing to write.")
+    return ranges
+
+
+# ---------------------------------------------------------------------------
+# Burst mode
+# ---------------------------------------------------------------------------
+BURST_TEMPLATE = "{stem}_{page:05d}.pdf"
+
+# Per-process reader for burst and blank-detection workers, opened once by _burst_worker_init.
+_worker_reader = None
+_worker_stack = None
+
+
+def _burst_worker_init(file_path, use_mmap, cache, collect_stats):
+    global _worker_reader, _worker_stack
+    _start_worker_stats(collect_stats)
+    _worker_stack = ExitStack()
+    _worker_reader = _worker_stack.enter_context(open_pdf(file_path, use_mmap, cache=cache))
+
+
+def _burst_path(file_path, output_template, output_dir, page):
+    output_name = format_output_name(output_template, file_path, page, page, page, suffix="_{page:05d}")
+    return os.path.join(output_dir, output_name)
+
+
+def _burst_pages(reader, file_path, pages, output_template, output_dir, max_memory=None, optimize=False,
+                 passthrough=False, records=None):
+    written = []
+    for page in pages:
+        output_path = _burst_path(file_path, output_template, output_dir, page)
+        write_pages(reader, [page - 1], output_path, max_memory, optimize, passthrough)
+        if records is not None:
+            records.record(output_path, page, page)
+        written.append(output_path)
+    return written
+
+
+def _burst_chunk(file_path, pages, output_template, output_dir, max_memory, optimize, passthrough, records):
+    written = _burst_pages(_worker_reader, file_path, pages, output_template, output_dir, max_memory, optimize,
+                           passthrough, records)
+    return written, _take_worker_stats()
+
+
+def burst_pdf(file_path, output_template=BURST_TEMPLATE, output_dir=None, jobs=None,
+              use_mmap=False, max_memory=None, cache=None, optimize=False, passthrough=False, force=False):
+    """
+    Writes every page of a PDF to its own file and returns the output paths.
+
+    A single reader is not safe to share between threads, and page copying is
+    CPU-bound, so the work is spread over processes instead. Each worker parses
+    the source once and then writes a block of pages, so the cost is
+    one parse per worker rather than one per page.
+
+    Pages whose output is still current (see OutputRecords) are left alone
+    unless force is set; when every page is current the source is not parsed.
+    """
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(file_path))
+
+    # The workers parse the source themselves; the parent only needs the page count,
+    # which the skimmer reads from the trailer without a full parse.
+    total_pages = skim_page_count(file_path) if os.path.exists(file_path) else None
+    if total_pages is None:
+        with open_pdf(file_path, use_mmap, max_memory, cache) as reader:
+            total_pages = len(reader.pages)
+    outputs = [_burst_path(file_path, output_template, output_dir, page) for page in range(1, total_pages + 1)]
+    records = output_records(file_path, optimize, passthrough, force)
+    pages = [page for page, output_path in enumerate(outputs, 1)
+             if records is None or not records.is_current(output_path, page, page)]
+    if not pages:
+        return outputs
+    if records is not None:
+        # Hash the source once here rather than once in every worker that writes a record.
+        records.sha256()
+
+    jobs = min(jobs or os.cpu_count() or 1, len(pages))
+    if jobs <= 1:
+        with open_pdf(file_path, use_mmap, max_memory, cache) as reader:
+            _burst_pages(reader, file_path, pages, output_template, output_dir, max_memory, optimize,
+                         passthrough, records)
+        return outputs
+
+    # A few chunks per worker keeps the pool busy when some pages are heavier than others.
+    chunk = max(1, -(-len(pages) // (jobs * 4)))
+    blocks = [pages[start:start + chunk] for start in range(0, len(pages), chunk)]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_burst_worker_init,
+                             initargs=(file_path, use_mmap, cache, _stats is not None)) as pool:
+        for _, stats in pool.map(_burst_chunk, [file_path] * len(blocks), blocks,
+                                 [output_template] * len(blocks), [output_dir] * len(blocks),
+                                 [max_memory] * len(blocks), [optimize] * len(blocks),
+                                 [passthrough] * len(blocks), [records] * len(blocks)):
+            if stats is not None:
+                _stats.merge(stats)
+    return outputs
+
+
+def add_memory_args(parser):
+    parser.add_argument("--mmap", action="store_true",
+                        help="Memory-map the source instead of reading it into memory")
+    parser.add_argument("--max-memory", type=parse_size, metavar="SIZE",
+                        help="Abort if the process holds more than SIZE of memory (e.g. 512MB); "
+                             "pages of a --mmap source are not counted")
+
+
+def add_optimize_args(parser):
+    parser.add_argument("--optimize", action="store_true",
+                        help="Deduplicate identical streams, drop unused objects and write compressed "
+                             "object streams; prints each output's size before and after")
+    parser.add_argument("--passthrough", action="store_true",
+                        help="Copy page objects byte-for-byte from the source, rewriting only object "
+                             "references (fastest for plain range extraction)")
+
+
+def add_blank_args(parser):
+    parser.add_argument("--blank-content-bytes", type=int, default=BLANK_CONTENT_BYTES, metavar="N",
+                        help="With --split-on-blank: pages with more content-stream bytes than this are never "
+                             f"blank (default: {BLANK_CONTENT_BYTES})")
+    parser.add_argument("--blank-ratio", type=float, default=BLANK_IMAGE_RATIO, metavar="X",
+                        help="With --split-on-blank: images compressing at least X:1 count as blank scans "
+                             f"(default: {BLANK_IMAGE_RATIO:g})")
+    parser.add_argument("--blank-ink", type=float, default=BLANK_INK, metavar="FRACTION",
+                        help="With --split-on-blank: readable images with at most this fraction of dark "
+                             f"samples count as blank (default: {BLANK_INK:g})")
+
+
+def blank_from_args(args, jobs=1):
+    if not args.split_on_blank:
+        return None
+    return BlankDetection(args.blank_content_bytes, args.blank_ratio, args.blank_ink, jobs)
+
+
+def add_force_args(parser):
+    parser.add_argument("--force", action="store_true",
+                        help="Rewrite outputs even when their " + RECORD_SUFFIX + " record shows they are "
+                             "up to date with the source")
+
+
+def add_cache_args(parser):
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse a cached page index (page count, xref, page objects) for repeat runs")
+    parser.add_argument("--cache-dir", help=f"Page-index cache location (default: {default_cache_dir()})")
+    parser.add_argument("--cache-size", type=parse_size, default=64 * 1024 ** 2, metavar="SIZE",
+                        help="Evict least recently used indexes beyond this total size (default: 64MB)")
+
+
+def add_stats_args(parser):
+    parser.add_argument("--stats", action="store_true",
+                        help="Print per-phase timing, page/byte counts and peak RSS as JSON to stderr")
+    parser.add_argument("--stats-file", metavar="PATH", help="Write the --stats JSON to PATH instead")
+    parser.add_argument("--profile", metavar="PATH", help="Dump cProfile data for the run to PATH")
+
+
+def run_instrumented(args, command, run):
     """
-    Splits a PDF from start_page to end_page and saves it as output_name in the same folder.
+    Runs a command under the --stats collector and/or --profile profiler if requested.
+    Only this process is profiled; batch and burst workers report --stats but not --profile.
+    """
+    global _stats
+    if args.stats or args.stats_file:
+        _stats = RunStats()
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        return run()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if _stats is not None:
+            report = json.dumps({"command": command, **_stats.as_dict()}, indent=2)
+            if args.stats_file:
+                with open(args.stats_file, "w") as f:
+                    f.write(report + "\n")
+            else:
+                print(report, file=sys.stderr)
+            _stats = None
+
+
+def cache_from_args(args):
+    if not args.cache:
+        return None
+    return PageIndexCache(args.cache_dir, args.cache_size)
+
+
+# ---------------------------------------------------------------------------
+# Batch mode
+# ---------------------------------------------------------------------------
+def collect_inputs(inputs):
+    """
+    Expands directories, glob patterns and @list files into a de-duplicated list of PDF paths.
+    """
+    paths = []
+    for item in inputs:
+        if item.startswith("@"):
+            with open(item[1:]) as f:
+                found = [line.strip() for line in f if line.strip()]
+        elif os.path.isdir(item):
+            found = sorted(glob.glob(os.path.join(item, "*.pdf")) + glob.glob(os.path.join(item, "*.PDF")))
+        elif glob.has_magic(item):
+            found = sorted(glob.glob(item, recursive=True))
+        else:
+            found = [item]
+        paths.extend(found)
+    return list(dict.fromkeys(paths))
+
+
+def _batch_job(file_path, output_template, ranges, every, output_dir, use_mmap, max_memory, cache, optimize,
+               passthrough, max_size, outline_depth, force, split_on_blank):
+    # Runs in a worker process: never raise, so one bad file cannot take down the pool.
+    try:
+        written = split_file(file_path, output_template, ranges=ranges, every=every, output_dir=output_dir,
+                             use_mmap=use_mmap, max_memory=max_memory, cache=cache, optimize=optimize,
+                             passthrough=passthrough, max_size=max_size, outline_depth=outline_depth, force=force,
+                             split_on_blank=split_on_blank)
+        return file_path, True, written
+    except Exception as e:
+        return file_path, False, str(e) or type(e).__name__
+
+
+def _batch_worker(collect_stats, *job):
+    _start_worker_stats(collect_stats)
+    return _batch_job(*job), _take_worker_stats()
+
+
+def batch_split(paths, output_template, ranges=None, every=None, output_dir=None, jobs=None,
+                use_mmap=False, max_memory=None, cache=None, optimize=False, passthrough=False, max_size=None,
+                outline_depth=None, force=False, split_on_blank=None):
     """
+    Splits many PDFs over a process pool, yielding one
+    (file_path, ok, outputs_or_error) tuple per file as each one finishes.
+    Outputs that are already up to date are skipped unless force is set.
+    """
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if jobs == 1:
+        for path in paths:
+            yield _batch_job(path, output_template, ranges, every, output_dir, use_mmap, max_memory, cache,
+                             optimize, passthrough, max_size, outline_depth, force, split_on_blank)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from concurrent.futures.process import BrokenProcessPool
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(_batch_worker, _stats is not None, path, output_template, ranges, every,
+                               output_dir, use_mmap, max_memory, cache, optimize, passthrough, max_size,
+                               outline_depth, force, split_on_blank): path
+                   for path in paths}
+        for future in as_completed(futures):
+            try:
+                result, stats = future.result()
+            except BrokenProcessPool as e:
+                # A worker was killed (out of memory, a crash in a C extension). The pool is unusable
+                # from here on, so this and every file not yet finished fail; finished ones stand.
+                yield futures[future], False, f"worker process died: {e}"
+                continue
+            if stats is not None:
+                _stats.merge(stats)
+            yield result
+
+
+def _read_source(file_path, max_memory):
     if not os.path.exists(file_path):
-        print(f"Error: File '{file_path}' not found.")
+        raise SplitError(f"File '{file_path}' not found.")
+    if max_memory is not None and os.path.getsize(file_path) > max_memory:
+        raise SplitError(f"'{file_path}' is larger than the memory limit ({format_size(max_memory)}).")
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+def _write_outputs(file_path, built, records):
+    for output_path, start_page, end_page, data in built:
+        if data is not None:
+            _make_parent(output_path)
+            with open(output_path, "wb") as f:
+                f.write(data)
+            records.record(output_path, start_page, end_page)
+
+
+def _current_source(file_path, job, force):
+    # I/O stage check before reading a source at all; see current_outputs.
+    output_template, ranges, every, output_dir, _, _, optimize, passthrough = job[:8]
+    max_size, outline_depth, split_on_blank = job[8:]
+    if (force or max_size is not None or outline_depth is not None or split_on_blank is not None
+            or not os.path.exists(file_path)):
+        return None
+    records = output_records(file_path, optimize, passthrough)
+    return current_outputs(records, file_path, output_template, ranges, every, output_dir)
+
+
+def _assemble_outputs(file_path, data, output_template, ranges, every, output_dir, max_memory, cache, optimize,
+                      passthrough, max_size, outline_depth, split_on_blank, force):
+    # CPU stage of the async pipeline: builds every output of one file in memory, touching no
+    # files beyond the sidecar records. Current outputs come back with data None.
+    records = output_records(file_path, optimize, passthrough, force, hashlib.sha256(data).hexdigest())
+    reader = _load_reader(BytesIO(data), file_path, cache)
+    outputs = []
+    for output_path, start_page, end_page in plan_outputs(reader, file_path, output_template, ranges, every,
+                                                          output_dir, max_size, outline_depth, split_on_blank):
+        if records.is_current(output_path, start_page, end_page):
+            outputs.append((output_path, start_page, end_page, None))
+            continue
+        buf = BytesIO()
+        write_pages(reader, range(start_page - 1, end_page), buf, max_memory, optimize, passthrough)
+        outputs.append((output_path, start_page, end_page, buf.getvalue()))
+    return outputs, records
+
+
+def _assemble_worker(collect_stats, *job):
+    _start_worker_stats(collect_stats)
+    return _assemble_outputs(*job), _take_worker_stats()
+
+
+async def _split_pipeline(paths, job, force, results, io_workers, cpu_workers, queue_size):
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    loop = asyncio.get_running_loop()
+    todo = asyncio.Queue()
+    for path in paths:
+        todo.put_nowait(path)
+    # Bounded hand-offs: readers stall once queue_size sources are waiting for a CPU worker, and CPU
+    # workers stall once queue_size files of output are waiting for a writer.
+    sources = asyncio.Queue(queue_size)
+    outputs = asyncio.Queue(queue_size)
+
+    async def read_stage():
+        while not todo.empty():
+            path = todo.get_nowait()
+            try:
+                current = await loop.run_in_executor(io_pool, _current_source, path, job, force)
+                if current is not None:
+                    await results.put((path, True, current))
+                    continue
+                data = await loop.run_in_executor(io_pool, _read_source, path, job[4])
+            except Exception as e:
+                await results.put((path, False, str(e) or type(e).__name__))
+                continue
+            await sources.put((path, data))
+
+    async def cpu_stage():
+        while (item := await sources.get()) is not None:
+            path, data = item
+            try:
+                built, stats = await loop.run_in_executor(cpu_pool, _assemble_worker, _stats is not None, path,
+                                                          data, *job, force)
+            except Exception as e:
+                await results.put((path, False, str(e) or type(e).__name__))
+                continue
+            if stats is not None:
+                _stats.merge(stats)
+            await outputs.put((path, built))
+
+    async def write_stage():
+        while (item := await outputs.get()) is not None:
+            path, built = item
+            files, records = built
+            try:
+                await loop.run_in_executor(io_pool, _write_outputs, path, files, records)
+            except Exception as e:
+                await results.put((path, False, str(e) or type(e).__name__))
+                continue
+            await results.put((path, True, [output_path for output_path, _, _, _ in files]))
+
+    try:
+        with ThreadPoolExecutor(io_workers) as io_pool, ProcessPoolExecutor(cpu_workers) as cpu_pool:
+            writers = [asyncio.create_task(write_stage()) for _ in range(io_workers)]
+            cpus = [asyncio.create_task(cpu_stage()) for _ in range(cpu_workers)]
+            await asyncio.gather(*(read_stage() for _ in range(io_workers)))
+            for _ in cpus:
+                await sources.put(None)
+            await asyncio.gather(*cpus)
+            for _ in writers:
+                await outputs.put(None)
+            await asyncio.gather(*writers)
+    finally:
+        results.put_nowait(None)
+
+
+def async_batch_split(paths, output_template, ranges=None, every=None, output_dir=None, jobs=None,
+                      max_memory=None, cache=None, optimize=False, passthrough=False, max_size=None,
+                      outline_depth=None, force=False, split_on_blank=None, io_workers=8, queue_size=4):
+    """
+    batch_split as an asyncio pipeline for slow (e.g. network) storage:
+    io_workers threads read sources and write outputs while `jobs` processes
+    assemble the outputs in memory, so waiting on the disk overlaps with page
+    copying instead of serializing the batch. Yields the same
+    (file_path, ok, outputs_or_error) tuples as files finish.
+    """
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+    job = (output_template, ranges, every, output_dir, max_memory, cache, optimize, passthrough, max_size,
+           outline_depth, split_on_blank)
+    jobs = jobs or os.cpu_count() or 1
+
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    results = asyncio.Queue()
+    pipeline = loop.create_task(_split_pipeline(paths, job, force, results, io_workers, jobs, queue_size))
+    try:
+        while (result := loop.run_until_complete(results.get())) is not None:
+            yield result
+        loop.run_until_complete(pipeline)
+    finally:
+        if not pipeline.done():
+            pipeline.cancel()
+            loop.run_until_complete(asyncio.gather(pipeline, return_exceptions=True))
+        loop.close()
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py batch",
+                                     description="Split many PDF files in parallel.")
+    parser.add_argument("inputs", nargs="+",
+                        help="PDF files, directories, glob patterns or @file lists")
+    modes = parser.add_mutually_exclusive_group(required=True)
+    modes.add_argument("--ranges", help="Page ranges to extract from each file, e.g. 1-25,26-50")
+    modes.add_argument("--every", type=int, metavar="N", help="Split each file into chunks of N pages")
+    modes.add_argument("--max-size", type=parse_size, metavar="SIZE",
+                       help="Split each file into consecutive chunks of at most SIZE, e.g. 10MB")
+    modes.add_argument("--by-outline", action="store_true", help="Write one file per bookmarked section")
+    modes.add_argument("--split-on-blank", action="store_true",
+                       help="Write one file per run of pages between blank separator pages")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="Outline levels that start a section with --by-outline (default: 1)")
+    add_blank_args(parser)
+    parser.add_argument("-o", "--output",
+                        help="Output name template (fields: {stem}, {start}, {end}, {index}, {title}; "
+                             "default: {stem}_{start}-{end}.pdf, or " + OUTLINE_TEMPLATE + " for --by-outline)")
+    parser.add_argument("--output-dir", help="Write outputs here instead of next to each input")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: CPU count)")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="Overlap reading, page assembly and writing (for slow or network storage)")
+    parser.add_argument("--io-workers", type=int, default=8,
+                        help="With --async: concurrent reads and writes (default: 8)")
+    parser.add_argument("--queue-size", type=int, default=4,
+                        help="With --async: files buffered between stages before reading pauses (default: 4)")
+    add_memory_args(parser)
+    add_cache_args(parser)
+    add_optimize_args(parser)
+    add_force_args(parser)
+    add_stats_args(parser)
+    args = parser.parse_args(argv)
+    if args.use_async and args.mmap:
+        parser.error("--async reads whole files into memory and cannot be combined with --mmap")
+    return run_instrumented(args, "batch", lambda: run_batch(args))
+
+
+def run_batch(args):
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        print("Error: No input files found.")
+        return 1
+
+    failed = 0
+    output_template = args.output or (OUTLINE_TEMPLATE if args.by_outline else "{stem}_{start}-{end}.pdf")
+    options = dict(ranges=args.ranges, every=args.every, output_dir=args.output_dir, jobs=args.jobs,
+                   max_memory=args.max_memory, cache=cache_from_args(args), optimize=args.optimize,
+                   passthrough=args.passthrough, max_size=args.max_size,
+                   outline_depth=args.depth if args.by_outline else None, force=args.force,
+                   split_on_blank=blank_from_args(args))
+    if args.use_async:
+        results = async_batch_split(paths, output_template, io_workers=args.io_workers, queue_size=args.queue_size,
+                                    **options)
+    else:
+        results = batch_split(paths, output_template, use_mmap=args.mmap, **options)
+    for file_path, ok, detail in results:
+        if ok:
+            print(f"OK    {file_path} -> {len(detail)} file(s)")
+        else:
+            failed += 1
+            print(f"FAIL  {file_path}: {detail}")
+
+    print(f"Done: {len(paths) - failed} succeeded, {failed} failed, {len(paths)} total.")
+    return 1 if failed else 0
+
+
+# ---------------------------------------------------------------------------
+# Text extraction
+# ---------------------------------------------------------------------------
+EXTRACT_CHUNK_PAGES = 16
+
+# Per-process reader pool for extraction workers, created by _extract_worker_init.
+_extract_pool = None
+
+
+def _page_total(file_path, use_mmap, max_memory, cache):
+    total = skim_page_count(file_path)
+    if total is None:
+        with open_pdf(file_path, use_mmap, max_memory, cache) as reader:
+            total = len(reader.pages)
+    return total
+
+
+def _extract_tasks(paths, chunk_pages, use_mmap, max_memory, cache):
+    # (file_path, pages, None) per chunk of every file, or (file_path, None, error) for a file that cannot be read.
+    for file_path in paths:
+        try:
+            total = _page_total(file_path, use_mmap, max_memory, cache)
+        except Exception as e:
+            yield file_path, None, str(e) or type(e).__name__
+            continue
+        for start in range(1, total + 1, chunk_pages):
+            yield file_path, range(start, min(start + chunk_pages, total + 1)), None
+
+
+def _extract_pages(pool, file_path, pages):
+    try:
+        reader = pool.get(file_path)
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        return [{"file": file_path, "page": page_number, "error": error} for page_number in pages]
+
+    records = []
+    for page_number in pages:
+        try:
+            with timed("extract"):
+                text = reader.pages[page_number - 1].extract_text()
+            records.append({"file": file_path, "page": page_number, "text": text, "chars": len(text)})
+            count(pages=1)
+        except Exception as e:
+            records.append({"file": file_path, "page": page_number, "error": str(e) or type(e).__name__})
+    # Forget the content streams and fonts just decoded, so memory does not grow with the document.
+    reader.resolved_objects.clear()
+    return records
+
+
+def _extract_worker_init(use_mmap, max_memory, cache, collect_stats):
+    global _extract_pool
+    _start_worker_stats(collect_stats)
+    _extract_pool = ReaderPool(max_readers=1, use_mmap=use_mmap, max_memory=max_memory, cache=cache)
+
+
+def _extract_worker(file_path, pages):
+    return _extract_pages(_extract_pool, file_path, pages), _take_worker_stats()
+
+
+def extract_text(paths, jobs=None, ordered=True, use_mmap=False, max_memory=None, cache=None,
+                 chunk_pages=EXTRACT_CHUNK_PAGES):
+    """
+    Yields one {"file", "page", "text", "chars"} record per page of every file
+    ({"file", "page", "error"} for a page that failed, {"file", "error"} for a
+    file that could not be opened). Pages are extracted in chunks over a
+    process pool; only a few chunks per worker are in flight at a time, so
+    memory stays flat however long the documents are. With ordered=False,
+    records come out as chunks finish instead of in page order.
+    """
+    tasks = _extract_tasks(paths, chunk_pages, use_mmap, max_memory, cache)
+
+    if jobs == 1:
+        pool = ReaderPool(max_readers=1, use_mmap=use_mmap, max_memory=max_memory, cache=cache)
+        try:
+            for file_path, pages, error in tasks:
+                if pages is None:
+                    yield {"file": file_path, "error": error}
+                else:
+                    yield from _extract_pages(pool, file_path, pages)
+        finally:
+            pool.close()
         return
 
+    from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+
+    jobs = jobs or os.cpu_count() or 1
+    in_flight = deque()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_extract_worker_init,
+                             initargs=(use_mmap, max_memory, cache, _stats is not None)) as executor:
+        try:
+            while True:
+                while len(in_flight) < jobs * 4:
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    file_path, pages, error = task
+                    if pages is None:
+                        future = Future()
+                        future.set_result(([{"file": file_path, "error": error}], None))
+                    else:
+                        future = executor.submit(_extract_worker, file_path, pages)
+                    in_flight.append(future)
+                if not in_flight:
+                    return
+
+                if ordered:
+                    future = in_flight.popleft()
+                else:
+                    future = next(iter(wait(in_flight, return_when=FIRST_COMPLETED).done))
+                    in_flight.remove(future)
+                records, stats = future.result()
+                if stats is not None:
+                    _stats.merge(stats)
+                yield from records
+        finally:
+            # A consumer that stops early (closed pipe, break) should not wait for chunks nobody will read.
+            for future in in_flight:
+                future.cancel()
+
+
+def extract_text_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py extract-text",
+                                     description="Extract the text of every page as JSON lines "
+                                                 '({"file", "page", "text", "chars"}).')
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories, glob patterns or @file lists")
+    parser.add_argument("-o", "--output", default="-", help="Write the JSON lines here (default: stdout)")
+    parser.add_argument("--order", choices=("ordered", "completed"), default="ordered",
+                        help="Emit records in page order, or as soon as each chunk of pages is done "
+                             "(default: ordered)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: CPU count)")
+    add_memory_args(parser)
+    add_cache_args(parser)
+    add_stats_args(parser)
+    args = parser.parse_args(argv)
+    return run_instrumented(args, "extract-text", lambda: run_extract_text(args))
+
+
+def run_extract_text(args):
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        print("Error: No input files found.", file=sys.stderr)
+        return 1
+
+    failed = 0
+    records = extract_text(paths, args.jobs, args.order == "ordered", use_mmap=args.mmap,
+                           max_memory=args.max_memory, cache=cache_from_args(args))
+    with (nullcontext(sys.stdout) if args.output == "-" else open(args.output, "w", encoding="utf-8")) as out:
+        try:
+            for record in records:
+                if "error" in record:
+                    failed += 1
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+        except BrokenPipeError:
+            # The reader went away (extract-text ... | head). Stop the workers and point stdout at
+            # /dev/null, so the interpreter's final flush does not print a traceback either.
+            records.close()
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+    return 1 if failed else 0
+
+
+# ---------------------------------------------------------------------------
+# Full-text index
+# ---------------------------------------------------------------------------
+DEFAULT_TEXT_INDEX = "pdf-ninja-index.sqlite"
+TEXT_INDEX_VERSION = 1
+TERM = re.compile(r"\w+")
+MAX_TERM_LENGTH = 64
+# Postings of a file are written out every this many pages, so indexing a
+# huge document does not hold all of its terms in memory.
+POSTINGS_FLUSH_PAGES = 512
+
+
+def tokenize(text):
+    """
+    Splits text into the case-folded terms the index stores: runs of letters,
+    digits and underscores, so "INV-2024/001" becomes inv, 2024 and 001.
+    """
+    return [term for term in TERM.findall(text.casefold()) if len(term) <= MAX_TERM_LENGTH]
+
+
+def _encode_pages(pages):
+    # Sorted 1-indexed page numbers as varint-encoded gaps: most postings take a byte or two per page.
+    out, previous = bytearray(), 0
+    for page in pages:
+        gap, previous = page - previous, page
+        while gap >= 0x80:
+            out.append(gap & 0x7F | 0x80)
+            gap >>= 7
+        out.append(gap)
+    return bytes(out)
+
+
+def _decode_pages(data):
+    pages, page, gap, shift = [], 0, 0, 0
+    for byte in data:
+        gap |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            page += gap
+            pages.append(page)
+            gap, shift = 0, 0
+    return pages
+
+
+def open_text_index(index_path):
+    import sqlite3
+
+    db = sqlite3.connect(index_path)
+    version = db.execute("PRAGMA user_version").fetchone()[0]
+    if version not in (0, TEXT_INDEX_VERSION):
+        db.close()
+        raise SplitError(f"'{index_path}' was built by an incompatible version; delete it and index again.")
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS files (
+            id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL,
+            size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, pages INTEGER NOT NULL);
+        CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, file_id INTEGER NOT NULL, pages BLOB NOT NULL);
+        CREATE INDEX IF NOT EXISTS postings_term ON postings (term);
+        CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+    """)
+    db.execute(f"PRAGMA user_version = {TEXT_INDEX_VERSION}")
+    return db
+
+
+def _file_signature(file_path):
+    st = os.stat(file_path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _forget_file(db, path):
+    row = db.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+    if row is not None:
+        db.execute("DELETE FROM postings WHERE file_id = ?", row)
+        db.execute("DELETE FROM files WHERE id = ?", row)
+
+
+def _flush_postings(db, file_id, terms):
+    db.executemany("INSERT INTO postings (term, file_id, pages) VALUES (?, ?, ?)",
+                   ((term, file_id, _encode_pages(pages)) for term, pages in terms.items()))
+    terms.clear()
+
+
+def _finish_file(db, file_id, signature, pages, terms, readable):
+    # Commits one file's postings, or rolls back to its previous entry if it could not be read at all.
+    if not readable:
+        db.rollback()
+        return 0
+    _flush_postings(db, file_id, terms)
+    db.execute("UPDATE files SET size = ?, mtime_ns = ?, pages = ? WHERE id = ?", (*signature, pages, file_id))
+    db.commit()
+    return 1
+
+
+def update_text_index(paths, index_path=DEFAULT_TEXT_INDEX, jobs=None, use_mmap=False, max_memory=None,
+                      cache=None):
+    """
+    Brings the index at index_path up to date for the given PDFs: files whose
+    size and mtime are unchanged are skipped, new or changed ones are
+    re-extracted (through extract_text) and indexed files that no longer exist
+    are dropped. Returns (indexed, unchanged, removed, failures) where
+    failures lists (file_path, error); a file with unreadable pages is still
+    indexed, one that cannot be opened keeps its previous entry. A file with no
+    pages is recorded too, so it is not read again until it changes.
+    """
+    db = open_text_index(index_path)
     try:
-        reader = PdfReader(file_path)
-        writer = PdfWriter()
+        known = {path: (size, mtime_ns)
+                 for path, size, mtime_ns in db.execute("SELECT path, size, mtime_ns FROM files")}
+        removed = [path for path in known if not os.path.exists(path)]
+        for path in removed:
+            _forget_file(db, path)
+        db.commit()
 
-        # pypdf uses 0-indexed page numbers
-        # The user provides 1-indexed page numbers
-        total_pages = len(reader.pages)
-        
-        if start_page < 1 or end_page > total_pages or start_page > end_page:
-            print(f"Error: Invalid page range. Total pages: {total_pages}")
-            return
+        # Missing inputs go through too, so extract_text reports them.
+        paths = list(dict.fromkeys(os.path.abspath(path) for path in paths))
+        stale = [path for path in paths if not os.path.exists(path) or known.get(path) != _file_signature(path)]
+        unchanged = len(paths) - len(stale)
 
-        for i in range(start_page - 1, end_page):
-            writer.add_page(reader.pages[i])
+        failures, indexed, seen = [], 0, set()
+        current, file_id, signature, terms, pages_seen, readable = None, None, None, {}, 0, True
+        with timed("index"):
+            for record in extract_text(stale, jobs, ordered=True, use_mmap=use_mmap, max_memory=max_memory,
+                                       cache=cache):
+                if record["file"] != current:
+                    if current is not None:
+                        indexed += _finish_file(db, file_id, signature, pages_seen, terms, readable)
+                        seen.add(current)
+                    current, terms, pages_seen, readable = record["file"], {}, 0, True
+                    # Taken before extraction finishes: a file edited meanwhile is simply indexed again next time.
+                    signature = _file_signature(current)
+                    _forget_file(db, current)
+                    file_id = db.execute("INSERT INTO files (path, size, mtime_ns, pages) VALUES (?, -1, -1, 0)",
+                                         (current,)).lastrowid
+                if "error" in record:
+                    if "page" in record:
+                        failures.append((current, f"page {record['page']}: {record['error']}"))
+                    else:
+                        failures.append((current, record["error"]))
+                        readable = False
+                    continue
+                pages_seen += 1
+                for term in set(tokenize(record["text"])):
+                    terms.setdefault(term, []).append(record["page"])
+                if pages_seen % POSTINGS_FLUSH_PAGES == 0:
+                    _flush_postings(db, file_id, terms)
+            if current is not None:
+                indexed += _finish_file(db, file_id, signature, pages_seen, terms, readable)
+                seen.add(current)
 
-        output_dir = os.path.dirname(os.path.abspath(file_path))
-        output_path = os.path.join(output_dir, output_name)
+            # extract_text has nothing to say about a file without pages, but it still needs its row.
+            for path in stale:
+                if path not in seen and os.path.exists(path):
+                    _forget_file(db, path)
+                    db.execute("INSERT INTO files (path, size, mtime_ns, pages) VALUES (?, ?, ?, 0)",
+                               (path, *_file_signature(path)))
+                    db.commit()
+                    indexed += 1
+        return indexed, unchanged, len(removed), failures
+    finally:
+        db.close()
+
+
+def query_text_index(query, index_path=DEFAULT_TEXT_INDEX):
+    """
+    Returns [(file_path, [1-indexed pages])] for the pages that contain every
+    term of the query, in path order. Terms may appear anywhere on the page and
+    in any order: this is an all-words search, not a phrase search. Files changed since they were indexed
+    are left out with a warning.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        raise SplitError("The query has no searchable terms.")
+    if not os.path.exists(index_path):
+        raise SplitError(f"No index at '{index_path}'; run 'main.py index' first.")
+
+    db = open_text_index(index_path)
+    try:
+        matches = None
+        with timed("query"):
+            # Rarest term first, so the candidate set is as small as it gets from the start.
+            for term in sorted(terms, key=lambda t: db.execute("SELECT COUNT(*) FROM postings WHERE term = ?",
+                                                                 (t,)).fetchone()[0]):
+                found = {}
+                for file_id, data in db.execute("SELECT file_id, pages FROM postings WHERE term = ?", (term,)):
+                    if matches is None or file_id in matches:
+                        found.setdefault(file_id, set()).update(_decode_pages(data))
+                if matches is not None:
+                    found = {file_id: pages & matches[file_id] for file_id, pages in found.items()}
+                matches = {file_id: pages for file_id, pages in found.items() if pages}
+                if not matches:
+                    return []
+
+        results = []
+        for file_id, path, size, mtime_ns in db.execute("SELECT id, path, size, mtime_ns FROM files ORDER BY path"):
+            if file_id not in matches:
+                continue
+            if not os.path.exists(path) or _file_signature(path) != (size, mtime_ns):
+                print(f"Warning: {path} changed since it was indexed; skipped (run 'main.py index' again).")
+                continue
+            results.append((path, sorted(matches[file_id])))
+        return results
+    finally:
+        db.close()
+
+
+def index_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py index",
+                                     description="Build or update a full-text page index over PDF files. "
+                                                 "Only new and changed files are read again.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories, glob patterns or @file lists")
+    parser.add_argument("--index", default=DEFAULT_TEXT_INDEX, help=f"Index file (default: {DEFAULT_TEXT_INDEX})")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: CPU count)")
+    add_memory_args(parser)
+    add_cache_args(parser)
+    add_stats_args(parser)
+    args = parser.parse_args(argv)
+    return run_instrumented(args, "index", lambda: run_index(args))
+
+
+def run_index(args):
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        print("Error: No input files found.")
+        return 1
+    try:
+        indexed, unchanged, removed, failures = update_text_index(
+            paths, args.index, args.jobs, use_mmap=args.mmap, max_memory=args.max_memory,
+            cache=cache_from_args(args))
+    except SplitError as e:
+        print(f"Error: {e}")
+        return 1
+
+    for file_path, error in failures:
+        print(f"FAIL  {file_path}: {error}")
+    print(f"Done: {indexed} indexed, {unchanged} unchanged, {removed} removed, "
+          f"{len(failures)} error(s).")
+    return 1 if failures else 0
+
+
+def query_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py query",
+                                     description="Write every indexed page that contains all the query words "
+                                                 "into one PDF. Words match anywhere on the same page, in any "
+                                                 "order; this is not a phrase search.")
+    parser.add_argument("query", help='Words that must all be on the page, e.g. "invoice INV-2024-001"')
+    parser.add_argument("-o", "--output", help="Output PDF (required unless --list is used)")
+    parser.add_argument("--index", default=DEFAULT_TEXT_INDEX, help=f"Index file (default: {DEFAULT_TEXT_INDEX})")
+    parser.add_argument("--list", action="store_true", help="Only list the matching pages")
+    add_memory_args(parser)
+    add_cache_args(parser)
+    parser.add_argument("--optimize", action="store_true",
+                        help="Deduplicate identical streams, drop unused objects and write compressed "
+                             "object streams; prints the output's size before and after")
+    add_stats_args(parser)
+    args = parser.parse_args(argv)
+    if args.output is None and not args.list:
+        parser.error("-o/--output is required unless --list is used")
+    return run_instrumented(args, "query", lambda: run_query(args))
 
-        with open(output_path, "wb") as f:
-            writer.write(f)
 
-        print(f"Successfully saved split PDF to: {output_path}")
+def run_query(args):
+    try:
+        matches = query_text_index(args.query, args.index)
+        if not matches:
+            print("No pages match.")
+            return 1
+        if args.list:
+            for file_path, pages in matches:
+                print(f"{file_path}: {', '.join(map(str, pages))}")
+            return 0
 
+        output_path = args.output if args.output.lower().endswith(".pdf") else args.output + ".pdf"
+        write_page_selection([(file_path, [page - 1 for page in pages]) for file_path, pages in matches],
+                             output_path, use_mmap=args.mmap, max_memory=args.max_memory,
+                             cache=cache_from_args(args), optimize=args.optimize)
+    except SplitError as e:
+        print(f"Error: {e}")
+        return 1
     except Exception as e:
         print(f"An error occurred: {e}")
+        return 1
+
+    total = sum(len(pages) for _, pages in matches)
+    print(f"Successfully saved {total} matching pages from {len(matches)} file(s) to: {output_path}")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Job manifests
+# ---------------------------------------------------------------------------
+MANIFEST_FIELDS = ("file", "start", "end", "output")
+
+
+def job_key(job):
+    """
+    Identifies a manifest job across runs: its "id" if it has one, else its
+    (file, start, end, output) tuple.
+    """
+    if "id" in job:
+        return json.dumps(job["id"])
+    return json.dumps([job.get(field) for field in MANIFEST_FIELDS])
+
+
+def read_manifest(manifest_path):
+    """
+    Reads a JSONL manifest of {"file", "start", "end", "output"} jobs (plus an
+    optional "id"). The whole file is checked before anything runs, so a typo
+    on line 9,000 does not surface halfway through.
+    """
+    jobs = []
+    with open(manifest_path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                raise SplitError(f"{manifest_path} line {line_number}: invalid JSON ({e}).")
+            if not isinstance(job, dict) or any(field not in job for field in MANIFEST_FIELDS):
+                raise SplitError(f"{manifest_path} line {line_number}: a job needs "
+                                 + ", ".join(MANIFEST_FIELDS) + ".")
+            if not all(isinstance(job[field], int) for field in ("start", "end")):
+                raise SplitError(f"{manifest_path} line {line_number}: start and end must be page numbers.")
+            if not all(isinstance(job[field], str) for field in ("file", "output")):
+                raise SplitError(f"{manifest_path} line {line_number}: file and output must be strings.")
+            jobs.append(job)
+    return jobs
+
+
+def completed_jobs(log_path):
+    """
+    Returns the keys of the jobs a previous run logged as done. A line cut
+    short by a crash is ignored, so that job simply runs again.
+    """
+    done = set()
+    if not os.path.exists(log_path):
+        return done
+    with open(log_path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, dict) and entry.get("ok"):
+                done.add(job_key(entry))
+    return done
+
+
+def _manifest_group(file_path, jobs, use_mmap, max_memory, cache, optimize, passthrough):
+    # Runs every job on one source file from a single reader, yielding each result as soon as it is
+    # written; never raises, one result per job.
+    done = 0
+    try:
+        with open_pdf(file_path, use_mmap, max_memory, cache) as reader:
+            total_pages = len(reader.pages)
+            for job in jobs:
+                start = time.perf_counter()
+                output_name = job["output"]
+                if not output_name.lower().endswith(".pdf"):
+                    output_name += ".pdf"
+                output_path = os.path.join(os.path.dirname(os.path.abspath(file_path)), output_name)
+                try:
+                    check_range(job["start"], job["end"], total_pages)
+                    write_pages(reader, range(job["start"] - 1, job["end"]), output_path, max_memory, optimize,
+                                passthrough)
+                    result = dict(job, ok=True, path=output_path, seconds=round(time.perf_counter() - start, 6))
+                except Exception as e:
+                    result = dict(job, ok=False, error=str(e) or type(e).__name__)
+                done += 1
+                yield result
+    except Exception as e:
+        error = str(e) or type(e).__name__
+        for job in jobs[done:]:
+            yield dict(job, ok=False, error=error)
+
+
+def _manifest_worker(collect_stats, results, *group):
+    _start_worker_stats(collect_stats)
+    for result in _manifest_group(*group):
+        results.put(result)
+    return _take_worker_stats()
+
+
+def run_manifest(jobs, jobs_per_worker=None, use_mmap=False, max_memory=None, cache=None, optimize=False,
+                 passthrough=False):
+    """
+    Runs manifest jobs grouped by source file, so each PDF is opened once, and
+    yields one result dict per job (the job plus "ok" and "path" or "error")
+    as soon as that job finishes, even while the rest of its group is still
+    running. Groups are spread over a process pool, biggest first so one
+    large file does not end up last.
+    """
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job["file"], []).append(job)
+    ordered = sorted(groups.items(), key=lambda item: len(item[1]), reverse=True)
+
+    if jobs_per_worker == 1:
+        for file_path, group in ordered:
+            yield from _manifest_group(file_path, group, use_mmap, max_memory, cache, optimize, passthrough)
+        return
+
+    import queue
+    from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+    from multiprocessing import Manager
+
+    with Manager() as manager, ProcessPoolExecutor(max_workers=jobs_per_worker) as pool:
+        results = manager.Queue()
+        futures = [pool.submit(_manifest_worker, _stats is not None, results, file_path, group, use_mmap,
+                               max_memory, cache, optimize, passthrough)
+                   for file_path, group in ordered]
+        remaining = len(jobs)
+        while remaining:
+            try:
+                result = results.get(timeout=0.1)
+            except queue.Empty:
+                # Groups never raise, so a failed future means a worker died; stop instead of waiting forever.
+                for future in wait(futures, timeout=0, return_when=FIRST_EXCEPTION).done:
+                    future.result()
+                continue
+            remaining -= 1
+            yield result
+        for future in futures:
+            stats = future.result()
+            if stats is not None:
+                _stats.merge(stats)
+
+
+def manifest_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py run-manifest",
+                                     description="Run a JSONL manifest of split jobs, one "
+                                                 '{"file", "start", "end", "output"} object per line.')
+    parser.add_argument("manifest", help="Manifest file (JSONL)")
+    parser.add_argument("--log", help="Results log (JSONL); jobs it records as done are skipped on the next run "
+                                      "(default: MANIFEST with a .log.jsonl extension)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Number of worker processes (default: CPU count)")
+    add_memory_args(parser)
+    add_cache_args(parser)
+    add_optimize_args(parser)
+    add_stats_args(parser)
+    args = parser.parse_args(argv)
+    return run_instrumented(args, "run-manifest", lambda: run_manifest_command(args))
+
+
+def run_manifest_command(args):
+    from concurrent.futures.process import BrokenProcessPool
+
+    log_path = args.log or os.path.splitext(args.manifest)[0] + ".log.jsonl"
+    try:
+        jobs = read_manifest(args.manifest)
+    except (OSError, SplitError) as e:
+        print(f"Error: {e}")
+        return 1
+
+    done = completed_jobs(log_path)
+    pending = [job for job in jobs if job_key(job) not in done]
+    skipped = len(jobs) - len(pending)
+    if skipped:
+        print(f"Skipping {skipped} job(s) already done according to {log_path}.")
+
+    failed = 0
+    with open(log_path, "a+b") as log:
+        if log.tell():
+            log.seek(-1, os.SEEK_END)
+            if log.read(1) != b"\n":
+                # Close off a line cut short by a crash before appending after it.
+                log.write(b"\n")
+        unreported = {}
+        for job in pending:
+            unreported.setdefault(job_key(job), []).append(job)
+        try:
+            for result in run_manifest(pending, args.jobs, use_mmap=args.mmap, max_memory=args.max_memory,
+                                       cache=cache_from_args(args), optimize=args.optimize,
+                                       passthrough=args.passthrough):
+                # One line per job, flushed right away, so a crash loses nothing that finished.
+                log.write(json.dumps(result).encode() + b"\n")
+                log.flush()
+                unreported[job_key(result)].pop()
+                if not result["ok"]:
+                    failed += 1
+                    print(f"FAIL  {result['file']} {result['start']}-{result['end']}: {result['error']}")
+        except BrokenProcessPool as e:
+            # A worker was killed (out of memory, a crash in a C extension): every job not yet reported failed.
+            error = f"worker process died: {e}"
+            print(f"Error: {error}")
+            for job in (job for group in unreported.values() for job in group):
+                log.write(json.dumps(dict(job, ok=False, error=error)).encode() + b"\n")
+                failed += 1
+            log.flush()
+
+    print(f"Done: {len(pending) - failed} succeeded, {failed} failed, {skipped} skipped, {len(jobs)} total.")
+    return 1 if failed else 0
+
+
+# ---------------------------------------------------------------------------
+# Server mode
+# ---------------------------------------------------------------------------
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Only the owner can connect to it (see serve_main), unlike a localhost port.
+DEFAULT_SOCKET = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or os.path.expanduser("~"), ".pdf-ninja.sock")
+LOCAL_HOSTS = ("localhost", "127.0.0.1")
+
+
+class ReaderPool:
+    """
+    Keeps recently used readers open between requests. The least recently
+    used reader is closed once there are more than max_readers of them or
+    their source files add up to more than max_bytes. A reader is reopened
+    when its file's size or modification time changes.
+    """
+
+    def __init__(self, max_readers=32, max_bytes=1024 ** 3, use_mmap=False, max_memory=None, cache=None):
+        self.max_readers = max_readers
+        self.max_bytes = max_bytes
+        self.use_mmap = use_mmap
+        self.max_memory = max_memory
+        self.cache = cache
+        # abspath -> (size, mtime_ns), reader, ExitStack owning it, bytes counted against max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path):
+        path = os.path.abspath(file_path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.discard(path)
+            raise SplitError(f"File '{file_path}' not found.")
+        key = (st.st_size, st.st_mtime_ns)
+
+        entry = self.entries.get(path)
+        if entry is not None and entry[0] == key:
+            self.entries.move_to_end(path)
+            self.hits += 1
+            return entry[1]
+
+        self.discard(path)
+        self.misses += 1
+        stack = ExitStack()
+        try:
+            reader = stack.enter_context(open_pdf(path, self.use_mmap, self.max_memory, self.cache))
+        except BaseException:
+            stack.close()
+            raise
+        self.entries[path] = (key, reader, stack, st.st_size)
+        self.total_bytes += st.st_size
+        # The reader just opened always stays, even if it alone is over max_bytes.
+        while len(self.entries) > 1 and (len(self.entries) > self.max_readers or self.total_bytes > self.max_bytes):
+            self.discard(next(iter(self.entries)))
+        return reader
+
+    def discard(self, path):
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.total_bytes -= entry[3]
+            entry[2].close()
+
+    def close(self):
+        for path in list(self.entries):
+            self.discard(path)
+
+    def status(self):
+        return {"readers": len(self.entries), "bytes": self.total_bytes, "hits": self.hits, "misses": self.misses}
+
+
+def is_inside(path, root):
+    """
+    True if path, with symlinks resolved, is root itself or somewhere below it.
+    """
+    path, root = os.path.realpath(path), os.path.realpath(root)
+    return os.path.commonpath([path, root]) == root
+
+
+def check_output_name(source_dir, output_name):
+    if os.path.isabs(output_name) or not is_inside(os.path.join(source_dir, output_name), source_dir):
+        raise SplitError(f"Output '{output_name}' must stay inside the source file's directory.")
+
+
+TEMPLATE_FIELDS = ("stem", "start", "end", "page", "index", "title")
+NUMBER_FORMAT = re.compile(r"0?\d*d?")
+
+
+def check_output_template(template):
+    """
+    Refuses a template that can name files through more than plain field values:
+    conversions ({stem!r}), attribute or index access ({stem.__class__},
+    {stem[0]}), unknown fields, and format specs other than zero-padding a
+    number ({page:05d}), since a fill character lets "{title:.<2}" become "..".
+    """
+    try:
+        fields = [(name, spec, conversion) for _, name, spec, conversion in string.Formatter().parse(template)
+                  if name is not None]
+    except ValueError as e:
+        raise SplitError(f"Bad output template '{template}': {e}")
+    for name, spec, conversion in fields:
+        if (name not in TEMPLATE_FIELDS or conversion
+                or spec and (name in ("stem", "title") or not NUMBER_FORMAT.fullmatch(spec))):
+            raise SplitError(f"Bad output template '{template}': fields are plain "
+                             + ", ".join("{%s}" % field for field in TEMPLATE_FIELDS)
+                             + ", and numbers may only be zero-padded, e.g. {page:05d}.")
+
+
+def serve_request(pool, request, root=None):
+    """
+    Runs one split request with a pooled reader and returns the written paths.
+    A request names a "file" and either "start", "end" and "output" (what
+    split_pdf takes) or one of "ranges", "every", "max_size" or
+    "outline_depth" with an optional "output" template. "optimize" and
+    "passthrough" are optional flags.
+    The file must be inside root (when given) and outputs inside the file's
+    directory; anything else is refused with a SplitError.
+    """
+    file_path = request.get("file")
+    if not isinstance(file_path, str):
+        raise SplitError('A request needs a "file".')
+    if root is not None and not is_inside(file_path, root):
+        raise SplitError(f"File '{file_path}' is outside the served directory.")
+    source_dir = os.path.dirname(os.path.abspath(file_path))
+    optimize = bool(request.get("optimize"))
+    passthrough = bool(request.get("passthrough"))
+    max_size = request.get("max_size")
+    if isinstance(max_size, str):
+        try:
+            max_size = parse_size(max_size)
+        except argparse.ArgumentTypeError as e:
+            raise SplitError(str(e))
+
+    reader = pool.get(file_path)
+    if "start" in request or "end" in request:
+        start_page, end_page, output_name = request.get("start"), request.get("end"), request.get("output")
+        if not (isinstance(start_page, int) and isinstance(end_page, int) and isinstance(output_name, str)):
+            raise SplitError('A single split needs integer "start" and "end" and an "output" name.')
+        if not output_name.lower().endswith(".pdf"):
+            output_name += ".pdf"
+        check_output_name(source_dir, output_name)
+        check_range(start_page, end_page, len(reader.pages))
+        output_path = os.path.join(source_dir, output_name)
+        write_pages(reader, range(start_page - 1, end_page), output_path, pool.max_memory, optimize, passthrough)
+        return [output_path]
+
+    outline_depth = request.get("outline_depth")
+    if request.get("ranges") is None and request.get("every") is None and max_size is None and outline_depth is None:
+        raise SplitError('A request needs "start"/"end", "ranges", "every", "max_size" or "outline_depth".')
+    template = request.get("output") or (OUTLINE_TEMPLATE if outline_depth is not None else "{stem}_{start}-{end}.pdf")
+    if not isinstance(template, str):
+        raise SplitError('"output" must be a file name template.')
+    check_output_template(template)
+    # Every name is checked before anything is written.
+    plan = plan_outputs(reader, file_path, template, request.get("ranges"), request.get("every"), max_size=max_size,
+                        outline_depth=outline_depth)
+    for output_path, _, _ in plan:
+        check_output_name(source_dir, os.path.relpath(output_path, source_dir))
+    return split_reader(reader, file_path, template, max_memory=pool.max_memory, optimize=optimize,
+                        passthrough=passthrough, plan=plan)
+
+
+class SplitRequestHandler:
+    """
+    POST /split with a JSON request (see serve_request); GET /status for the
+    reader pool counters. Mixed into BaseHTTPRequestHandler by serve_main.
+    Over HTTP, a Host other than the server's own localhost address gets a 403,
+    so a web page cannot reach the server through DNS rebinding.
+    """
+    server_version = "pdf-ninja"
+
+    def do_GET(self):
+        if not self._check_host():
+            return
+        if self.path != "/status":
+            self._reply(404, {"ok": False, "error": f"No such endpoint: {self.path}"})
+            return
+        self._reply(200, dict(self.server.pool.status(), ok=True))
+
+    def do_POST(self):
+        if not self._check_host():
+            return
+        if self.path != "/split":
+            self._reply(404, {"ok": False, "error": f"No such endpoint: {self.path}"})
+            return
+        if self.headers.get_content_type() != "application/json":
+            # Browsers send cross-origin form posts without a preflight, but never as application/json.
+            self._reply(415, {"ok": False, "error": "Content-Type must be application/json"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            self._reply(400, {"ok": False, "error": f"Bad request: {e}"})
+            return
+
+        start = time.perf_counter()
+        try:
+            written = serve_request(self.server.pool, request, self.server.root)
+        except SplitError as e:
+            self._reply(400, {"ok": False, "error": str(e)})
+            return
+        except Exception as e:
+            # The reader may be in a bad state; open it afresh next time.
+            self.server.pool.discard(os.path.abspath(request.get("file", "")))
+            self._reply(500, {"ok": False, "error": str(e) or type(e).__name__})
+            return
+        self._reply(200, {"ok": True, "outputs": written, "seconds": round(time.perf_counter() - start, 6)})
+
+    def _check_host(self):
+        allowed = self.server.allowed_hosts
+        if allowed is None or self.headers.get("Host") in allowed:
+            return True
+        self._reply(403, {"ok": False, "error": f"Host '{self.headers.get('Host')}' is not allowed"})
+        return False
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket peers have no address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def add_endpoint_args(parser):
+    endpoint = parser.add_mutually_exclusive_group()
+    endpoint.add_argument("--socket", metavar="PATH", help=f"Unix socket path (default: {DEFAULT_SOCKET})")
+    endpoint.add_argument("--port", type=int,
+                          help=f"Use HTTP on --host:PORT instead of the Unix socket, e.g. {DEFAULT_PORT}")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"HTTP address with --port (default: {DEFAULT_HOST})")
+
+
+def serve_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py serve",
+                                     description="Serve split requests from a long-running process that keeps "
+                                                 "recently used PDFs open. Requests are handled one at a time.")
+    add_endpoint_args(parser)
+    parser.add_argument("--max-readers", type=int, default=32,
+                        help="Most PDFs kept open at once (default: 32)")
+    parser.add_argument("--max-reader-memory", type=parse_size, default=parse_size("1GB"), metavar="SIZE",
+                        help="Most source bytes kept open at once (default: 1GB)")
+    parser.add_argument("--root", default=".", metavar="DIR",
+                        help="Only serve files inside DIR (default: the current directory)")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    add_memory_args(parser)
+    add_cache_args(parser)
+    args = parser.parse_args(argv)
+
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import UnixStreamServer
+
+    handler = type("SplitRequestHandler", (SplitRequestHandler, BaseHTTPRequestHandler), {})
+    pool = ReaderPool(args.max_readers, args.max_reader_memory, use_mmap=args.mmap, max_memory=args.max_memory,
+                      cache=cache_from_args(args))
+    socket_path = (args.socket or DEFAULT_SOCKET) if args.port is None else None
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        old_umask = os.umask(0o177)
+        try:
+            server = UnixStreamServer(socket_path, handler)
+        finally:
+            os.umask(old_umask)
+        server.allowed_hosts = None
+        where = socket_path
+    else:
+        server = HTTPServer((args.host, args.port), handler)
+        server.allowed_hosts = {f"{host}:{server.server_port}" for host in {args.host, *LOCAL_HOSTS}}
+        where = f"http://{args.host}:{server.server_port}"
+    server.root = os.path.abspath(args.root)
+    server.pool = pool
+    server.verbose = args.verbose
 
+    # Shut down cleanly (closing readers, removing the socket) when a service manager stops us.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Serving on {where}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def client_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py client",
+                                     description="Send a split request to a running 'main.py serve'.")
+    add_endpoint_args(parser)
+    parser.add_argument("file_path", nargs="?", help="Path to the PDF file")
+    parser.add_argument("start_page", type=int, nargs="?", help="Start page number (1-indexed)")
+    parser.add_argument("end_page", type=int, nargs="?", help="End page number (1-indexed)")
+    parser.add_argument("output_name", nargs="?", help="New PDF file name (e.g., split.pdf)")
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument("--ranges", help="Split into several files, e.g. 1-25,26-50,51-60")
+    modes.add_argument("--every", type=int, metavar="N", help="Split into chunks of N pages each")
+    modes.add_argument("--max-size", type=parse_size, metavar="SIZE", help="Split into chunks of at most SIZE each")
+    modes.add_argument("--by-outline", action="store_true", help="Write one file per bookmarked section")
+    modes.add_argument("--status", action="store_true", help="Print the server's reader pool counters")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="Outline levels that start a section with --by-outline (default: 1)")
+    parser.add_argument("-o", "--output", help="Output name template for --ranges/--every/--max-size/--by-outline")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for the server (default: 600)")
+    add_optimize_args(parser)
+    args = parser.parse_args(argv)
+
+    if args.status:
+        method, path, body = "GET", "/status", None
+    else:
+        if args.file_path is None:
+            parser.error("file_path is required unless --status is used")
+        # The server has its own working directory.
+        request = {"file": os.path.abspath(args.file_path), "optimize": args.optimize,
+                   "passthrough": args.passthrough}
+        if args.ranges is not None or args.every is not None or args.max_size is not None or args.by_outline:
+            request.update(ranges=args.ranges, every=args.every, max_size=args.max_size,
+                           outline_depth=args.depth if args.by_outline else None, output=args.output)
+        elif args.start_page is None or args.end_page is None or args.output_name is None:
+            parser.error("start_page, end_page and output_name are required unless "
+                         "--ranges, --every, --max-size or --by-outline is used")
+        else:
+            request.update(start=args.start_page, end=args.end_page, output=args.output_name)
+        method, path, body = "POST", "/split", json.dumps(request)
+
+    import http.client
+    import socket
+
+    connection = http.client.HTTPConnection(args.host, args.port, timeout=args.timeout)
+    try:
+        if args.port is None:
+            # HTTPConnection speaks over whatever socket it is handed.
+            connection.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.sock.settimeout(args.timeout)
+            connection.sock.connect(args.socket or DEFAULT_SOCKET)
+        connection.request(method, path, body, {"Content-Type": "application/json"})
+        reply = json.loads(connection.getresponse().read())
+    except OSError as e:
+        print(f"Error: cannot reach the server: {e}")
+        return 1
+    finally:
+        connection.close()
+
+    if not reply.get("ok"):
+        print(f"Error: {reply.get('error')}")
+        return 1
+    if args.status:
+        print(json.dumps({key: value for key, value in reply.items() if key != "ok"}, indent=2))
+    elif len(reply["outputs"]) == 1 and "start" in request:
+        print(f"Successfully saved split PDF to: {reply['outputs'][0]}")
+    else:
+        print(f"Successfully saved {len(reply['outputs'])} split PDFs to: "
+              f"{os.path.dirname(os.path.abspath(args.file_path))}")
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Info
+# ---------------------------------------------------------------------------
+def info_main(argv):
+    parser = argparse.ArgumentParser(prog="main.py info",
+                                     description="Print the page count and basic metadata of PDF files. "
+                                                 "Only the trailer, catalog and root /Pages node are read "
+                                                 "when the file allows it.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories, glob patterns or @file lists")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per file")
+    add_memory_args(parser)
+    add_cache_args(parser)
+    add_stats_args(parser)
+    args = parser.parse_args(argv)
+    return run_instrumented(args, "info", lambda: run_info(args))
+
+
+def run_info(args):
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        print("Error: No input files found.")
+        return 1
+
+    failed = 0
+    cache = cache_from_args(args)
+    for file_path in paths:
+        try:
+            info = pdf_info(file_path, args.mmap, args.max_memory, cache)
+        except Exception as e:
+            failed += 1
+            if args.json:
+                print(json.dumps({"file": file_path, "error": str(e) or type(e).__name__}))
+            else:
+                print(f"Error: {file_path}: {e}")
+            continue
+
+        if args.json:
+            print(json.dumps(info))
+            continue
+        details = [f"{info['pages']} pages", format_size(info["size"])]
+        if info["version"]:
+            details.insert(1, f"PDF {info['version']}")
+        if info["encrypted"]:
+            details.append("encrypted")
+        print(f"{file_path}: " + ", ".join(details))
+        for key, value in info["metadata"].items():
+            print(f"  {key}: {value}")
+    return 1 if failed else 0
+
+
+COMMANDS = {
+    "batch": batch_main,
+    "run-manifest": manifest_main,
+    "serve": serve_main,
+    "client": client_main,
+    "info": info_main,
+    "extract-text": extract_text_main,
+    "index": index_main,
+    "query": query_main,
+}
 
-def main():
-    parser = argparse.ArgumentParser(description="PDF Ninja CLI - Split PDF files easily.")
-    parser.add_argument("file_path", help="Path to the PDF file")
-    parser.add_argument("start_page", type=int, help="Start page number (1-indexed)")
-    parser.add_argument("end_page", type=int, help="End page number (1-indexed)")
-    parser.add_argument("output_name", help="New PDF file name (e.g., split.pdf)")
 
-    args = parser.parse_args()
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # An existing file is always split, even if it is called "info"; "split" or "--" also force a file path.
+    if argv and not os.path.exists(argv[0]):
+        if argv[0] in COMMANDS:
+            return COMMANDS[argv[0]](argv[1:])
+        if argv[0] == "split":
+            argv = argv[1:]
+
+    parser = argparse.ArgumentParser(description="PDF Ninja CLI - Split PDF files easily.",
+                                     epilog="Other commands: " + ", ".join(COMMANDS) +
+                                            " (run 'main.py COMMAND -h' for details; "
+                                            "'main.py split FILE ...' or 'main.py -- FILE ...' splits a file "
+                                            "that shares a command's name)")
+    parser.add_argument("file_path", help="Path to the PDF file, or - to read it from standard input")
+    parser.add_argument("start_page", type=int, nargs="?", help="Start page number (1-indexed)")
+    parser.add_argument("end_page", type=int, nargs="?", help="End page number (1-indexed)")
+    parser.add_argument("output_name", nargs="?",
+                        help="New PDF file name (e.g., split.pdf), or - to write it to standard output")
+
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument("--ranges", help="Split into several files in one pass, e.g. 1-25,26-50,51-60")
+    modes.add_argument("--every", type=int, metavar="N", help="Split into chunks of N pages each")
+    modes.add_argument("--max-size", type=parse_size, metavar="SIZE",
+                       help="Split into consecutive chunks of at most SIZE each, e.g. 10MB")
+    modes.add_argument("--by-outline", action="store_true", help="Write one file per bookmarked section")
+    modes.add_argument("--split-on-blank", action="store_true",
+                       help="Write one file per run of pages between blank separator pages")
+    modes.add_argument("--burst", action="store_true", help="Write every page to its own file")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="Outline levels that start a section with --by-outline (default: 1)")
+    add_blank_args(parser)
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the pages each output would get (and the blank pages found with "
+                             "--split-on-blank) without writing anything")
+    parser.add_argument("-o", "--output",
+                        help="Output name template for --ranges/--every/--max-size/--by-outline/"
+                             "--split-on-blank/--burst "
+                             "(fields: {stem}, {start}, {end}, {page}, {index}, {title}; "
+                             "default: {stem}_{start}-{end}.pdf, " + OUTLINE_TEMPLATE + " for --by-outline "
+                             "or " + BURST_TEMPLATE + " for --burst)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="Worker processes for --burst and --split-on-blank (default: CPU count)")
+    add_memory_args(parser)
+    add_cache_args(parser)
+    add_optimize_args(parser)
+    add_force_args(parser)
+    add_stats_args(parser)
+
+    args = parser.parse_args(argv)
+    split_mode = (args.ranges is not None or args.every is not None or args.max_size is not None
+                  or args.by_outline or args.split_on_blank)
+    if not (args.burst or split_mode) and (
+            args.start_page is None or args.end_page is None or args.output_name is None):
+        parser.error("start_page, end_page and output_name are required unless "
+                     "--ranges, --every, --max-size, --by-outline, --split-on-blank or --burst is used")
+    if args.dry_run and not split_mode:
+        parser.error("--dry-run needs --ranges, --every, --max-size, --by-outline or --split-on-blank")
+    if args.file_path == STDIO and (args.burst or args.cache):
+        parser.error("--burst and --cache need a file path, not standard input")
+    if args.output == STDIO:
+        parser.error("only a single split (output_name -) can be written to standard output")
+
+    command = "burst" if args.burst else "ranges" if split_mode else "split"
+    return run_instrumented(args, command, lambda: run_split(args))
+
+
+def run_split(args):
+    cache = cache_from_args(args)
+
+    if args.burst:
+        try:
+            written = burst_pdf(args.file_path, args.output or BURST_TEMPLATE, jobs=args.jobs,
+                                use_mmap=args.mmap, max_memory=args.max_memory, cache=cache,
+                                optimize=args.optimize, passthrough=args.passthrough, force=args.force)
+            output_dir = (os.path.commonpath([os.path.dirname(path) for path in written]) if written
+                          else os.path.dirname(os.path.abspath(args.file_path)))
+            print(f"Successfully saved {len(written)} single-page PDFs to: {output_dir}")
+        except SplitError as e:
+            print(f"Error: {e}")
+        except Exception as e:
+            print(f"An error occurred: {e}")
+        return
+
+    if args.dry_run:
+        print_split_plan(args.file_path, args.output or (OUTLINE_TEMPLATE if args.by_outline else
+                                                         "{stem}_{start}-{end}.pdf"),
+                         ranges=args.ranges, every=args.every, use_mmap=args.mmap, max_memory=args.max_memory,
+                         cache=cache, max_size=args.max_size, outline_depth=args.depth if args.by_outline else None,
+                         split_on_blank=blank_from_args(args, args.jobs))
+        return
+
+    if args.by_outline:
+        split_pdf_ranges(args.file_path, args.output or OUTLINE_TEMPLATE,
+                         use_mmap=args.mmap, max_memory=args.max_memory, cache=cache,
+                         optimize=args.optimize, passthrough=args.passthrough, outline_depth=args.depth,
+                         force=args.force)
+        return
+
+    if args.split_on_blank:
+        split_pdf_ranges(args.file_path, args.output or "{stem}_{start}-{end}.pdf",
+                         use_mmap=args.mmap, max_memory=args.max_memory, cache=cache,
+                         optimize=args.optimize, passthrough=args.passthrough, force=args.force,
+                         split_on_blank=blank_from_args(args, args.jobs))
+        return
+
+    if args.ranges is not None or args.every is not None or args.max_size is not None:
+        split_pdf_ranges(args.file_path, args.output or "{stem}_{start}-{end}.pdf",
+                         ranges=args.ranges, every=args.every,
+                         use_mmap=args.mmap, max_memory=args.max_memory, cache=cache,
+                         optimize=args.optimize, passthrough=args.passthrough, max_size=args.max_size,
+                         force=args.force)
+        return
 
     # Ensure output_name has .pdf extension if not provided
     output_name = args.output_name
-    if not output_name.lower().endswith(".pdf"):
+    if output_name != STDIO and not output_name.lower().endswith(".pdf"):
         output_name += ".pdf"
 
-    split_pdf(args.file_path, args.start_page, args.end_page, output_name)
+    split_pdf(args.file_path, args.start_page, args.end_page, output_name,
+              use_mmap=args.mmap, max_memory=args.max_memory, cache=cache, optimize=args.optimize,
+              passthrough=args.passthrough, force=args.force)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import corpus  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def corpus_pdf(tmp_path_factory):
+    """
+    Returns corpus_pdf(kind, pages, xref="table"): the path of a benchmark corpus file (see
+    benchmarks/corpus.py), generated once per test session.
+    """
+    corpus_dir = str(tmp_path_factory.mktemp("corpus"))
+
+    def make(kind, pages, xref="table"):
+        return corpus.corpus_path(corpus_dir, kind, pages, xref)
+
+    return make
@@ -0,0 +1,43 @@
+import multiprocessing
+import os
+import shutil
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def sources(corpus_pdf, tmp_path):
+    paths = []
+    for index, kind in enumerate(["text", "images", "shared-font", "text"]):
+        paths.append(shutil.copy(corpus_pdf(kind, 12), str(tmp_path / f"doc{index}.pdf")))
+    return paths
+
+
+@pytest.mark.parametrize("extra", [[], ["--async"]])
+def test_batch_splits_every_file(sources, tmp_path, extra, capsys):
+    assert main.main(["batch", *sources, "--every", "5", "--output-dir", str(tmp_path / "out"), "-j", "2",
+                      *extra]) == 0
+    assert len([name for name in os.listdir(tmp_path / "out") if name.endswith(".pdf")]) == 4 * 3
+    assert "4 succeeded, 0 failed" in capsys.readouterr().out
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="workers must inherit the monkeypatch")
+def test_dead_worker_fails_files_instead_of_the_batch(sources, tmp_path, monkeypatch, capsys):
+    job = main._batch_job
+
+    def crashing_job(file_path, *args):
+        if file_path == sources[-1]:
+            os._exit(1)
+        return job(file_path, *args)
+
+    monkeypatch.setattr(main, "_batch_job", crashing_job)
+    results = {path: (ok, detail) for path, ok, detail in
+               main.batch_split(sources, "{stem}_{start}.pdf", every=5, output_dir=str(tmp_path / "out"), jobs=2)}
+    assert sorted(results) == sorted(sources)
+    assert not results[sources[-1]][0]
+    assert "worker process died" in results[sources[-1]][1]
+
+    assert main.main(["batch", *sources, "--every", "5", "--output-dir", str(tmp_path / "out2"), "-j", "2"]) == 1
+    assert "worker process died" in capsys.readouterr().out
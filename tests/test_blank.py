@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+import corpus
+import main
+
+SIDE = 400
+BLANK = {2, 66}
+
+
+@pytest.fixture(scope="module")
+def separated(tmp_path_factory):
+    # 70 pages, each a full-page CMYK image: blank paper on the separator pages, noise elsewhere.
+    # The sample check cannot read CMYK, so only the compression ratio can call a page blank.
+    rng = random.Random(0)
+    noise = rng.randbytes(SIDE * SIDE * 4)
+    builder = corpus.PdfBuilder()
+    catalog = builder.reserve()
+    pages = [builder.reserve() for _ in range(70)]
+    root, parents = corpus._page_tree(builder, pages)
+    for number, num in enumerate(pages, 1):
+        image = builder.add_stream(bytes(SIDE * SIDE * 4) if number in BLANK else noise,
+                                   b" /Type /XObject /Subtype /Image /Width %d /Height %d "
+                                   b"/ColorSpace /DeviceCMYK /BitsPerComponent 8" % (SIDE, SIDE))
+        content = builder.add_stream(b"q 612 0 0 792 0 0 cm /Im1 Do Q")
+        builder.set(num, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] "
+                         b"/Resources << /XObject << /Im1 %d 0 R >> >> /Contents %d 0 R >>"
+                    % (parents[num], image, content))
+    builder.set(catalog, b"<< /Type /Catalog /Pages %d 0 R >>" % root)
+    path = str(tmp_path_factory.mktemp("blank") / "separated.pdf")
+    builder.write(path, catalog)
+    return path
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_blank_images_found_by_compression_ratio(separated, jobs):
+    detection = main.BlankDetection(main.BLANK_CONTENT_BYTES, main.BLANK_IMAGE_RATIO, main.BLANK_INK, jobs)
+    with main.open_pdf(separated) as reader:
+        assert main.blank_pages(reader, separated, detection) == sorted(BLANK)
+
+
+def test_without_the_file_only_readable_samples_count(separated):
+    detection = main.BlankDetection(main.BLANK_CONTENT_BYTES, main.BLANK_IMAGE_RATIO, main.BLANK_INK, 1)
+    with main.open_pdf(separated) as reader:
+        assert not main.page_is_blank(reader.pages[1], detection)
+        with main.open_skimmer(separated) as skimmer:
+            assert main.page_is_blank(reader.pages[1], detection, skimmer)
+
+
+def test_text_pages_are_judged_from_stream_lengths(corpus_pdf, monkeypatch):
+    # With the file at hand, a page whose content stream is long on disk is not decoded at all.
+    path = corpus_pdf("text", 5)
+    detection = main.BlankDetection(main.BLANK_CONTENT_BYTES, main.BLANK_IMAGE_RATIO, main.BLANK_INK, 1)
+    with main.open_pdf(path) as reader, main.open_skimmer(path) as skimmer:
+        monkeypatch.setattr(type(reader.pages[0]), "get_contents", lambda self: pytest.fail("content stream decoded"))
+        assert not any(main.page_is_blank(page, detection, skimmer) for page in reader.pages)
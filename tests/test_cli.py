@@ -0,0 +1,104 @@
+import os
+import shutil
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def named_info(corpus_pdf, tmp_path, monkeypatch):
+    # A PDF called "info" in the working directory, the same name as the info command.
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(corpus_pdf("text", 10), "info")
+    return tmp_path
+
+
+def test_existing_file_wins_over_command(named_info):
+    main.main(["info", "2", "4", "out.pdf", "--force"])
+    assert len(main.PdfReader("out.pdf").pages) == 3
+
+
+@pytest.mark.parametrize("prefix", [["split"], ["--"]])
+def test_split_prefix_forces_a_file_path(corpus_pdf, tmp_path, monkeypatch, prefix):
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(corpus_pdf("text", 10), "doc.pdf")
+    main.main(prefix + ["doc.pdf", "1", "2", "out.pdf"])
+    assert len(main.PdfReader("out.pdf").pages) == 2
+
+
+def test_commands_dispatch_without_a_matching_file(corpus_pdf, capsys):
+    main.main(["info", corpus_pdf("text", 10)])
+    assert "10" in capsys.readouterr().out
+
+
+@pytest.fixture
+def bookmarked(tmp_path):
+    # 12 pages: Intro 1, Chapter 1 at 3 with Section 1.1 at 4, an awkward title at 7, and two "Notes".
+    main._import_pypdf()
+    writer = main.PdfWriter()
+    for _ in range(12):
+        writer.add_blank_page(200, 200)
+    writer.add_outline_item("Intro", 0)
+    chapter = writer.add_outline_item("Chapter 1", 2)
+    writer.add_outline_item("Section 1.1", 3, parent=chapter)
+    writer.add_outline_item("Chapter: 2/Draft?", 6)
+    writer.add_outline_item("Notes", 9)
+    writer.add_outline_item("Notes", 10)
+    path = str(tmp_path / "book.pdf")
+    writer.write(path)
+    return path
+
+
+def _outputs(directory):
+    return {name: len(main.PdfReader(os.path.join(directory, name)).pages)
+            for name in sorted(os.listdir(directory)) if name.startswith("book_") and name.endswith(".pdf")}
+
+
+@pytest.mark.parametrize("extra", [[], ["--passthrough"]])
+def test_by_outline_top_level(bookmarked, tmp_path, extra):
+    main.main([bookmarked, "--by-outline", *extra])
+    assert _outputs(tmp_path) == {"book_01_Intro.pdf": 2, "book_02_Chapter_1.pdf": 4,
+                                  "book_03_Chapter_2_Draft.pdf": 3, "book_04_Notes.pdf": 1, "book_05_Notes.pdf": 2}
+
+
+def test_by_outline_nested_depth(bookmarked, tmp_path):
+    main.main([bookmarked, "--by-outline", "--depth", "2", "-o", "book_{start}-{end}_{title}.pdf"])
+    assert _outputs(tmp_path) == {"book_1-2_Intro.pdf": 2, "book_3-3_Chapter_1.pdf": 1,
+                                  "book_4-6_Section_1.1.pdf": 3, "book_7-9_Chapter_2_Draft.pdf": 3,
+                                  "book_10-10_Notes.pdf": 1, "book_11-12_Notes.pdf": 2}
+
+
+def test_by_outline_refuses_colliding_names(bookmarked, tmp_path, capsys):
+    main.main([bookmarked, "--by-outline", "-o", "book_{title}.pdf"])
+    assert "add {index} or {start}" in capsys.readouterr().out
+    assert _outputs(tmp_path) == {}
+
+
+@pytest.fixture
+def burst_source(corpus_pdf, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(corpus_pdf("text", 6), "doc.pdf")
+    writes = []
+    write_pages = main.write_pages
+    monkeypatch.setattr(main, "write_pages", lambda reader, indices, *a: writes.append(list(indices))
+                        or write_pages(reader, indices, *a))
+    return writes
+
+
+def test_burst_skips_current_pages(burst_source, tmp_path):
+    main.main(["doc.pdf", "--burst", "--jobs", "1"])
+    assert len(burst_source) == 6
+    os.remove("doc_00004.pdf")
+    main.main(["doc.pdf", "--burst", "--jobs", "1"])
+    assert burst_source[6:] == [[3]]
+    main.main(["doc.pdf", "--burst", "--jobs", "1", "--force"])
+    assert len(burst_source) == 13
+    assert sorted(name for name in os.listdir(tmp_path) if name.startswith("doc_")) == \
+        [f"doc_{page:05d}.pdf{suffix}" for page in range(1, 7) for suffix in ("", main.RECORD_SUFFIX)]
+
+
+def test_burst_reports_the_output_directory(burst_source, tmp_path, capsys):
+    main.main(["doc.pdf", "--burst", "--jobs", "1", "-o", "pages/{page}.pdf"])
+    assert capsys.readouterr().out.strip().endswith(os.path.join(str(tmp_path), "pages"))
+    assert len(main.PdfReader(os.path.join("pages", "6.pdf")).pages) == 1
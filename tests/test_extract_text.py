@@ -0,0 +1,25 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import main
+
+
+def test_records_follow_page_order(corpus_pdf):
+    records = list(main.extract_text([corpus_pdf("text", 40)], jobs=2, chunk_pages=7))
+    assert [record["page"] for record in records] == list(range(1, 41))
+    assert records[11]["text"].startswith("Page 12, line 0")
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_closed_pipe_exits_quietly(corpus_pdf, jobs):
+    # Like `main.py extract-text big.pdf | head -1`: the reader leaves after one line.
+    process = subprocess.Popen([sys.executable, main.__file__, "extract-text", "-j", jobs, corpus_pdf("text", 2000)],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=dict(os.environ))
+    assert json.loads(process.stdout.readline())["page"] == 1
+    process.stdout.close()
+    _, stderr = process.communicate(timeout=60)
+    assert b"Traceback" not in stderr and b"BrokenPipe" not in stderr
@@ -0,0 +1,61 @@
+import json
+import multiprocessing
+import os
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def manifest(corpus_pdf, tmp_path):
+    jobs = [{"file": corpus_pdf(kind, 20), "start": start, "end": start + 4, "output": f"{kind}-{start}"}
+            for kind in ("text", "images") for start in range(1, 17, 5)]
+    jobs.append({"file": corpus_pdf("text", 20), "start": 18, "end": 25, "output": "too-long"})
+    path = tmp_path / "jobs.jsonl"
+    path.write_text("".join(json.dumps(job) + "\n" for job in jobs))
+    return str(path), jobs
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_manifest_yields_every_job(manifest, workers):
+    _, jobs = manifest
+    results = list(main.run_manifest(jobs, workers))
+    assert sorted(main.job_key(r) for r in results) == sorted(main.job_key(job) for job in jobs)
+    failed = [r for r in results if not r["ok"]]
+    assert [r["output"] for r in failed] == ["too-long"]
+    for result in results:
+        if result["ok"]:
+            assert len(main.PdfReader(result["path"]).pages) == 5
+
+
+def test_log_records_results_and_skips_them_next_run(manifest, capsys):
+    path, jobs = manifest
+    assert main.main(["run-manifest", path, "-j", "2"]) == 1
+    with open(path.replace(".jsonl", ".log.jsonl")) as f:
+        logged = [json.loads(line) for line in f]
+    assert len(logged) == len(jobs)
+
+    assert main.main(["run-manifest", path, "-j", "2"]) == 1
+    assert f"Skipping {len(jobs) - 1} job(s)" in capsys.readouterr().out
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="workers must inherit the monkeypatch")
+def test_dead_worker_fails_the_remaining_jobs(manifest, monkeypatch, capsys):
+    path, jobs = manifest
+    crash_file = jobs[-1]["file"]
+    group = main._manifest_group
+
+    def crashing_group(file_path, *args):
+        if file_path == crash_file:
+            os._exit(1)
+        return group(file_path, *args)
+
+    monkeypatch.setattr(main, "_manifest_group", crashing_group)
+    assert main.main(["run-manifest", path, "-j", "2"]) == 1
+    assert "Error: worker process died" in capsys.readouterr().out
+
+    with open(path.replace(".jsonl", ".log.jsonl")) as f:
+        logged = [json.loads(line) for line in f]
+    assert sorted(main.job_key(r) for r in logged) == sorted(main.job_key(job) for job in jobs)
+    assert all(r["error"].startswith("worker process died") for r in logged if r["file"] == crash_file)
@@ -0,0 +1,29 @@
+import mmap
+import os
+import sys
+
+import pytest
+
+import main
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="needs procfs")
+def test_mapped_file_pages_do_not_count(tmp_path):
+    path = tmp_path / "big.bin"
+    path.write_bytes(b"x" * (64 << 20))
+    before = main.current_rss()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+        assert sum(view[offset] for offset in range(0, len(view), mmap.PAGESIZE))
+        assert main.current_rss() - before < 16 << 20
+
+
+def test_stdin_is_read_from_its_current_position(corpus_pdf, tmp_path, monkeypatch):
+    path = tmp_path / "framed.bin"
+    with open(corpus_pdf("text", 5), "rb") as f:
+        path.write_bytes(b"HEADER\n" + f.read())
+    with open(path, "rb") as stdin:
+        os.lseek(stdin.fileno(), len(b"HEADER\n"), os.SEEK_SET)
+        monkeypatch.setattr(sys, "stdin", stdin)
+        with main.read_stdin() as (source, size):
+            assert size == os.path.getsize(path) - len(b"HEADER\n")
+            assert source.read(5) == b"%PDF-"
@@ -0,0 +1,69 @@
+from io import BytesIO
+
+import pytest
+
+import corpus
+import main
+
+
+def _pypdf_output(path, indices):
+    buf = BytesIO()
+    with main.open_pdf(path) as reader:
+        main.write_pages(reader, indices, buf)
+    return buf.getvalue()
+
+
+def _contents(reader):
+    return [page.get_contents().get_data() for page in reader.pages]
+
+
+@pytest.mark.parametrize("kind", corpus.KINDS)
+def test_optimized_output_reopens_strictly(corpus_pdf, kind):
+    data = _pypdf_output(corpus_pdf(kind, 30), range(30))
+    optimized = main.optimize_pdf(data)
+
+    before = main.PdfReader(BytesIO(data))
+    after = main.PdfReader(BytesIO(optimized), strict=True)
+    assert len(after.pages) == 30
+    assert _contents(after) == _contents(before)
+    assert [list(page.mediabox) for page in after.pages] == [list(page.mediabox) for page in before.pages]
+    assert b"/ObjStm" in optimized and b"/XRef" in optimized
+
+
+def test_identical_streams_are_stored_once(corpus_pdf):
+    # The same page copied from two readers brings two copies of its 256 KB font program.
+    path = corpus_pdf("shared-font", 4)
+    writer = main.PdfWriter()
+    for _ in range(2):
+        writer.add_page(main.PdfReader(path).pages[0])
+    buf = BytesIO()
+    writer.write(buf)
+
+    optimized = main.optimize_pdf(buf.getvalue())
+    assert len(optimized) < len(buf.getvalue()) - corpus.FONT_FILE_SIZE // 2
+    reader = main.PdfReader(BytesIO(optimized), strict=True)
+    fonts = [page["/Resources"]["/Font"]["/F1"]["/FontDescriptor"].raw_get("/FontFile2") for page in reader.pages]
+    assert fonts[0].idnum == fonts[1].idnum
+
+
+def test_unfiltered_streams_are_compressed():
+    main._import_pypdf()
+    from pypdf.generic import DecodedStreamObject
+
+    writer = main.PdfWriter()
+    content = DecodedStreamObject()
+    content.set_data(b"0 0 m 100 100 l S\n" * 50)
+    writer.add_blank_page(200, 200).replace_contents(content)
+    buf = BytesIO()
+    writer.write(buf)
+
+    reader = main.PdfReader(BytesIO(main.optimize_pdf(buf.getvalue())), strict=True)
+    contents = reader.pages[0].raw_get("/Contents").get_object()
+    assert contents["/Filter"] == "/FlateDecode"
+    assert contents.get_data() == b"0 0 m 100 100 l S\n" * 50
+
+
+def test_split_with_optimize_writes_a_valid_file(corpus_pdf, tmp_path):
+    written = main.split_file(corpus_pdf("images", 20), "{stem}_{start}-{end}.pdf", ranges="3-7,8-20",
+                              output_dir=str(tmp_path), optimize=True)
+    assert [len(main.PdfReader(path, strict=True).pages) for path in written] == [5, 13]
@@ -0,0 +1,53 @@
+import pytest
+
+import main
+
+KINDS = ("text", "images", "shared-font", "incremental")
+
+
+def _page_summary(page):
+    reference = page.indirect_reference
+    return {
+        "reference": (reference.idnum, reference.generation),
+        "keys": sorted(page.keys()),
+        "mediabox": [float(v) for v in page.mediabox],
+        "resources": sorted(page["/Resources"].get_object().keys()),
+        "contents": page.get_contents().get_data(),
+    }
+
+
+@pytest.fixture
+def indexed():
+    main._import_pypdf()
+    if main.IndexedPdfReader is None:
+        pytest.skip("installed pypdf is outside PAGE_INDEX_PYPDF")
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_cached_pages_match_uncached(indexed, corpus_pdf, tmp_path, kind):
+    path = corpus_pdf(kind, 130)
+    cache = main.PageIndexCache(str(tmp_path))
+    with main.open_pdf(path, cache=cache):
+        pass                                    # first open builds and stores the index
+
+    with main.open_pdf(path) as plain, main.open_pdf(path, cache=cache) as cached:
+        assert cached._index is not None
+        assert len(cached.pages) == len(plain.pages)
+        for i in (0, 1, 63, 64, 65, 129):
+            assert _page_summary(cached.pages[i]) == _page_summary(plain.pages[i])
+
+
+@pytest.mark.parametrize("version, supported", [
+    ("6.6.0", True), ("6.20.1", True), ("6.5.9", False), ("6.21.0", False), ("7.0.0", False), ("dev", False),
+])
+def test_page_index_supported(version, supported):
+    assert main.page_index_supported(version) is supported
+
+
+def test_unsupported_pypdf_bypasses_cache(corpus_pdf, tmp_path, monkeypatch):
+    main._import_pypdf()
+    monkeypatch.setattr(main, "IndexedPdfReader", None)
+    cache = main.PageIndexCache(str(tmp_path))
+    with main.open_pdf(corpus_pdf("text", 10), cache=cache) as reader:
+        assert type(reader) is main.PdfReader
+        assert len(reader.pages) == 10
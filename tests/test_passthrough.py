@@ -0,0 +1,76 @@
+from io import BytesIO
+
+import pytest
+
+import corpus
+import main
+
+SELECTIONS = ([0], [2, 5, 9], list(range(20)), [19, 0])
+
+
+def _write(path, indices, **options):
+    buf = BytesIO()
+    with main.open_pdf(path) as reader:
+        main.write_pages(reader, indices, buf, **options)
+    return main.PdfReader(BytesIO(buf.getvalue()), strict=True)
+
+
+def _summary(reader):
+    return [(page.get_contents().get_data(), [float(v) for v in page.mediabox],
+             sorted(page["/Resources"].get("/Font", {}).keys()), sorted(page["/Resources"].get("/XObject", {}).keys()))
+            for page in reader.pages]
+
+
+@pytest.mark.parametrize("kind", corpus.KINDS)
+@pytest.mark.parametrize("indices", SELECTIONS)
+def test_passthrough_matches_pypdf(corpus_pdf, kind, indices):
+    path = corpus_pdf(kind, 20)
+    raw = _write(path, indices, passthrough=True)
+    assert len(raw.pages) == len(indices)
+    assert _summary(raw) == _summary(_write(path, indices))
+
+
+def test_passthrough_from_object_streams(corpus_pdf, tmp_path):
+    # optimize_pdf output keeps its dictionaries in object streams, which the copier reads from.
+    path = tmp_path / "packed.pdf"
+    with open(corpus_pdf("shared-font", 20), "rb") as f:
+        path.write_bytes(main.optimize_pdf(f.read()))
+    raw = _write(str(path), [1, 3, 18], passthrough=True)
+    assert _summary(raw) == _summary(_write(str(path), [1, 3, 18]))
+
+
+def test_passthrough_with_optimize(corpus_pdf):
+    path = corpus_pdf("text", 20)
+    optimized = _write(path, [4, 5, 6], passthrough=True, optimize=True)
+    assert _summary(optimized) == _summary(_write(path, [4, 5, 6]))
+
+
+def test_only_the_page_parent_is_replaced(tmp_path):
+    # An inline annotation with its own /Parent, and a string that looks like one, must come through untouched.
+    builder = corpus.PdfBuilder()
+    catalog, pages, page, other = builder.reserve(), builder.reserve(), builder.reserve(), builder.reserve()
+    content = builder.add_stream(b"BT /F1 12 Tf 72 720 Td (hello) Tj ET")
+    note = b"/Parent 2 0 R (kept)"
+    builder.set(page, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+                      b"/Annots [<< /Type /Annot /Subtype /Text /Rect [0 0 10 10] /Contents (/Parent 2 0 R \\(kept\\)) "
+                      b"/Popup << /Parent %d 0 R /Open false >> >>] >>" % (pages, content, page))
+    builder.set(other, b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] >>" % pages)
+    builder.set(pages, b"<< /Type /Pages /Kids [%d 0 R %d 0 R] /Count 2 >>" % (page, other))
+    builder.set(catalog, b"<< /Type /Catalog /Pages %d 0 R >>" % pages)
+    path = str(tmp_path / "annotated.pdf")
+    builder.write(path, catalog)
+
+    raw = _write(path, [0], passthrough=True)
+    copied = raw.pages[0]
+    annotation = copied["/Annots"][0]
+    assert annotation["/Contents"] == note.decode()
+    assert annotation["/Popup"].raw_get("/Parent").idnum == copied.indirect_reference.idnum
+    assert copied.raw_get("/Parent").get_object()["/Type"] == "/Pages"
+
+
+@pytest.mark.parametrize("data", [b"(unterminated", b"(ends in an escape\\", b"(nested (still open)"])
+def test_unterminated_strings_raise_split_error(data):
+    with pytest.raises(main.SplitError):
+        main.scan_object(b"<< /T " + data, 0)
+    with pytest.raises(main.SplitError):
+        main.parse_value(b"<< /T " + data, 0)
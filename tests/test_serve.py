@@ -0,0 +1,105 @@
+import http.client
+import json
+import os
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def source(corpus_pdf, tmp_path):
+    os.mkdir(tmp_path / "docs")
+    return shutil.copy(corpus_pdf("text", 10), str(tmp_path / "docs" / "doc.pdf"))
+
+
+@pytest.fixture
+def pool():
+    pool = main.ReaderPool()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def server(pool, source):
+    handler = type("SplitRequestHandler", (main.SplitRequestHandler, BaseHTTPRequestHandler), {})
+    server = HTTPServer(("127.0.0.1", 0), handler)
+    server.pool, server.verbose, server.root = pool, False, os.path.dirname(source)
+    server.allowed_hosts = {f"{host}:{server.server_port}" for host in main.LOCAL_HOSTS}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _post(server, request, headers):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=10)
+    try:
+        connection.request("POST", "/split", json.dumps(request), headers)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def test_serve_request_writes_next_to_the_source(pool, source):
+    written = main.serve_request(pool, {"file": source, "start": 2, "end": 3, "output": "part"}, os.path.dirname(source))
+    assert written == [os.path.join(os.path.dirname(source), "part.pdf")]
+
+
+@pytest.mark.parametrize("output", ["../escape.pdf", "/tmp/escape.pdf", "sub/../../escape.pdf"])
+def test_serve_request_refuses_outputs_outside_the_source_dir(pool, source, output):
+    with pytest.raises(main.SplitError, match="inside the source"):
+        main.serve_request(pool, {"file": source, "start": 1, "end": 2, "output": output})
+    with pytest.raises(main.SplitError, match="inside the source"):
+        main.serve_request(pool, {"file": source, "every": 5, "output": output.replace(".pdf", "_{start}.pdf")})
+    assert not os.path.exists(os.path.join(os.path.dirname(os.path.dirname(source)), "escape.pdf"))
+
+
+def test_serve_request_refuses_symlinked_output_dirs(pool, source, tmp_path):
+    os.symlink(tmp_path, os.path.join(os.path.dirname(source), "link"))
+    with pytest.raises(main.SplitError, match="inside the source"):
+        main.serve_request(pool, {"file": source, "start": 1, "end": 2, "output": "link/escape.pdf"})
+
+
+def test_serve_request_refuses_files_outside_the_root(pool, source, tmp_path):
+    os.mkdir(tmp_path / "root")
+    with pytest.raises(main.SplitError, match="outside the served directory"):
+        main.serve_request(pool, {"file": source, "start": 1, "end": 2, "output": "part"}, str(tmp_path / "root"))
+
+
+def test_http_split(server, source):
+    status, reply = _post(server, {"file": source, "ranges": "1-5,6-10"},
+                          {"Content-Type": "application/json; charset=utf-8"})
+    assert status == 200 and len(reply["outputs"]) == 2
+
+
+def test_http_requires_json_content_type(server, source):
+    status, reply = _post(server, {"file": source, "ranges": "1-5"}, {"Content-Type": "text/plain"})
+    assert status == 415 and not reply["ok"]
+
+
+def test_http_rejects_foreign_hosts(server, source):
+    status, reply = _post(server, {"file": source, "ranges": "1-5"},
+                          {"Content-Type": "application/json", "Host": f"evil.example:{server.server_port}"})
+    assert status == 403 and not reply["ok"]
+
+
+@pytest.mark.parametrize("template", ["{title:.<2}/{stem}_{start}.pdf", "{stem.__class__}_{start}.pdf",
+                                      "{stem[0]}_{start}.pdf", "{stem!r}_{start}.pdf", "{page:/<3}.pdf",
+                                      "{nope}.pdf"])
+def test_serve_request_refuses_unsafe_templates(pool, source, template):
+    before = sorted(os.listdir(os.path.dirname(os.path.dirname(source))))
+    with pytest.raises(main.SplitError, match="Bad output template"):
+        main.serve_request(pool, {"file": source, "every": 5, "output": template}, os.path.dirname(source))
+    assert sorted(os.listdir(os.path.dirname(os.path.dirname(source)))) == before
+    assert os.listdir(os.path.dirname(source)) == ["doc.pdf"]
+
+
+def test_serve_request_allows_zero_padded_numbers(pool, source):
+    written = main.serve_request(pool, {"file": source, "every": 5, "output": "{stem}_{index:02d}_{start:03d}.pdf"})
+    assert [os.path.basename(path) for path in written] == ["doc_01_001.pdf", "doc_02_006.pdf"]
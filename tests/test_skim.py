@@ -0,0 +1,54 @@
+import pytest
+
+import corpus
+import main
+
+
+def _pypdf_info(path):
+    main._import_pypdf()
+    reader = main.PdfReader(path, strict=True)
+    metadata = {key[1:]: str(value) for key, value in (reader.metadata or {}).items() if key in main.INFO_KEYS}
+    return {"pages": len(reader.pages), "version": reader.pdf_header[5:], "metadata": metadata}
+
+
+def _skim_info(path):
+    info = main.skim_pdf_info(path)
+    return {"pages": info["pages"], "version": info["version"], "metadata": info["metadata"]}
+
+
+@pytest.mark.parametrize("kind", corpus.KINDS)
+@pytest.mark.parametrize("xref", corpus.XREF_STYLES)
+def test_skim_matches_pypdf(corpus_pdf, kind, xref):
+    # skim_pdf_info is called directly: a file it cannot read fails here instead of falling back.
+    path = corpus_pdf(kind, 150, xref)
+    assert _skim_info(path) == _pypdf_info(path)
+    assert main.skim_page_count(path) == 150
+
+
+def test_hybrid_stream_entries_override_free_table_entries(corpus_pdf):
+    # The catalog and page dictionaries of a hybrid file are free in its table and only listed by /XRefStm.
+    with open(corpus_pdf("text", 5, "hybrid"), "rb") as f:
+        skimmer = main.PdfSkimmer(f.read())
+    catalog = skimmer.trailer["/Root"]
+    assert skimmer._lookup(catalog.idnum)[0] == 2
+    assert skimmer.resolve(catalog)["/Type"] == "/Catalog"
+
+
+def test_skim_optimized_output(corpus_pdf, tmp_path):
+    path = tmp_path / "optimized.pdf"
+    with open(corpus_pdf("shared-font", 40), "rb") as f:
+        path.write_bytes(main.optimize_pdf(f.read()))
+    assert _skim_info(str(path)) == _pypdf_info(str(path))
+
+
+@pytest.mark.parametrize("title", ["Quarterly report", "Bericht über Größen", "日本語 ☃"])
+def test_skim_document_info(corpus_pdf, tmp_path, title):
+    main._import_pypdf()
+    writer = main.PdfWriter(clone_from=corpus_pdf("incremental", 30))
+    writer.add_metadata({"/Title": title, "/Author": "Split Bench"})
+    path = str(tmp_path / "info.pdf")
+    writer.write(path)
+
+    info = _skim_info(path)
+    assert info == _pypdf_info(path)
+    assert info["metadata"]["Title"] == title
@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+import main
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    return str(tmp_path / "index.sqlite")
+
+
+def test_files_without_pages_are_recorded(tmp_path, index_path):
+    main._import_pypdf()
+    empty = str(tmp_path / "empty.pdf")
+    main.PdfWriter().write(empty)
+
+    indexed, unchanged, _, failures = main.update_text_index([empty], index_path, jobs=1)
+    assert (indexed, unchanged, failures) == (1, 0, [])
+    indexed, unchanged, _, _ = main.update_text_index([empty], index_path, jobs=1)
+    assert (indexed, unchanged) == (0, 1)
+
+    os.utime(empty, ns=(0, 0))
+    assert main.update_text_index([empty], index_path, jobs=1)[0] == 1
+
+
+def test_query_matches_all_words_on_a_page_in_any_order(corpus_pdf, index_path):
+    path = os.path.abspath(corpus_pdf("text", 12))
+    main.update_text_index([path], index_path, jobs=1)
+    # Every page has "the quick brown fox jumps over the lazy dog"; the reversed words still match.
+    assert main.query_text_index("dog lazy quick", index_path) == [(path, list(range(1, 13)))]
+    assert main.query_text_index("dog unicorn", index_path) == []